@@ -0,0 +1,77 @@
+"""
+mock OCX를 상대로 주식호가잔량 실시간 데이터 하나를 추출하는 속도를 측정합니다.
+
+미리 계산된 RealDataPlan과, 매번 FID 이름을 만들고 찾아서 변환하던 이전 방식을 비교합니다.
+
+    python benchmarks/bench_real_data_plan.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from mock_kiwoom_ocx import MockKiwoomOCX
+from kiwoomproxy.kiwoom_api_const import KOR_NAME_TO_FID
+from kiwoomproxy.real_data_plan import get_ask_bid_change_plan, ask_bid_change_fields, MAX_ASK_BID_DEPTH
+
+EVENT_COUNT = 20000
+STOCK_CODE = '005930'
+
+def make_ocx() -> MockKiwoomOCX:
+    ocx = MockKiwoomOCX()
+    for num in range(1, MAX_ASK_BID_DEPTH + 1):
+        ocx.real_data[int(KOR_NAME_TO_FID[f'매수호가{num}'])] = f'-{70000 - num * 100}'
+        ocx.real_data[int(KOR_NAME_TO_FID[f'매도호가{num}'])] = f'+{70000 + num * 100}'
+        ocx.real_data[int(KOR_NAME_TO_FID[f'매수호가 수량{num}'])] = str(num * 1000)
+        # 빈 문자열로 전달되는 항목도 섞여있습니다.
+        ocx.real_data[int(KOR_NAME_TO_FID[f'매도호가 수량{num}'])] = '' if num % 3 == 0 else str(num * 900)
+    return ocx
+
+def _legacy_clean_integer(value: str) -> int | None:
+    try:
+        return int(value.strip('+- '))
+    except ValueError:
+        return None
+
+def legacy_extract(ocx, stock_code: str) -> list:
+    """
+    plan을 사용하기 이전의 _real_data_handler와 같은 방식으로 호가를 추출합니다.
+    """
+    bid_info_list = []
+    ask_info_list = []
+    for num in range(MAX_ASK_BID_DEPTH):
+        bid_price = ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매수호가{num + 1}'])
+        bid_amount = ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매수호가 수량{num + 1}'])
+        bid_info_list.append((_legacy_clean_integer(bid_price), _legacy_clean_integer(bid_amount)))
+    for num in range(MAX_ASK_BID_DEPTH):
+        ask_price = ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매도호가{num + 1}'])
+        ask_amount = ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매도호가 수량{num + 1}'])
+        ask_info_list.append((_legacy_clean_integer(ask_price), _legacy_clean_integer(ask_amount)))
+    return [bid_info_list, ask_info_list]
+
+def plan_extract(ocx, stock_code: str, plan=get_ask_bid_change_plan(ask_bid_change_fields(MAX_ASK_BID_DEPTH))) -> list:
+    values = plan.extract(ocx, stock_code)
+    depth = len(values) // 4
+    return [list(zip(values[0:depth], values[depth:2 * depth])),
+            list(zip(values[2 * depth:3 * depth], values[3 * depth:]))]
+
+def measure(extract, ocx) -> float:
+    start = time.perf_counter()
+    for _ in range(EVENT_COUNT):
+        extract(ocx, STOCK_CODE)
+    return EVENT_COUNT / (time.perf_counter() - start)
+
+def main() -> None:
+    ocx = make_ocx()
+    assert legacy_extract(ocx, STOCK_CODE) == plan_extract(ocx, STOCK_CODE)
+    for name, extract in (('before (per-event lookup)', legacy_extract), ('after (RealDataPlan)', plan_extract)):
+        ocx.real_data_calls = 0
+        events_per_sec = measure(extract, ocx)
+        print(f'{name}: {events_per_sec:,.0f} events/sec, '
+              f'{events_per_sec * ocx.real_data_calls / EVENT_COUNT:,.0f} get_comm_real_data calls/sec')
+
+if __name__ == '__main__':
+    main()
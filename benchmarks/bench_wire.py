@@ -0,0 +1,48 @@
+"""
+client가 요청을 연속으로 보냈을 때 WireProtocol이 frame을 나누고 역직렬화하는 속도를 측정합니다.
+
+    python benchmarks/bench_wire.py
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kiwoomproxy.wire import WireProtocol
+
+REQUEST_COUNT = 10000
+CHUNK_SIZE = 1 << 16
+REPEAT = 5
+
+def make_burst(request_count: int) -> bytes:
+    frames = []
+    for index in range(request_count):
+        request = {'method': 'get_price_info', 'kwargs': {'stock_code': '005930', 'request_name': f'가격조회{index}'}}
+        frames.append((json.dumps(request) + '\n').encode())
+    return b''.join(frames)
+
+def parse(burst: bytes, chunk_size: int) -> int:
+    protocol = WireProtocol()
+    count = 0
+    for start in range(0, len(burst), chunk_size):
+        protocol.feed(burst[start:start + chunk_size])
+        for _ in protocol.messages():
+            count += 1
+    return count
+
+def main() -> None:
+    burst = make_burst(REQUEST_COUNT)
+    for chunk_size in (CHUNK_SIZE, 1 << 10):
+        best = float('inf')
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            count = parse(burst, chunk_size)
+            best = min(best, time.perf_counter() - start)
+        assert count == REQUEST_COUNT
+        print(f'{REQUEST_COUNT} requests, {chunk_size} byte chunks: {best * 1000:.1f} ms '
+              f'({best / REQUEST_COUNT * 1e6:.2f} us/request)')
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,25 @@
 import logging
-import json
-from PyQt5.QtNetwork import QTcpSocket
+from functools import partial
 
 from .utils import *
 from .kiwoom_api_const import *
 from .kiwoom_ocx import KiwoomOCX
+from .connection import ClientConnection
+from .hub import Hub
+from .screen_allocator import ScreenAllocator
+from .subscription_manager import SubscriptionManager
+from .condition_manager import ConditionManager
+from .position_ledger import PositionLedger
+from .order_tracker import OrderTracker, OrderBasket, REJECTED
+from .order_book import OrderBookCache, MAX_BOOK_DEPTH
+from .trigger_book import TriggerBook, TriggerRule, trigger_fid_list
+from .tr_registry import get_tr_spec
+from .tr_request import TrRequest, TrRequestTable, BulkTrResult, MAX_BULK_CODES
+from .tr_cache import TrCache
+from .scheduler import RequestScheduler, TR, ORDER, HIGH_PRIORITY, NORMAL_PRIORITY, OVERFLOW_ERRORS
+from .real_data_plan import MAX_ASK_BID_DEPTH, price_change_fields, ask_bid_change_fields
+from .wire import check_wire_mode
+from .schema import MESSAGE_SCHEMAS, check_schema_mode
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +28,10 @@ class ClientHandler():
     Client로부터 보내진 요청을 처리하는 클래스
     """
 
-    def __init__(self, ocx: KiwoomOCX, socket: QTcpSocket):
+    def __init__(self, ocx: KiwoomOCX, connection: ClientConnection, hub: Hub, book_cache: OrderBookCache,
+                 tr_requests: TrRequestTable, scheduler: RequestScheduler, screens: ScreenAllocator,
+                 subscriptions: SubscriptionManager, tr_cache: TrCache, conditions: ConditionManager,
+                 ledger: PositionLedger, orders: OrderTracker, triggers: TriggerBook):
         """
         ClientSignalHandler 클래스의 객체를 초기화합니다.
 
@@ -22,34 +40,243 @@ class ClientHandler():
         ocx : KiwoomOCX
             키움증권 측과 OCX로 통신하기 위해 사용되는 객체입니다.
             이 객체의 메서드를 호출함으로써 키움증권 Open API를 사용할 수 있습니다.
-        socket: QTcpSocket
-            Client 측의 요청을 읽기 위한 socket입니다.
-            socket은 미리 연결되어있어야 합니다.
+        connection: ClientConnection
+            Client 측의 요청을 읽기 위한 connection입니다.
+            connection의 socket은 미리 연결되어있어야 합니다.
+        hub : Hub
+            요청에 대한 결과가 이 client에게 전달되도록 등록하기 위한 객체입니다.
+        book_cache : OrderBookCache
+            delta 모드의 client에게 전체 호가를 보내기 위해 마지막 호가를 저장하는 객체입니다.
+        tr_requests : TrRequestTable
+            응답을 기다리는 TR 요청의 정보를 ServerHandler와 공유하기 위한 객체입니다.
+        scheduler : RequestScheduler
+            조회 TR과 주문이 호출 제한을 넘지 않도록 모든 client가 공유하는 scheduler입니다.
+        screens : ScreenAllocator
+            TR 요청과 주문에 사용할 화면번호를 할당하는 객체입니다.
+        subscriptions : SubscriptionManager
+            여러 client의 실시간 등록을 중복없이 OCX에 등록하는 객체입니다.
+        tr_cache : TrCache
+            같은 조회 TR 요청을 합치고 그 결과를 재사용하기 위한 객체입니다.
+        conditions : ConditionManager
+            여러 client의 실시간 조건검색을 조건검색식마다 한 번만 요청하는 객체입니다.
+        ledger : PositionLedger
+            보유주식과 주문가능금액을 메모리에 유지하는 객체입니다.
+        orders : OrderTracker
+            주문번호별 주문의 상태를 메모리에 유지하는 객체입니다.
+        triggers : TriggerBook
+            실시간 데이터로 확인할 조건 주문들을 ServerHandler와 공유하기 위한 객체입니다.
         """
         self._ocx = ocx
         self._account_number = None
-        self._buffer = ''
-        self._socket = socket
-        self._socket.readyRead.connect(self._handle_requests)
+        self._connection = connection
+        self._hub = hub
+        self._book_cache = book_cache
+        self._tr_requests = tr_requests
+        self._scheduler = scheduler
+        self._screens = screens
+        self._subscriptions = subscriptions
+        self._tr_cache = tr_cache
+        self._conditions = conditions
+        self._ledger = ledger
+        self._orders = orders
+        self._triggers = triggers
+        # 실시간 타입별로 이 client가 등록한 종목과 FID들을 저장합니다.
+        self._real_registrations: dict[str, dict[str, list[str]]] = {'주식체결': {}, '주식호가잔량': {}}
+        self._ask_bid_type = 'ask_bid_change'
+        # compact schema의 필드 순서는 연결마다 한 번만 전송합니다.
+        self._schema_sent = False
+        self._connection.socket.readyRead.connect(self._handle_requests)
 
     def _handle_requests(self):
         """
         Client의 socket으로부터 요청이 도착했을 때 이를 처리합니다.
+
+        OCX와 hub는 모든 client가 공유하므로, 한 요청의 실패가 proxy를 멈추지 않도록 요청마다 예외를 잡습니다.
+        실패한 요청은 request_name을, 없다면 method 이름을 key로 하는 request_error로 알리고 다음 요청을 처리합니다.
         """
-        while self._socket.bytesAvailable() > 0:
-            self._buffer += self._socket.readAll().data().decode()
-            while '\n' in self._buffer:
-                line, self._buffer = self._buffer.split('\n', 1)
-                data_dict = json.loads(line)
-                method = getattr(self, data_dict['method'])
+        for data_dict in self._connection.receive():
+            key = ''
+            try:
                 kwargs = data_dict['kwargs']
-                method(**kwargs)
+                key = data_dict['method']
+                # 다른 client가 같은 request_name을 사용해도 결과가 섞이지 않도록 이 client만의 이름으로 바꿉니다.
+                if 'request_name' in kwargs:
+                    kwargs['request_name'] = key = self._connection.scope(kwargs['request_name'])
+                if data_dict['method'].startswith('_'):
+                    raise AttributeError(f'지원하지 않는 요청 - {data_dict["method"]} 입니다.')
+                getattr(self, data_dict['method'])(**kwargs)
+            except Exception as error:
+                logger.exception(f'client의 요청 - {data_dict} 을(를) 처리하지 못했습니다.')
+                self._connection.send({'type': 'request_error', 'key': key, 'value': str(error)})
+
+    @trace
+    def set_wire_mode(self, mode: str) -> None:
+        """
+        client으로부터 wire mode 변경 요청을 받았을 때 호출합니다.
+
+        변경 결과는 기존 모드로 전송되며, 그 이후의 메세지는 양방향 모두 새로운 모드를 사용합니다.
+        사용할 수 없는 모드라면 모드를 바꾸지 않고 'wire_mode'를 key로 하는 request_error를 전달합니다.
+
+        Parameters
+        ----------
+        mode : str
+            'json', 'binary', 'msgpack' 중 하나입니다.
+        """
+        try:
+            check_wire_mode(mode)
+        except (ValueError, RuntimeError) as error:
+            logger.warning(f'wire mode를 변경하지 못했습니다. - {error}')
+            self._connection.send({'type': 'request_error', 'key': 'wire_mode', 'value': str(error)})
+            return
+        self._connection.send({'type': 'wire_mode', 'key': '', 'value': mode})
+        self._connection.protocol.set_mode(mode)
+
+    @trace
+    def set_schema_mode(self, schema: str) -> None:
+        """
+        client으로부터 schema mode 변경 요청을 받았을 때 호출합니다.
+
+        compact 모드를 사용하는 client에게는 각 메세지의 필드 순서를 담은 schema를 한 번만 전달하고,
+        이후의 메세지는 한글 key 없이 위치 기반 배열로 전송합니다.
+        schema는 연결된 이후 처음으로 compact 모드로 변경할 때만 전송합니다. 필드 순서는 proxy가 실행되는 동안
+        바뀌지 않으므로, dict 모드만 사용하는 client는 schema를 받지 않고 모드를 여러 번 바꾸는 client도
+        다시 받지 않습니다.
+
+        Parameters
+        ----------
+        schema : str
+            'dict' 혹은 'compact'입니다.
+        """
+        check_schema_mode(schema)
+        if schema == 'compact' and not self._schema_sent:
+            schemas = {msg_type: list(fields) for msg_type, fields in MESSAGE_SCHEMAS.items()}
+            self._connection.send({'type': 'schema', 'key': schema, 'value': schemas})
+            self._schema_sent = True
+        self._connection.protocol.set_schema(schema)
+
+    @trace
+    def set_book_mode(self, mode: str) -> None:
+        """
+        client으로부터 실시간 호가정보 전송 방식의 변경 요청을 받았을 때 호출합니다.
+
+        delta 모드에서는 ask_bid_change 대신 변경된 호가와 sequence number만 담은 ask_bid_delta를 전송합니다.
+        주기적으로 혹은 get_ask_bid_snapshot 요청시 전체 호가가 담긴 ask_bid_delta를 전송합니다.
+
+        Parameters
+        ----------
+        mode : str
+            'full' 혹은 'delta'입니다.
+        """
+        if mode == 'full':
+            ask_bid_type = 'ask_bid_change'
+        elif mode == 'delta':
+            ask_bid_type = 'ask_bid_delta'
+        else:
+            raise ValueError(f'유효하지 않은 호가 전송 방식 - {mode} 입니다.')
+
+        # 이미 구독한 종목들은 새로운 방식으로 옮겨서 구독합니다.
+        self._hub.move_subscriptions(self._ask_bid_type, ask_bid_type, self._connection)
+        self._ask_bid_type = ask_bid_type
+
+    @trace
+    def get_ask_bid_snapshot(self, stock_code: str) -> None:
+        """
+        client으로부터 delta 모드의 재동기화를 위한 전체 호가 요청을 받았을 때 호출합니다.
+
+        Parameters
+        ----------
+        stock_code : str
+            전체 호가를 받을 종목 코드입니다.
+        """
+        snapshot = self._book_cache.snapshot(stock_code)
+        seq = snapshot['seq'] if snapshot is not None else 0
+        self._connection.send({'type': 'ask_bid_delta', 'key': stock_code,
+                               'value': {'seq': seq, 'changes': None, 'snapshot': snapshot}})
+
+    @trace
+    def set_send_queue(self, max_queue_size: int, high_watermark: int, policy: str) -> None:
+        """
+        client으로부터 전송 대기열 설정 변경 요청을 받았을 때 호출합니다.
+
+        Parameters
+        ----------
+        max_queue_size : int
+            전송 대기열에 쌓일 수 있는 메세지의 최대 개수입니다.
+        high_watermark : int
+            socket의 전송 buffer가 이 크기(byte) 이상이면 메세지를 대기열에 쌓습니다.
+        policy : str
+            'conflate' 혹은 'drop_oldest'입니다.
+        """
+        self._connection.configure_send_queue(max_queue_size, high_watermark, policy)
+
+    @trace
+    def set_flush_interval(self, flush_interval_ms: int) -> None:
+        """
+        client으로부터 frame을 모아서 전송하는 시간의 변경 요청을 받았을 때 호출합니다.
+
+        값이 클수록 write 횟수가 줄어 처리량이 늘지만 메세지의 지연시간도 늘어납니다.
+
+        Parameters
+        ----------
+        flush_interval_ms : int
+            0이면 event loop 한 바퀴 동안의 frame들을 모아서 쓰고,
+            양수이면 그 시간(ms) 동안의 frame들을 모아서 쓰며,
+            음수이면 모으지 않고 즉시 씁니다.
+        """
+        self._connection.set_flush_interval(flush_interval_ms)
+
+    @trace
+    def get_send_queue_stats(self) -> None:
+        """
+        client으로부터 전송 대기열의 상태 조회 요청을 받았을 때 호출합니다.
+
+        대기열의 깊이와 버려진 메세지의 수 등을 client에게 전달합니다.
+        """
+        stats = self._connection.get_send_queue_stats()
+        self._connection.send({'type': 'send_queue_stats', 'key': '', 'value': stats})
+
+    @trace
+    def get_scheduler_stats(self) -> None:
+        """
+        client으로부터 조회 TR과 주문 대기열의 상태 조회 요청을 받았을 때 호출합니다.
+
+        대기열마다 대기중인 요청 수와 다음 요청까지의 대기시간(초)을 client에게 전달합니다.
+        """
+        stats = self._scheduler.get_stats()
+        self._connection.send({'type': 'scheduler_stats', 'key': '', 'value': stats})
+
+    @trace
+    def get_screen_stats(self) -> None:
+        """
+        client으로부터 화면번호 사용 현황 조회 요청을 받았을 때 호출합니다.
+
+        실시간 화면별 등록된 종목 수와 남은 화면 수 등을 client에게 전달합니다.
+        """
+        stats = self._screens.get_stats()
+        stats.update(self._subscriptions.get_stats())
+        self._connection.send({'type': 'screen_stats', 'key': '', 'value': stats})
+
+    @trace
+    def get_tr_cache_stats(self) -> None:
+        """
+        client으로부터 TR 결과 재사용 현황 조회 요청을 받았을 때 호출합니다.
+
+        저장된 결과를 재사용한 횟수(hits), 새로 요청한 횟수(misses),
+        다른 요청의 응답을 함께 받은 횟수(coalesced) 등을 client에게 전달합니다.
+        """
+        stats = self._tr_cache.get_stats()
+        self._connection.send({'type': 'tr_cache_stats', 'key': '', 'value': stats})
 
     @trace
     def login(self) -> None:
         """
         Clinet으로부터 로그인 시도 요청을 받았을 때 호출합니다.
         """
+        # 이미 다른 client가 로그인한 상태라면 다시 로그인하지 않고 결과만 전달합니다.
+        if self._ocx.get_connect_state() == 1:
+            self._connection.send({'type': 'login_result', 'key': '', 'value': 0})
+            return
+        self._hub.expect('login_result', '', self._connection)
         result = self._ocx.comm_connect()
         if result == 0:
             logger.info('로그인 시도 요청에 성공하였습니다.')
@@ -76,33 +303,103 @@ class ClientHandler():
         """
         client으로부터 조건검색식 요청을 받았을 때 호출합니다.
         
-        조건검색식을 로드 후 ServerHandler 측에서 각 검색식의 이름과 인덱스를 가져옵니다.
+        저장된 조건검색식 목록이 있다면 바로 전달합니다.
+        없다면 조건검색식을 로드 후 ServerHandler 측에서 각 검색식의 이름과 인덱스를 가져옵니다.
+        HTS에서 조건검색식을 변경했다면 refresh_condition_names를 호출해야 합니다.
         """
-        is_success = self._ocx.get_condition_load()
-        if is_success == 1:
-            logger.info('조건 검색식 로드 요청이 성공하였습니다.')
-        else:
-            raise ConnectionError(f'조건 검색식 로드 요청이 실패하였습니다. err_code - {is_success}')
+        condition_list = self._conditions.get_condition_list(self._ocx.get_login_info('USER_ID'))
+        if condition_list is None:
+            self.refresh_condition_names()
+            return
+        self._connection.send({'type': 'condition_names', 'key': '', 'value': condition_list})
+        # 조건검색을 요청하려면 로그인할 때마다 한 번은 조건검색식을 로드해야 하므로 백그라운드로 로드합니다.
+        if not self._conditions.is_loaded:
+            self._conditions.load()
 
     @trace
-    def get_matching_stocks(self, condition_name: str, condition_index: int) -> None:
+    def refresh_condition_names(self) -> None:
+        """
+        client으로부터 조건검색식 목록을 다시 불러오는 요청을 받았을 때 호출합니다.
+
+        저장된 목록을 무시하고 조건검색식을 다시 로드하며, 새로운 목록은 메모리와 파일에 저장됩니다.
+        이미 로드 중이라면 그 결과를 함께 받습니다.
+        """
+        self._hub.expect('condition_names', '', self._connection)
+        self._conditions.load()
+
+    @trace
+    def get_matching_stocks(self, condition_name: str, condition_index: int, real_time: bool = False) -> None:
         """
         client으로부터 조건검색식과 부합하는 종목 검색 요청을 받았을 때 호출합니다.
 
+        조건검색식이 아직 로드되지 않았다면 로드가 완료된 후에 검색을 요청합니다.
+
         Parameters
         ----------
         condition_name : str
             조건검색식의 이름입니다.
         condition_index : int
             조건검색식의 인덱스입니다.
+        real_time : bool
+            True일시 첫 검색 결과 이후에 종목이 편입되거나 이탈할 때마다
+            condition_enter 혹은 condition_exit를 받습니다. send_condition_stop으로 중지할 수 있습니다.
         """ 
-        screen_no = get_screen_no()
+        if real_time:
+            self._start_real_condition(condition_name, condition_index)
+            return
+        self._hub.expect('matching_stocks', condition_name, self._connection)
+        self._conditions.when_loaded(self._connection, condition_name,
+                                     lambda: self._send_condition(condition_name, condition_index))
+
+    def _send_condition(self, condition_name: str, condition_index: int) -> None:
+        """
+        조건검색식에 부합하는 종목들을 한 번 검색합니다.
+        """
+        screen_no = self._screens.next_tr_screen()
         is_success = self._ocx.send_condition(screen_no, condition_name, condition_index, 0)
         if is_success == 1:
             logger.info('조건검색식에 부합하는 종목검색에 성공하였습니다.')
         else:
             raise RuntimeError(f'조건검색식에 부합하는 종목검색에 실패하였습니다. err_code - {is_success}')
         
+    def _start_real_condition(self, condition_name: str, condition_index: int) -> None:
+        """
+        실시간 조건검색을 구독합니다. 이미 다른 client가 감시중인 조건검색식이라면 현재 편입된 종목들을 바로 전달합니다.
+        """
+        for msg_type in ('condition_enter', 'condition_exit'):
+            self._hub.subscribe(msg_type, condition_name, self._connection, frozenset())
+        self._hub.expect('matching_stocks', condition_name, self._connection)
+        self._conditions.when_loaded(self._connection, condition_name,
+                                     lambda: self._request_real_condition(condition_name, condition_index))
+
+    def _request_real_condition(self, condition_name: str, condition_index: int) -> None:
+        """
+        ConditionManager에 실시간 조건검색을 요청합니다. 실패하면 구독을 해제합니다.
+        """
+        try:
+            stock_codes = self._conditions.start(self._connection, condition_name, condition_index)
+        except RuntimeError:
+            self.send_condition_stop(condition_name)
+            raise
+        if stock_codes is not None:
+            self._hub.reply({'type': 'matching_stocks', 'key': condition_name, 'value': sorted(stock_codes)})
+
+    @trace
+    def send_condition_stop(self, condition_name: str) -> None:
+        """
+        client으로부터 실시간 조건검색 중지 요청을 받았을 때 호출합니다.
+
+        다른 client가 구독하고 있지 않다면 실시간 조건검색을 중지하고 화면번호를 반납합니다.
+
+        Parameters
+        ----------
+        condition_name : str
+            중지할 조건검색식의 이름입니다.
+        """
+        for msg_type in ('condition_enter', 'condition_exit'):
+            self._hub.unsubscribe(msg_type, condition_name, self._connection)
+        self._conditions.stop(self._connection, condition_name)
+
     @trace
     def get_stocks_with_volume_spike(self, criterion: str, request_name: str) -> None:
         """
@@ -114,76 +411,296 @@ class ClientHandler():
             criterion = '2'
         else:
             raise ValueError(f'유효하지 않은 기준 - {criterion} 입니다.')
-        self._ocx.set_input_value('시장구분', '000')
-        self._ocx.set_input_value('정렬구분', criterion)
-        self._ocx.set_input_value('시간구분', '2')
-        self._ocx.set_input_value('거래량구분', '5')
-        self._ocx.set_input_value('종목조건', '20')
-        self._ocx.set_input_value('가격구분', '0')
-        screen_no = get_screen_no()
-        result = self._ocx.comm_rq_data(request_name, 'opt10023', 0, screen_no)
-        if result == 0:
-            logger.info('거래량 급증 주식 조회에 성공하였습니다.')
-        else:
-            raise RuntimeError(f'거래량 급증 주식 조회에 실패하였습니다. err_code - {result}')
+        self._request_tr('opt10023', request_name, {'정렬구분': criterion})
     
     @trace
     def get_price_info(self, stock_code: str, request_name: str):
         """
         주식 기본 정보 요청을 받았을 때 호출합니다.
         """
-        self._ocx.set_input_value('종목코드', stock_code)
-        screen_no = get_screen_no()
-        result = self._ocx.comm_rq_data(request_name, 'opt10001', 0, screen_no)
-        if result == 0:
-            logger.info('주식 기본 정보 요청을 성공하였습니다.')
-        else:
-            raise RuntimeError(f'주식 기본 정보 요청에 실패하였습니다. err_code - {result}')
+        self._request_tr('opt10001', request_name, {'종목코드': stock_code})
+
+    @trace
+    def get_price_info_bulk(self, stock_code_list: list[str], request_name: str, priority: int = NORMAL_PRIORITY):
+        """
+        여러 종목의 주식 기본 정보 요청을 받았을 때 호출합니다.
+
+        종목마다 opt10001을 요청하는 대신 CommKwRqData로 최대 100종목씩 나누어 요청하고,
+        모든 결과가 모이면 종목코드를 key로 하는 하나의 tr_result로 전달합니다.
+        요청에 실패한 종목들의 값은 None이며, 모든 요청이 실패했다면 request_error가 전달됩니다.
+
+        Parameters
+        ----------
+        stock_code_list : list[str]
+            조회할 종목 코드의 리스트입니다.
+        request_name : str
+            unique한 요청의 이름입니다.
+        priority : int
+            조회 TR 대기열에서의 우선순위입니다.
+        """
+        stock_code_list = list(dict.fromkeys(stock_code_list))
+        if not stock_code_list:
+            raise ValueError('조회할 종목 코드가 없습니다.')
+        chunks = [stock_code_list[index:index + MAX_BULK_CODES]
+                  for index in range(0, len(stock_code_list), MAX_BULK_CODES)]
+        bulk = BulkTrResult(request_name, len(chunks))
+        self._hub.expect('tr_result', request_name, self._connection)
+        for chunk_index, chunk in enumerate(chunks):
+            # 나누어진 요청은 서로 다른 이름으로 요청되고 ServerHandler에서 bulk로 모아집니다.
+            tr_request = TrRequest('OPTKWFID', f'{request_name}#{chunk_index}', [], stock_code_list=chunk, bulk=bulk)
+            self._tr_requests.add(tr_request)
+            wait = self._scheduler.submit(TR, tr_request.request_name, self._make_tr_job(tr_request, '관심종목 정보'),
+                                          priority, partial(self._fail_bulk_chunk, tr_request), self._connection)
+        self._report_wait(request_name, wait)
 
     @trace
     def get_ask_bid_info(self, stock_code: str, request_name: str):
         """
         주식 호가 정보 요청을 받았을 때 호출합니다.
+
+        10차선 모두 실시간 호가를 구독중인 종목은 메모리에 유지되는 호가를 TR 요청 없이 바로 전달합니다.
         """
-        self._ocx.set_input_value('종목코드', stock_code)
-        screen_no = get_screen_no()
-        result = self._ocx.comm_rq_data(request_name, 'opt10004', 0, screen_no)
-        if result == 0:
-            logger.info('주식 호가 정보 요청을 성공하였습니다.')
-        else:
-            raise RuntimeError(f'주식 호가 정보 요청에 실패하였습니다. err_code - {result}')
+        if self._has_book_subscribers(stock_code) and self._book_cache.depth_of(stock_code) == MAX_BOOK_DEPTH:
+            snapshot = self._book_cache.snapshot(stock_code)
+            info_dict = {'매수호가정보': snapshot['매수호가정보'], '매도호가정보': snapshot['매도호가정보']}
+            self._connection.send({'type': 'tr_result', 'key': request_name, 'value': (info_dict, '0')})
+            return
+        self._request_tr('opt10004', request_name, {'종목코드': stock_code})
+
+    @trace
+    def get_ask_bid_books(self) -> None:
+        """
+        client으로부터 실시간 호가를 구독중인 모든 종목의 호가 요청을 받았을 때 호출합니다.
+
+        종목 코드를 key로 하고 {'seq', '매수호가정보', '매도호가정보'}를 value로 하는 dict를 ask_bid_books로 전달합니다.
+        아직 호가를 받지 못한 종목은 포함되지 않습니다.
+        """
+        books = {}
+        for stock_code in self._hub.keys_of('ask_bid_change') | self._hub.keys_of('ask_bid_delta'):
+            snapshot = self._book_cache.snapshot(stock_code)
+            if snapshot is not None:
+                books[stock_code] = snapshot
+        self._connection.send({'type': 'ask_bid_books', 'key': '', 'value': books})
+
+    def _has_book_subscribers(self, stock_code: str) -> bool:
+        return (self._hub.has_subscribers('ask_bid_change', stock_code) or
+                self._hub.has_subscribers('ask_bid_delta', stock_code))
+
     @trace
     def get_deposit(self, request_name: str) -> None:
         """
         client으로부터 주문가능금액 조회 요청을 받았을 때 호출합니다.
+
+        마지막 주문 이후 조회된 주문가능금액이 있다면 TR 요청 없이 바로 전달합니다.
         """
-        self._ocx.set_input_value('계좌번호', self._account_number)
-        self._ocx.set_input_value('비밀번호입력매체구분', '00')
-        self._ocx.set_input_value('조회구분', '2')
-        screen_no = get_screen_no()
-        result = self._ocx.comm_rq_data(request_name, 'opw00001', 0, screen_no)
-        if result == 0:
-            logger.info('주문가능금액 조회에 성공하였습니다.')
-        else:
-            raise RuntimeError(f'주문가능금액 조회에 실패하였습니다. err_code - {result}')
+        deposit = self._ledger.get_deposit() if self._uses_ledger_account() else None
+        if deposit is not None:
+            self._connection.send({'type': 'tr_result', 'key': request_name, 'value': (deposit, '0')})
+            return
+        self._request_tr('opw00001', request_name, {})
     
     @trace
     def get_balance(self, request_name: str) -> None:
         """
         client으로부터 보유주식 조회 요청을 받았을 때 호출합니다.
+
+        로그인 직후 조회되어 체결 데이터로 갱신되는 보유주식이 있다면 TR 요청 없이 바로 전달합니다.
         """
-        self._ocx.set_input_value('계좌번호', self._account_number)
-        self._ocx.set_input_value('비밀번호입력매체구분', '00')
-        self._ocx.set_input_value('조회구분', '1')
-        screen_no = get_screen_no()
-        result = self._ocx.comm_rq_data(request_name, 'opw00018', 0, screen_no)
-        if result == 0:
-            logger.info('보유주식 조회 요청에 성공하였습니다.')
+        positions = self._ledger.get_positions() if self._uses_ledger_account() else None
+        if positions is not None:
+            self._connection.send({'type': 'tr_result', 'key': request_name, 'value': (positions, '0')})
+            return
+        self._request_tr('opw00018', request_name, {})
+
+    @trace
+    def reconcile_balance(self) -> None:
+        """
+        client으로부터 보유주식과 주문가능금액의 즉시 동기화 요청을 받았을 때 호출합니다.
+        """
+        self._ledger.reconcile()
+
+    @trace
+    def get_ledger_stats(self) -> None:
+        """
+        client으로부터 잔고 동기화 현황 요청을 받았을 때 호출합니다.
+        """
+        self._connection.send({'type': 'ledger_stats', 'key': '', 'value': self._ledger.get_stats()})
+
+    @trace
+    def get_open_orders(self) -> None:
+        """
+        client으로부터 미체결 주문 조회 요청을 받았을 때 호출합니다.
+
+        opt10075 대신 체결 데이터로 관리되는 주문들을 open_orders로 바로 전달합니다.
+        각 주문은 주문번호, 종목코드, 종목명, 주문구분, 주문수량, 주문가격, 미체결수량, 누적체결량, 원주문번호, 상태를 가집니다.
+        """
+        open_orders = [order.to_dict() for order in self._orders.open_orders()]
+        self._connection.send({'type': 'open_orders', 'key': '', 'value': open_orders})
+
+    def _uses_ledger_account(self) -> bool:
+        return self._account_number is not None and self._account_number == self._ledger.account_number
+
+    @trace
+    def request_tr(self, tr_code: str, inputs: dict, request_name: str, columnar: bool = False,
+                   priority: int = NORMAL_PRIORITY, paginate: bool = False, max_pages: int | None = None) -> None:
+        """
+        client으로부터 TR_REGISTRY에 등록된 임의의 TR 요청을 받았을 때 호출합니다.
+
+        Parameters
+        ----------
+        tr_code : str
+            요청할 TR 코드입니다. ex) 'opt10081'
+        inputs : dict
+            TR의 입력값들입니다. 기본값이 있는 입력과 계좌번호는 생략할 수 있습니다.
+        request_name : str
+            unique한 요청의 이름입니다.
+        columnar : bool
+            True일시 멀티 데이터를 행마다의 dict 대신 항목별 배열로 받습니다.
+            행이 많은 TR에서 결과를 만드는 비용과 전송량이 줄어듭니다.
+        priority : int
+            조회 TR 대기열에서의 우선순위입니다. 숫자가 작을수록 먼저 요청됩니다.
+        paginate : bool
+            True일시 연속 조회를 proxy가 이어서 요청합니다.
+            tr_result 대신 페이지마다 {'page', 'data'}를 담은 tr_page를 받고,
+            마지막에 받은 페이지 수를 담은 tr_end를 받습니다.
+        max_pages : int | None
+            paginate일 때 받을 최대 페이지 수입니다. None이라면 마지막 페이지까지 받습니다.
+        """
+        if max_pages is not None and max_pages < 1:
+            raise ValueError(f'유효하지 않은 최대 페이지 수 - {max_pages} 입니다.')
+        self._request_tr(tr_code, request_name, dict(inputs), columnar, priority, paginate, max_pages)
+
+    def _request_tr(self, tr_code: str, request_name: str, inputs: dict, columnar: bool = False,
+                    priority: int = NORMAL_PRIORITY, paginate: bool = False, max_pages: int | None = None) -> None:
+        """
+        TrSpec에 선언된 순서대로 입력값을 설정하고 TR 데이터를 요청합니다.
+
+        Parameters
+        ----------
+        tr_code : str
+            요청할 TR 코드입니다.
+        request_name : str
+            unique한 요청의 이름입니다.
+        inputs : dict
+            TR의 입력값들입니다.
+        columnar : bool
+            결과를 멀티 데이터의 항목별 배열로 받을지 나타냅니다.
+        priority : int
+            조회 TR 대기열에서의 우선순위입니다.
+        paginate : bool
+            연속 조회를 proxy가 이어서 요청할지 나타냅니다.
+        max_pages : int | None
+            paginate일 때 받을 최대 페이지 수입니다.
+        """
+        spec = get_tr_spec(tr_code)
+        if spec.is_order:
+            raise ValueError(f'주문 TR - {tr_code} 은(는) 조회할 수 없습니다.')
+        if tr_code == 'OPTKWFID':
+            raise ValueError('관심종목 정보는 get_price_info_bulk로 요청해야 합니다.')
+        if any(name == '계좌번호' for name, _ in spec.inputs):
+            inputs.setdefault('계좌번호', self._account_number)
+        tr_request = TrRequest(tr_code, request_name, spec.make_inputs(inputs), columnar, paginate, max_pages)
+
+        # 같은 입력의 요청은 저장된 결과를 사용하거나 이미 보낸 요청의 응답을 함께 받습니다.
+        cache_key = None if paginate else TrCache.key_of(tr_request)
+        if cache_key is not None:
+            cached = self._tr_cache.get(cache_key)
+            if cached is not None:
+                self._connection.send({'type': 'tr_result', 'key': request_name, 'value': cached})
+                return
+            if self._tr_cache.join(cache_key, request_name):
+                self._hub.expect('tr_result', request_name, self._connection)
+                return
+            self._tr_cache.start(cache_key)
+
+        self._tr_requests.add(tr_request)
+        if paginate:
+            # 페이지들은 이 client에게만 전달되고, 마지막 페이지 이후에 tr_end를 받습니다.
+            self._hub.set_owner('tr_page', request_name, self._connection)
+            self._hub.expect('tr_end', request_name, self._connection)
         else:
-            raise RuntimeError(f'보유주식 조회 요청에 실패하였습니다. err_code - {result}')
+            self._hub.expect('tr_result', request_name, self._connection)
+        wait = self._scheduler.submit(TR, request_name, self._make_tr_job(tr_request, spec.description),
+                                      priority, lambda error: self._fail_tr_request(tr_request, cache_key, error),
+                                      self._connection)
+        self._report_wait(request_name, wait)
+
+    def _make_tr_job(self, tr_request: TrRequest, description: str):
+        """
+        scheduler가 호출 제한 안에서 실행할 TR 요청 함수를 만듭니다.
+
+        Parameters
+        ----------
+        tr_request : TrRequest
+            요청할 TR입니다.
+        description : str
+            로그와 에러 메세지에 사용될 TR의 설명입니다.
+        """
+        def job() -> int:
+            result = tr_request.request(self._ocx, 0, self._screens.next_tr_screen())
+            if result == 0:
+                logger.info(f'{description} 요청에 성공하였습니다.')
+            elif result not in OVERFLOW_ERRORS:
+                raise RuntimeError(f'{description} 요청에 실패하였습니다. err_code - {result}')
+            return result
+        return job
+
+    def _fail_bulk_chunk(self, tr_request: TrRequest, error: Exception) -> None:
+        """
+        scheduler에서 실행하지 못한 나누어진 요청을 실패로 기록합니다.
+        마지막으로 끝난 요청이었다면 모아진 결과를, 모든 요청이 실패했다면 request_error를 전달합니다.
+
+        Parameters
+        ----------
+        tr_request : TrRequest
+            실패한 나누어진 요청입니다.
+        error : Exception
+            요청이 실패한 이유입니다.
+        """
+        self._tr_requests.pop(tr_request.request_name)
+        bulk = tr_request.bulk
+        if not bulk.fail(tr_request.stock_code_list):
+            return
+        if bulk.is_failed():
+            self._hub.fail('tr_result', bulk.request_name, error)
+        else:
+            logger.warning(f'요청 - {bulk.request_name} 의 종목 {len(bulk.failed_codes)}개를 조회하지 못했습니다.')
+            self._hub.reply({'type': 'tr_result', 'key': bulk.request_name, 'value': (bulk.result, '0')})
+
+    def _fail_tr_request(self, tr_request: TrRequest, cache_key: tuple | None, error: Exception) -> None:
+        """
+        scheduler에서 실행하지 못한 TR 요청의 응답을 기다리던 모든 요청에게 request_error를 전달합니다.
+
+        Parameters
+        ----------
+        tr_request : TrRequest
+            실패한 TR 요청입니다.
+        cache_key : tuple | None
+            TrCache에 응답을 기다린다고 등록한 key입니다.
+        error : Exception
+            요청이 실패한 이유입니다.
+        """
+        request_name = tr_request.request_name
+        self._tr_requests.pop(request_name)
+        if tr_request.paginate:
+            self._hub.release_owner('tr_page', request_name)
+            self._hub.fail('tr_end', request_name, error)
+            return
+        self._hub.fail('tr_result', request_name, error)
+        # 응답이 오지 않으므로 함께 기다리던 요청들도 실패를 받고, 이후의 같은 요청은 새로 요청합니다.
+        if cache_key is not None:
+            for follower_name in dict.fromkeys(self._tr_cache.abandon(cache_key)):
+                self._hub.fail('tr_result', follower_name, error)
+
+    def _report_wait(self, request_name: str, wait: float) -> None:
+        """
+        요청이 호출 제한 때문에 대기열에 들어갔다면 예상 대기시간(초)을 client에게 전달합니다.
+        """
+        if wait > 0:
+            self._connection.send({'type': 'request_queued', 'key': request_name, 'value': wait})
     
     @trace
-    def send_order(self, order_dict: dict, request_name: str) -> None:
+    def send_order(self, order_dict: dict, request_name: str, priority: int = NORMAL_PRIORITY) -> None:
         """
         client으로부터 주문을 전송하겠다는 요청을 받았을 때 호출합니다.
         Parameters
@@ -198,9 +715,51 @@ class ClientHandler():
                 '가격': int,
                 '시장가': bool
             }
+        priority : int
+            주문 대기열에서의 우선순위입니다. 숫자가 작을수록 먼저 전송됩니다.
+        """
+        params = self._make_order_params(order_dict, request_name)
+        wait = self._submit_order(request_name, params, priority, '주문')
+        self._report_wait(request_name, wait)
+
+    @trace
+    def send_orders(self, order_list: list[dict], request_name: str, priority: int = NORMAL_PRIORITY) -> None:
+        """
+        client으로부터 여러 주문을 한 번에 전송하겠다는 요청을 받았을 때 호출합니다.
+
+        모든 주문을 먼저 확인하여 하나라도 유효하지 않다면 어떤 주문도 전송하지 않습니다.
+        각 주문은 f'{request_name}#{index}'를 request_name으로 주문 대기열에 들어가 호출 제한 안에서 전송되며,
+        주문마다 send_order와 같은 tr_result와 order_event가 전달됩니다.
+        모든 주문이 체결, 취소, 정정, 거부 중 하나로 완료되면 request_name을 key로 하는 basket_result가 한 번 전달됩니다.
+
+        Parameters
+        ----------
+        order_list : list[dict]
+            send_order의 order_dict들입니다. '우선순위'를 가진 주문은 그 우선순위로 전송됩니다.
+        request_name : str
+            unique한 요청의 이름입니다.
+        priority : int
+            '우선순위'가 없는 주문들의 우선순위입니다. 같은 우선순위의 주문들은 order_list의 순서대로 전송됩니다.
+        """
+        if not order_list:
+            raise ValueError('전송할 주문이 없습니다.')
+        orders = []
+        for index, order_dict in enumerate(order_list):
+            order_name = f'{request_name}#{index}'
+            orders.append((order_dict.get('우선순위', priority), order_name, self._make_order_params(order_dict, order_name)))
+
+        basket = OrderBasket(request_name, [order_name for _, order_name, _ in orders])
+        self._orders.add_basket(basket)
+        self._hub.set_owner('basket_result', request_name, self._connection)
+        wait = 0.0
+        for order_priority, order_name, params in sorted(orders, key=lambda order: order[0]):
+            wait = max(wait, self._submit_order(order_name, params, order_priority, '주문'))
+        self._report_wait(request_name, wait)
+
+    def _make_order_params(self, order_dict: dict, request_name: str) -> list:
+        """
+        send_order의 order_dict를 확인하고 OCX의 send_order에 전달할 argument들로 변환합니다.
         """
-        screen_no = get_screen_no()
-        
         # 받은 argument들을 Open API 인터페이스에 맞도록 다듬어줍니다.
         if order_dict['구분'] == '매수':
             order_type = 1
@@ -208,6 +767,10 @@ class ClientHandler():
             order_type = 2
         else:
             raise ValueError(f'유효하지 않은 주문 타입입니다. - {order_dict["구분"]}')
+        if not order_dict['주식코드']:
+            raise ValueError('주식코드가 없는 주문입니다.')
+        if order_dict['수량'] <= 0:
+            raise ValueError(f'유효하지 않은 주문 수량 - {order_dict["수량"]} 입니다.')
 
         if order_dict['시장가'] is True:
             how = '03'
@@ -216,19 +779,30 @@ class ClientHandler():
         else:
             how = '00'
 
-        # send_order API를 호출합니다.
-        params = [request_name, screen_no, self._account_number, order_type, 
-                  order_dict['주식코드'], order_dict['수량'], order_dict['가격'], how, '']
-        result = self._ocx.send_order(*params)
-        if result == 0:
-            logger.info('정상적으로 주문이 전송되었습니다.')
-        elif result == -308:
-            raise ConnectionError('너무 많은 주문이 동시에 전송되어 실패하였습니다. (최대 1초에 5번)')
-        else:
-            raise RuntimeError(f'주문 전송에 실패하였습니다. err_code - {result}')
+        return [request_name, self._screens.next_tr_screen(), self._account_number, order_type,
+                order_dict['주식코드'], order_dict['수량'], order_dict['가격'], how, '']
+
+    def _submit_order(self, request_name: str, params: list, priority: int, description: str) -> float:
+        """
+        send_order API를 호출하는 job을 주문 대기열에 넣고 예상 대기시간(초)을 반환합니다.
+        """
+        def job() -> int:
+            result = self._ocx.send_order(*params)
+            if result == 0:
+                logger.info(f'정상적으로 {description}이 전송되었습니다.')
+            elif result not in OVERFLOW_ERRORS:
+                raise RuntimeError(f'{description} 전송에 실패하였습니다. err_code - {result}')
+            return result
+
+        self._hub.expect('tr_result', request_name, self._connection)
+        # 주문 TR의 응답을 받을 때까지 먼저 도착한 체결 데이터는 ServerHandler에 보관됩니다.
+        self._orders.submit(request_name)
+        # 전송에 실패한 주문은 주문번호를 받지 못하므로 rejected event로 알립니다.
+        return self._scheduler.submit(ORDER, request_name, job, priority,
+                                      lambda error: self._reject_order(request_name), self._connection)
 
     @trace
-    def cancel_order(self, order_dict: dict, request_name: str) -> None:
+    def cancel_order(self, order_dict: dict, request_name: str, priority: int = HIGH_PRIORITY) -> None:
         """
         client으로부터 주문을 취소하겠다는 요청를 받았을 때 호출합니다.
 
@@ -243,8 +817,10 @@ class ClientHandler():
                 '수량': int,
                 '원주문번호': str,
             }
+        priority : int
+            주문 대기열에서의 우선순위입니다. 취소 주문은 기본적으로 신규 주문보다 먼저 전송됩니다.
         """
-        screen_no = get_screen_no()
+        screen_no = self._screens.next_tr_screen()
 
         # 받은 argument들을 Open API 인터페이스에 맞도록 다듬어줍니다.
         if order_dict['구분'] == '매수취소':
@@ -257,67 +833,266 @@ class ClientHandler():
         # send_order API를 호출합니다.
         params = [request_name, screen_no, self._account_number, order_type, 
                   order_dict['주식코드'], order_dict['수량'], 0, '00', order_dict['원주문번호']]
-        result = self._ocx.send_order(*params)
-        if result == 0:
-            logger.info('정상적으로 취소 주문이 전송되었습니다.')
-        elif result == -308:
-            raise ConnectionError('너무 많은 주문이 동시에 전송되어 실패하였습니다. (최대 1초에 5번)')
+
+        wait = self._submit_order(request_name, params, priority, '취소 주문')
+        self._report_wait(request_name, wait)
+
+    @trace
+    def amend_order(self, order_dict: dict, request_name: str, priority: int = HIGH_PRIORITY) -> None:
+        """
+        client으로부터 미체결 주문을 정정하겠다는 요청을 받았을 때 호출합니다.
+
+        취소 후 다시 주문하는 대신 한 번의 주문으로 원주문의 가격과 수량을 바꿉니다.
+        정정 주문은 새로운 주문번호를 받으며, 확인되면 원주문에는 amended event가 전달되고
+        이후의 체결은 정정 주문의 주문번호로 전달됩니다.
+
+        Parameters
+        ----------
+        order_dict : dict
+            주문 정정 정보가 들어가있는 dict입니다.
+
+            order_dict = {
+                '구분': '매수정정' or '매도정정',
+                '주식코드': str,
+                '수량': int,
+                '가격': int,
+                '원주문번호': str,
+            }
+        priority : int
+            주문 대기열에서의 우선순위입니다. 정정 주문은 취소 주문처럼 기본적으로 신규 주문보다 먼저 전송됩니다.
+        """
+        screen_no = self._screens.next_tr_screen()
+
+        # 받은 argument들을 Open API 인터페이스에 맞도록 다듬어줍니다.
+        if order_dict['구분'] == '매수정정':
+            order_type = 5
+        elif order_dict['구분'] == '매도정정':
+            order_type = 6
         else:
-            raise RuntimeError(f'취소 주문 전송에 실패하였습니다. err_code - {result}')
+            raise ValueError(f'유효하지 않은 주문 타입입니다. - {order_dict["구분"]}')
+        if order_dict['가격'] <= 0:
+            raise ValueError('정정 주문은 지정가로만 가능하므로 가격을 설정해야 합니다.')
+
+        # send_order API를 호출합니다.
+        params = [request_name, screen_no, self._account_number, order_type,
+                  order_dict['주식코드'], order_dict['수량'], order_dict['가격'], '00', order_dict['원주문번호']]
+
+        wait = self._submit_order(request_name, params, priority, '정정 주문')
+        self._report_wait(request_name, wait)
+
+    def _reject_order(self, request_name: str) -> None:
+        """
+        주문번호를 받기 전에 거부된 주문을 request_name을 key로 하는 rejected event로 알립니다.
+        basket에 포함된 주문이라면 거부로 완료된 것으로 기록합니다.
+        """
+        self._connection.send({'type': 'order_event', 'key': request_name,
+                               'value': {'event': REJECTED, '주문번호': ''}})
+        self._orders.acknowledge(request_name, '')
+        for basket in self._orders.completed_baskets():
+            self._hub.deliver({'type': 'basket_result', 'key': basket.request_name, 'value': basket.to_dict()})
+            self._hub.release_owner('basket_result', basket.request_name)
 
     @trace
-    def register_price_info(self, stock_code_list: list[str], is_add: bool) -> None:
+    def register_trigger(self, trigger_dict: dict, request_name: str) -> None:
+        """
+        client으로부터 조건 주문 등록 요청을 받았을 때 호출합니다.
+
+        조건은 proxy가 실시간 데이터를 받을 때마다 확인하며, 조건을 만족하면 client를 거치지 않고
+        바로 주문을 전송합니다. 조건 주문은 한 번만 실행되며, 실행되면 request_name을 key로 하는
+        trigger_fired가 전달된 후 send_order와 같은 tr_result와 order_event가 전달됩니다.
+        client의 연결이 끊어지면 등록된 조건 주문들은 모두 제거됩니다.
+
+        Parameters
+        ----------
+        trigger_dict : dict
+            조건 주문의 정보가 들어가있는 dict입니다.
+
+            trigger_dict = {
+                '주식코드': str,
+                '조건': '현재가이상' or '현재가이하' or '스프레드이상' or '스프레드이하',
+                '기준값': int,
+                '주문': send_order의 order_dict,
+            }
+        request_name : str
+            unique한 조건 주문의 이름입니다. 전송되는 주문의 request_name으로도 사용됩니다.
+        """
+        params = self._make_order_params(trigger_dict['주문'], request_name)
+        if trigger_dict['주식코드'] != params[4]:
+            raise ValueError(f'조건의 종목 - {trigger_dict["주식코드"]} 와(과) 주문의 종목 - {params[4]} 이(가) 다릅니다.')
+        rule = TriggerRule(request_name, trigger_dict['주식코드'], trigger_dict['조건'], trigger_dict['기준값'],
+                           self._connection, lambda rule, value: self._fire_trigger(rule, value, params))
+        self._triggers.add(rule)
+        self._subscriptions.acquire(self._connection, [rule.stock_code], trigger_fid_list(rule.real_type))
+        logger.info(f'조건 주문 - {request_name} 이(가) 등록되었습니다. {rule.stock_code} {rule.condition} {rule.level}')
+
+    @trace
+    def remove_trigger(self, request_name: str) -> None:
+        """
+        client으로부터 아직 실행되지 않은 조건 주문의 삭제 요청을 받았을 때 호출합니다.
+        다른 client가 등록한 조건 주문은 삭제할 수 없습니다.
+        """
+        rule = self._triggers.get(request_name)
+        if rule is None or rule.owner is not self._connection:
+            raise ValueError(f'등록되지 않은 조건 주문 - {unscope_request_name(request_name)} 입니다.')
+        self._triggers.remove(request_name)
+        self._subscriptions.release(self._connection, [rule.stock_code], trigger_fid_list(rule.real_type))
+
+    @trace
+    def get_triggers(self) -> None:
+        """
+        client으로부터 실행되지 않은 조건 주문들의 조회 요청을 받았을 때 호출합니다.
+        """
+        rules = [rule.to_dict() for rule in self._triggers.rules_of(self._connection)]
+        self._connection.send({'type': 'triggers', 'key': '', 'value': rules})
+
+    def _fire_trigger(self, rule: TriggerRule, value: int, params: list) -> None:
+        """
+        조건을 만족한 조건 주문을 가장 높은 우선순위로 전송합니다.
+        """
+        self._connection.send({'type': 'trigger_fired', 'key': rule.request_name, 'value': dict(rule.to_dict(), 값=value)})
+        self._submit_order(rule.request_name, params, HIGH_PRIORITY, '조건 주문')
+        self._subscriptions.release(self._connection, [rule.stock_code], trigger_fid_list(rule.real_type))
+
+    @trace
+    def register_price_info(self, stock_code_list: list[str], is_add: bool, fields: list[str] | None = None) -> None:
         """
         client으로부터 실시간 가격정보 등록 요청를 받았을 때 호출합니다.
         
         _register_real_time_info 함수의 wrapper function입니다.
+
+        Parameters
+        ----------
+        fields : list[str] | None
+            받고 싶은 항목들의 이름입니다. ex) ['현재가', '누적거래량']
+            None이라면 현재가, 시가, 고가, 저가를 받습니다.
         """
-        fid_list = [KOR_NAME_TO_FID['현재가'], KOR_NAME_TO_FID['시가'], KOR_NAME_TO_FID['고가']]
-        self._register_real_time_info(stock_code_list, fid_list, is_add)
+        fields = price_change_fields(fields)
+        fid_list = [KOR_NAME_TO_FID[field] for field in fields]
+        self._subscribe('price_change', stock_code_list, is_add, fields)
+        self._register_real_time_info('주식체결', stock_code_list, fid_list, is_add)
     
     @trace
-    def register_ask_bid_info(self, stock_code_list: list[str], is_add: bool) -> None:
+    def register_ask_bid_info(self, stock_code_list: list[str], is_add: bool, depth: int = MAX_ASK_BID_DEPTH) -> None:
         """
         client으로부터 실시간 호가정보 등록 요청를 받았을 때 호출합니다.
         
         _register_real_time_info 함수의 wrapper function입니다.
+
+        Parameters
+        ----------
+        depth : int
+            받고 싶은 호가의 차선 수입니다. 1이면 최우선 호가만 받습니다.
         """
+        fields = ask_bid_change_fields(depth)
         fid_list = [KOR_NAME_TO_FID['매수호가1'], KOR_NAME_TO_FID['매수호가 수량1']]
-        self._register_real_time_info(stock_code_list, fid_list, is_add)
+        # 구독이 끊겼던 동안의 오래된 호가가 조회되지 않도록 새로 구독하는 종목의 호가는 버립니다.
+        for stock_code in stock_code_list:
+            if not self._has_book_subscribers(stock_code):
+                self._book_cache.remove(stock_code)
+        self._subscribe(self._ask_bid_type, stock_code_list, is_add, fields)
+        self._register_real_time_info('주식호가잔량', stock_code_list, fid_list, is_add)
 
     @trace
-    def _register_real_time_info(self, stock_code_list: list[str], fid_list: list[str], is_add: bool) -> None:
+    def unregister_price_info(self, stock_code_list: list[str]) -> None:
+        """
+        client으로부터 실시간 가격정보 해제 요청을 받았을 때 호출합니다.
+
+        다른 client가 등록하지 않은 종목은 OCX의 실시간 등록도 해제됩니다.
+
+        Parameters
+        ----------
+        stock_code_list : list[str]
+            해제할 종목 코드의 리스트입니다.
+        """
+        for stock_code in stock_code_list:
+            self._hub.unsubscribe('price_change', stock_code, self._connection)
+        self._unregister_real_time_info('주식체결', stock_code_list)
+
+    @trace
+    def unregister_ask_bid_info(self, stock_code_list: list[str]) -> None:
+        """
+        client으로부터 실시간 호가정보 해제 요청을 받았을 때 호출합니다.
+
+        다른 client가 등록하지 않은 종목은 OCX의 실시간 등록도 해제됩니다.
+
+        Parameters
+        ----------
+        stock_code_list : list[str]
+            해제할 종목 코드의 리스트입니다.
+        """
+        for stock_code in stock_code_list:
+            self._hub.unsubscribe(self._ask_bid_type, stock_code, self._connection)
+        self._unregister_real_time_info('주식호가잔량', stock_code_list)
+
+    def _subscribe(self, msg_type: str, stock_code_list: list[str], is_add: bool, fields: frozenset) -> None:
+        """
+        이 client가 주어진 종목들의 실시간 메세지를 받도록 hub에 구독합니다.
+
+        Parameters
+        ----------
+        msg_type : str
+            구독할 실시간 메세지의 type입니다.
+        stock_code_list : list[str]
+            구독할 종목 코드의 리스트입니다.
+        is_add : bool
+            False일시 이 client가 기존에 구독한 같은 type의 종목들은 구독이 해제됩니다.
+        fields : frozenset
+            이 client가 받고 싶은 항목들입니다.
+        """
+        if is_add is False:
+            self._hub.unsubscribe_all(msg_type, self._connection)
+        for stock_code in stock_code_list:
+            self._hub.subscribe(msg_type, stock_code, self._connection, fields)
+
+    @trace
+    def _register_real_time_info(self, real_type: str, stock_code_list: list[str], fid_list: list[str],
+                                 is_add: bool) -> None:
         """
         실시간 정보를 받겠다고 등록하는 함수입니다.
 
+        등록은 SubscriptionManager를 통해 다른 client의 등록과 합쳐져서 OCX에 한 번만 등록됩니다.
+
         Parameters
         ----------
+        real_type : str
+            등록할 실시간 타입입니다. ex) '주식체결'
         stock_code_list : list[str]
             실시간 정보를 등록할 종목 코드의 리스트입니다.
         fid_list : list[str]
             받고 싶은 fid들의 리스트입니다.
             이에 따라 전송되는 실시간 정보의 signal이 달라집니다.
         is_add : bool
-            True일시 화면번호에 존재하는 기존의 등록은 사라집니다.
-            False일시 기존에 등록된 종목과 함께 실시간 정보를 받습니다.
+            False일시 이 client가 기존에 등록한 같은 타입의 다른 종목들은 등록이 해제됩니다.
+            True일시 기존에 등록된 종목과 함께 실시간 정보를 받습니다.
         """
-        screen_no = get_screen_no()
-        
-        # 받은 argument들을 Open API 인터페이스에 맞도록 다듬어줍니다.
-        if is_add is True:
-            is_add = '1'
-        elif is_add is False:
-            is_add = '0'
-        stock_code_str = ''
+        registrations = self._real_registrations[real_type]
+        if is_add is False:
+            self._unregister_real_time_info(real_type, [stock_code for stock_code in registrations
+                                                        if stock_code not in stock_code_list])
+
+        new_codes = [stock_code for stock_code in dict.fromkeys(stock_code_list)
+                     if frozenset(registrations.get(stock_code, ())) != frozenset(fid_list)]
+        # 받는 정보가 끊기지 않도록 새로운 FID로 먼저 등록한 후 기존 등록을 해제합니다.
+        self._subscriptions.acquire(self._connection, new_codes, fid_list)
+        for stock_code in new_codes:
+            old_fid_list = registrations.get(stock_code)
+            registrations[stock_code] = fid_list
+            if old_fid_list is not None:
+                self._subscriptions.release(self._connection, [stock_code], old_fid_list)
+
+    def _unregister_real_time_info(self, real_type: str, stock_code_list: list[str]) -> None:
+        """
+        이 client가 등록한 종목들의 실시간 등록을 해제합니다.
+
+        Parameters
+        ----------
+        real_type : str
+            해제할 실시간 타입입니다.
+        stock_code_list : list[str]
+            해제할 종목 코드의 리스트입니다.
+        """
+        registrations = self._real_registrations[real_type]
         for stock_code in stock_code_list:
-            stock_code_str += stock_code + ';'
-        fid_str = ''
-        for fid in fid_list:
-            fid_str += fid + ';'
-        
-        # set_real_reg API를 호출합니다.
-        result = self._ocx.set_real_reg(screen_no, stock_code_str, fid_str, is_add)
-        if result == 0:
-            logger.info('실시간 정보가 정상적으로 등록되었습니다.')
-        else:
-            raise RuntimeError(f'등록에 실패하였습니다. err_code - {result}')
+            fid_list = registrations.pop(stock_code, None)
+            if fid_list is not None:
+                self._subscriptions.release(self._connection, [stock_code], fid_list)
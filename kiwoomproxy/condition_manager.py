@@ -0,0 +1,260 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Callable
+
+from .kiwoom_ocx import KiwoomOCX
+from .screen_allocator import ScreenAllocator
+
+logger = logging.getLogger(__name__)
+
+# 조건검색식 목록을 저장하는 파일의 기본 경로와 형식의 버전입니다.
+# 형식이 바뀌면 버전을 올려서 이전 형식의 파일은 사용하지 않도록 합니다.
+DEFAULT_CONDITION_CACHE_PATH = 'condition_list.json'
+CONDITION_CACHE_VERSION = 1
+
+class ConditionStream():
+    """
+    실시간으로 감시중인 조건검색식 하나의 화면번호, 구독한 client, 현재 편입된 종목들을 저장하는 클래스
+    """
+
+    def __init__(self, condition_name: str, condition_index: int, screen_no: str):
+        """
+        Parameters
+        ----------
+        condition_name : str
+            조건검색식의 이름입니다.
+        condition_index : int
+            조건검색식의 인덱스입니다.
+        screen_no : str
+            실시간 조건검색에 사용중인 화면번호입니다.
+        """
+        self.condition_name = condition_name
+        self.condition_index = condition_index
+        self.screen_no = screen_no
+        self.holders = set()
+        # 첫 검색 결과를 받기 전에는 None입니다.
+        self.stock_codes: set[str] | None = None
+
+class ConditionManager():
+    """
+    실시간 조건검색을 조건검색식마다 한 번만 요청하고, 구독한 client가 모두 해제하면 중지하는 클래스
+    """
+
+    def __init__(self, ocx: KiwoomOCX, screens: ScreenAllocator, cache_path: str | None = DEFAULT_CONDITION_CACHE_PATH):
+        """
+        ConditionManager 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            실시간 조건검색을 요청하고 중지할 OCX입니다.
+        screens : ScreenAllocator
+            실시간 조건검색에 사용할 화면번호를 할당하는 객체입니다.
+        cache_path : str | None
+            조건검색식 목록을 저장할 파일의 경로입니다. None이라면 메모리에만 저장합니다.
+        """
+        self._ocx = ocx
+        self._screens = screens
+        self._streams: dict[str, ConditionStream] = {}
+        self._cache_path = cache_path
+        self._condition_list: dict | None = None
+        # 조건검색을 요청하려면 로그인할 때마다 GetConditionLoad가 한 번은 완료되어야 합니다.
+        self.is_loaded = False
+        self._is_loading = False
+        # 로드가 완료되기 전에 들어온 조건검색 요청들의 (client, 조건검색식 이름, 요청 함수)입니다.
+        self._pending: list[tuple[object, str, Callable[[], None]]] = []
+
+    def load(self) -> None:
+        """
+        GetConditionLoad로 조건검색식을 로드합니다.
+        이미 로드 중이라면 다시 요청하지 않고 진행중인 로드의 완료를 기다립니다.
+        """
+        if self._is_loading:
+            return
+        is_success = self._ocx.get_condition_load()
+        if is_success != 1:
+            raise ConnectionError(f'조건 검색식 로드 요청이 실패하였습니다. err_code - {is_success}')
+        logger.info('조건 검색식 로드 요청이 성공하였습니다.')
+        self._is_loading = True
+
+    def when_loaded(self, holder, condition_name: str, request: Callable[[], None]) -> None:
+        """
+        조건검색식이 로드되었다면 조건검색 요청을 바로 실행하고, 아니라면 로드가 완료될 때까지 미룹니다.
+
+        Parameters
+        ----------
+        holder
+            요청한 client입니다. 연결이 끊어지면 미뤄진 요청은 실행되지 않습니다.
+        condition_name : str
+            요청한 조건검색식의 이름입니다.
+        request : Callable[[], None]
+            SendCondition을 요청하는 함수입니다.
+        """
+        if self.is_loaded:
+            request()
+            return
+        self.load()
+        self._pending.append((holder, condition_name, request))
+
+    def take_pending(self) -> list[tuple[object, str, Callable[[], None]]]:
+        """
+        로드가 끝나기를 기다리던 조건검색 요청들을 꺼내서 반환합니다.
+        """
+        pending, self._pending = self._pending, []
+        return pending
+
+    def fail_load(self) -> None:
+        """
+        GetConditionLoad가 실패했음을 기록합니다. 이후의 요청은 다시 로드를 요청합니다.
+        """
+        self._is_loading = False
+
+    def get_condition_list(self, user_id: str) -> list[dict] | None:
+        """
+        저장된 조건검색식 목록을 반환합니다. 메모리에 없다면 파일에서 읽습니다.
+
+        Parameters
+        ----------
+        user_id : str
+            로그인한 사용자의 ID입니다. 다른 사용자의 목록은 사용하지 않습니다.
+
+        Returns
+        -------
+        list[dict] | None
+            {'name', 'index'}의 리스트입니다. 저장된 목록이 없거나 버전이 다르다면 None을 반환합니다.
+        """
+        if self._condition_list is None:
+            self._condition_list = self._read_cache()
+        cached = self._condition_list
+        if cached is None or cached.get('version') != CONDITION_CACHE_VERSION or cached.get('user_id') != user_id:
+            return None
+        return cached['conditions']
+
+    def set_condition_list(self, user_id: str, condition_list: list[dict]) -> None:
+        """
+        GetConditionLoad로 새로 불러온 조건검색식 목록을 메모리와 파일에 저장합니다.
+        기다리던 조건검색 요청들은 take_pending으로 꺼내서 실행해야 합니다.
+        """
+        self.is_loaded = True
+        self._is_loading = False
+        self._condition_list = {
+            'version': CONDITION_CACHE_VERSION,
+            'user_id': user_id,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'conditions': condition_list,
+        }
+        self._write_cache(self._condition_list)
+
+    def _read_cache(self) -> dict | None:
+        if self._cache_path is None or not os.path.exists(self._cache_path):
+            return None
+        try:
+            with open(self._cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f'조건검색식 목록 파일 - {self._cache_path} 을(를) 읽지 못하였습니다.')
+            return None
+
+    def _write_cache(self, cached: dict) -> None:
+        if self._cache_path is None:
+            return
+        # 쓰는 도중에 종료되어도 기존 파일이 깨지지 않도록 임시 파일에 쓴 후 교체합니다.
+        temp_path = self._cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cached, f, ensure_ascii=False)
+            os.replace(temp_path, self._cache_path)
+        except OSError:
+            logger.warning(f'조건검색식 목록 파일 - {self._cache_path} 을(를) 저장하지 못하였습니다.')
+
+    def start(self, holder, condition_name: str, condition_index: int) -> set[str] | None:
+        """
+        holder가 조건검색식의 실시간 편입, 이탈을 받도록 등록합니다.
+        감시중이 아닌 조건검색식이라면 실시간 조건검색을 요청합니다.
+
+        Parameters
+        ----------
+        holder
+            실시간 조건검색을 구독하는 client입니다.
+        condition_name : str
+            조건검색식의 이름입니다.
+        condition_index : int
+            조건검색식의 인덱스입니다.
+
+        Returns
+        -------
+        set[str] | None
+            이미 감시중이라면 현재 편입된 종목들을 반환합니다.
+            첫 검색 결과를 기다리는 중이라면 None을 반환합니다.
+        """
+        stream = self._streams.get(condition_name)
+        if stream is None:
+            screen_no = self._screens.acquire_condition_screen()
+            is_success = self._ocx.send_condition(screen_no, condition_name, condition_index, 1)
+            if is_success != 1:
+                self._screens.release_condition_screen(screen_no)
+                raise RuntimeError(f'실시간 조건검색 요청에 실패하였습니다. err_code - {is_success}')
+            logger.info(f'조건검색식 - {condition_name} 의 실시간 조건검색을 시작하였습니다.')
+            stream = ConditionStream(condition_name, condition_index, screen_no)
+            self._streams[condition_name] = stream
+        stream.holders.add(holder)
+        return None if stream.stock_codes is None else set(stream.stock_codes)
+
+    def stop(self, holder, condition_name: str) -> None:
+        """
+        holder의 실시간 조건검색 구독을 해제합니다. 구독한 client가 남지 않았다면 실시간 조건검색을 중지합니다.
+        """
+        stream = self._streams.get(condition_name)
+        if stream is None:
+            return
+        stream.holders.discard(holder)
+        if not stream.holders:
+            self._stop_stream(stream)
+
+    def release_all(self, holder) -> None:
+        """
+        holder의 모든 실시간 조건검색 구독과 로드를 기다리던 요청을 해제합니다. client의 연결이 끊어졌을 때 호출됩니다.
+        """
+        self._pending = [pending for pending in self._pending if pending[0] is not holder]
+        for condition_name in [name for name, stream in self._streams.items() if holder in stream.holders]:
+            self.stop(holder, condition_name)
+
+    def set_stock_codes(self, condition_name: str, stock_code_list: list[str]) -> None:
+        """
+        실시간 조건검색의 첫 검색 결과를 저장합니다. 감시중이 아닌 조건검색식이라면 무시합니다.
+        """
+        stream = self._streams.get(condition_name)
+        if stream is not None:
+            stream.stock_codes = set(stock_code_list)
+
+    def apply(self, condition_name: str, stock_code: str, is_enter: bool) -> bool:
+        """
+        실시간으로 편입되거나 이탈한 종목을 반영합니다.
+
+        Returns
+        -------
+        bool
+            편입된 종목이 실제로 바뀌었다면 True를 반환합니다. 감시중이 아닌 조건검색식이라면 False를 반환합니다.
+        """
+        stream = self._streams.get(condition_name)
+        if stream is None:
+            return False
+        if stream.stock_codes is None:
+            stream.stock_codes = set()
+        if is_enter:
+            if stock_code in stream.stock_codes:
+                return False
+            stream.stock_codes.add(stock_code)
+        else:
+            if stock_code not in stream.stock_codes:
+                return False
+            stream.stock_codes.discard(stock_code)
+        return True
+
+    def _stop_stream(self, stream: ConditionStream) -> None:
+        self._ocx.send_condition_stop(stream.screen_no, stream.condition_name, stream.condition_index)
+        self._screens.release_condition_screen(stream.screen_no)
+        del self._streams[stream.condition_name]
+        logger.info(f'조건검색식 - {stream.condition_name} 의 실시간 조건검색을 중지하였습니다.')
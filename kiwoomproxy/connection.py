@@ -0,0 +1,344 @@
+import logging
+import itertools
+from collections import OrderedDict, defaultdict
+from typing import Iterator
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtNetwork import QTcpSocket
+
+from .wire import WireProtocol
+from .order_book import OrderBookCache
+from .utils import scope_request_name, unscope_request_name
+
+logger = logging.getLogger(__name__)
+
+# client가 뒤처질 때 버려질 수 있는 실시간 시세 메세지의 type입니다.
+# 그 이외의 메세지(order_result, balance_change, tr_result 등)는 절대 버려지지 않습니다.
+MARKET_DATA_TYPES = ('price_change', 'ask_bid_change', 'ask_bid_delta')
+# 메세지 하나에 전체 값이 담겨있어 최신 값만 남겨도 되는 시세 메세지의 type입니다.
+# ask_bid_delta는 이전 delta들에 누적되어야 하므로 합치지 않고, 버려야 할 때는 같은 종목의 delta들을
+# 모두 버리고 그 자리에 OrderBookCache의 전체 호가를 넣어 client의 호가가 다시 맞춰지도록 합니다.
+SNAPSHOT_TYPES = ('price_change', 'ask_bid_change')
+
+# key가 request_name인 메세지의 type입니다. client에게 전송하기 전에 request_name의 접두사를 제거합니다.
+REQUEST_KEYED_TYPES = ('tr_result', 'tr_page', 'tr_end', 'order_event', 'basket_result', 'trigger_fired',
+                       'request_queued', 'request_error')
+
+_scope_ids = itertools.count(1)
+
+def unscope_message(data_dict: dict) -> dict:
+    """
+    메세지의 key가 proxy 내부의 request_name이라면 client가 보낸 request_name으로 바꾼 메세지를 반환합니다.
+    """
+    if data_dict['type'] not in REQUEST_KEYED_TYPES:
+        return data_dict
+    key = unscope_request_name(data_dict['key'])
+    return data_dict if key == data_dict['key'] else dict(data_dict, key=key)
+
+# conflate - 같은 (type, 종목코드)의 SNAPSHOT_TYPES 메세지는 가장 최신의 것만 대기열에 남깁니다.
+# drop_oldest - 시세 메세지를 합치지 않고, 대기열이 가득 차면 가장 오래된 시세 메세지부터 버립니다.
+SEND_QUEUE_POLICIES = ('conflate', 'drop_oldest')
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_HIGH_WATERMARK = 1 << 20
+
+# 한 번에 모아서 쓰는 frame들의 최대 크기(byte)입니다. 이를 넘으면 즉시 전송합니다.
+MAX_BATCH_BYTES = 1 << 16
+
+# frame을 모으는 시간(ms)입니다. Qt timer의 해상도에 맞춰 ms 단위를 사용합니다.
+# 0이면 Qt event loop가 한 바퀴 도는 동안 만들어진 frame들을 모아서 한 번에 쓰고,
+# 음수이면 모으지 않고 frame마다 즉시 씁니다.
+DEFAULT_FLUSH_INTERVAL_MS = 0
+
+class ClientConnection():
+    """
+    Client와 연결된 socket 하나와 그 socket에서 사용하는 wire protocol을 함께 관리하는 클래스
+    """
+
+    def __init__(self, socket: QTcpSocket, max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+                 high_watermark: int = DEFAULT_HIGH_WATERMARK, policy: str = 'conflate',
+                 flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS, book_cache: OrderBookCache | None = None):
+        """
+        ClientConnection 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        socket : QTcpSocket
+            Client와 연결된 socket입니다.
+            socket은 미리 연결되어있어야 합니다.
+        max_queue_size : int
+            전송 대기열에 쌓일 수 있는 메세지의 최대 개수입니다.
+        high_watermark : int
+            socket의 전송 buffer가 이 크기(byte) 이상이면 메세지를 바로 쓰지 않고 대기열에 쌓습니다.
+        policy : str
+            client가 뒤처질 때 시세 메세지를 처리하는 방식입니다. SEND_QUEUE_POLICIES 중 하나입니다.
+        flush_interval_ms : int
+            frame들을 모아서 한 번에 쓰기까지 기다리는 시간(ms)입니다.
+            지연시간과 처리량 사이의 trade-off를 조절합니다.
+        book_cache : OrderBookCache | None
+            대기열의 ask_bid_delta를 버릴 때 대신 전송할 전체 호가를 가져오는 cache입니다.
+            None이라면 delta만 버려지고, client는 sequence number의 공백으로 이를 알아채고 전체 호가를 다시 요청해야 합니다.
+        """
+        self.socket = socket
+        self._book_cache = book_cache
+        self.protocol = WireProtocol()
+        self._scope_id = next(_scope_ids)
+        self._queue = OrderedDict()
+        self._sequence = 0
+        self._max_depth = 0
+        self._conflated_count = 0
+        self._dropped_counts = defaultdict(int)
+        self._resync_count = 0
+        self._batch = []
+        self._batch_bytes = 0
+        self._write_count = 0
+        self._batched_frame_count = 0
+        self._flush_timer = QTimer()
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setTimerType(Qt.PreciseTimer)
+        self._flush_timer.timeout.connect(self._flush)
+        self.configure_send_queue(max_queue_size, high_watermark, policy)
+        self.set_flush_interval(flush_interval_ms)
+        self.socket.bytesWritten.connect(self._drain)
+
+    def set_flush_interval(self, flush_interval_ms: int) -> None:
+        """
+        frame들을 모아서 한 번에 쓰기까지 기다리는 시간을 변경합니다.
+
+        Parameters
+        ----------
+        flush_interval_ms : int
+            0이면 event loop 한 바퀴 동안의 frame들을 모아서 쓰고,
+            양수이면 그 시간(ms) 동안의 frame들을 모아서 쓰며,
+            음수이면 모으지 않고 즉시 씁니다.
+        """
+        self._flush_interval_ms = flush_interval_ms
+        if flush_interval_ms < 0:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        연결이 끊어진 client에게 더 이상 전송하지 않도록 batch와 전송 대기열을 비웁니다.
+        """
+        self._flush_timer.stop()
+        self._batch = []
+        self._batch_bytes = 0
+        self._queue.clear()
+
+    def configure_send_queue(self, max_queue_size: int, high_watermark: int, policy: str) -> None:
+        """
+        전송 대기열의 설정을 변경합니다.
+
+        Parameters
+        ----------
+        max_queue_size : int
+            전송 대기열에 쌓일 수 있는 메세지의 최대 개수입니다.
+        high_watermark : int
+            socket의 전송 buffer가 이 크기(byte) 이상이면 메세지를 바로 쓰지 않고 대기열에 쌓습니다.
+        policy : str
+            client가 뒤처질 때 시세 메세지를 처리하는 방식입니다. SEND_QUEUE_POLICIES 중 하나입니다.
+        """
+        if policy not in SEND_QUEUE_POLICIES:
+            raise ValueError(f'유효하지 않은 전송 대기열 정책 - {policy} 입니다.')
+        if max_queue_size <= 0 or high_watermark <= 0:
+            raise ValueError('전송 대기열의 크기와 high watermark는 양수여야 합니다.')
+        self._max_queue_size = max_queue_size
+        self._high_watermark = high_watermark
+        self._policy = policy
+
+    def get_send_queue_stats(self) -> dict:
+        """
+        전송 대기열의 현재 상태를 반환합니다.
+
+        Returns
+        -------
+        dict
+            대기열의 깊이, 지금까지의 최대 깊이, socket buffer에 남은 byte 수,
+            합쳐진 메세지의 수, type별로 버려진 메세지의 수와 delta 대신 전체 호가를 넣은 횟수입니다.
+        """
+        return {
+            'policy': self._policy,
+            'depth': len(self._queue),
+            'max_depth': self._max_depth,
+            'bytes_to_write': self.socket.bytesToWrite(),
+            'conflated': self._conflated_count,
+            'dropped': dict(self._dropped_counts),
+            'resynced': self._resync_count,
+            'flush_interval_ms': self._flush_interval_ms,
+            'writes': self._write_count,
+            'batched_frames': self._batched_frame_count,
+        }
+
+    def send(self, data_dict: dict) -> None:
+        """
+        현재 wire mode에 맞게 메세지를 직렬화하여 client에게 전송합니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            전송할 메세지입니다.
+        """
+        data_dict = unscope_message(data_dict)
+        self.send_frame(self.protocol.encode(data_dict), data_dict['type'], data_dict['key'])
+
+    def scope(self, request_name: str) -> str:
+        """
+        client가 보낸 request_name을 다른 client의 같은 이름과 구분되는 proxy 내부의 request_name으로 바꿉니다.
+        """
+        return scope_request_name(self._scope_id, request_name)
+
+    def send_frame(self, frame: bytes, msg_type: str, key: str) -> None:
+        """
+        이미 직렬화된 frame을 client에게 전송합니다.
+
+        client가 데이터를 충분히 빨리 읽지 못해 socket의 전송 buffer가 high watermark를 넘으면
+        frame을 전송 대기열에 쌓아두고 socket이 데이터를 내보낼 때마다 조금씩 전송합니다.
+
+        Parameters
+        ----------
+        frame : bytes
+            현재 wire mode로 직렬화된 frame입니다.
+        msg_type : str
+            frame에 담긴 메세지의 type입니다.
+        key : str
+            frame에 담긴 메세지의 key입니다.
+        """
+        if not self._queue and self._buffered_bytes() < self._high_watermark:
+            if self._flush_interval_ms < 0:
+                self._write(frame)
+            else:
+                self._add_to_batch(frame)
+            return
+        self._enqueue(frame, msg_type, key)
+        self._drain()
+
+    def _buffered_bytes(self) -> int:
+        """
+        아직 client에게 전송되지 않고 socket buffer와 batch에 남아있는 byte 수를 반환합니다.
+        """
+        return self.socket.bytesToWrite() + self._batch_bytes
+
+    def _add_to_batch(self, frame: bytes) -> None:
+        """
+        frame을 batch에 추가하고, 필요하다면 batch를 전송할 timer를 시작합니다.
+        """
+        self._batch.append(frame)
+        self._batch_bytes += len(frame)
+        self._batched_frame_count += 1
+        if self._batch_bytes >= MAX_BATCH_BYTES:
+            self._flush()
+        elif not self._flush_timer.isActive():
+            self._flush_timer.start(self._flush_interval_ms)
+
+    def _flush(self) -> None:
+        """
+        batch에 모인 frame들을 한 번의 write로 전송합니다.
+        """
+        self._flush_timer.stop()
+        if not self._batch:
+            return
+        data = self._batch[0] if len(self._batch) == 1 else b''.join(self._batch)
+        self._batch = []
+        self._batch_bytes = 0
+        self._write(data)
+
+    def _write(self, data: bytes) -> None:
+        """
+        socket에 데이터를 씁니다.
+        """
+        self.socket.write(data)
+        self._write_count += 1
+
+    def _enqueue(self, frame: bytes, msg_type: str, key: str) -> None:
+        """
+        frame을 전송 대기열의 맨 뒤에 추가합니다.
+        정책에 따라 같은 종목의 이전 시세 메세지를 대체하거나 오래된 시세 메세지를 버립니다.
+        """
+        if msg_type in SNAPSHOT_TYPES and self._policy == 'conflate':
+            slot = (msg_type, key)
+            # 이전 메세지의 자리가 아닌 맨 뒤에 넣어야 wire mode 변경 등의 순서가 지켜집니다.
+            if self._queue.pop(slot, None) is not None:
+                self._conflated_count += 1
+        else:
+            slot = self._sequence
+            self._sequence += 1
+        self._queue[slot] = (msg_type, key, frame)
+
+        if len(self._queue) > self._max_queue_size:
+            self._drop_oldest_market_data()
+        self._max_depth = max(self._max_depth, len(self._queue))
+
+    def _drop_oldest_market_data(self) -> None:
+        """
+        전송 대기열에서 가장 오래된 시세 메세지 하나를 버립니다.
+        그 메세지가 ask_bid_delta라면 같은 종목의 delta들을 모두 전체 호가 하나로 바꿉니다.
+        버릴 수 있는 메세지가 없다면 대기열이 최대 크기를 넘더라도 그대로 둡니다.
+        """
+        resynced_codes = set()
+        for slot, (msg_type, key, _) in self._queue.items():
+            if msg_type not in MARKET_DATA_TYPES:
+                continue
+            if msg_type != 'ask_bid_delta':
+                del self._queue[slot]
+                self._dropped_counts[msg_type] += 1
+                logger.debug(f'client가 뒤처져 {msg_type} 메세지를 버렸습니다.')
+                return
+            # delta가 하나뿐인 종목은 전체 호가로 바꿔도 대기열이 줄어들지 않으므로 다음 메세지를 찾습니다.
+            if key not in resynced_codes:
+                resynced_codes.add(key)
+                if self._resync_book(key):
+                    return
+        logger.warning(f'버릴 수 없는 메세지만으로 전송 대기열이 가득 찼습니다. 대기열 깊이 - {len(self._queue)}')
+
+    def _resync_book(self, stock_code: str) -> bool:
+        """
+        대기열에 있는 종목의 ask_bid_delta들을 모두 버리고 대기열의 맨 뒤에 현재 전체 호가를 넣습니다.
+        버려진 delta들은 모두 현재 호가에 반영되어 있으므로 client는 이 전체 호가로 다시 맞춰집니다.
+        전체 호가는 wire mode 변경 이후에 직렬화되므로 맨 뒤에 넣어야 합니다.
+
+        Returns
+        -------
+        bool
+            대기열의 메세지 수가 줄어들었다면 True를 반환합니다.
+        """
+        slots = [slot for slot, (msg_type, key, _) in self._queue.items()
+                 if msg_type == 'ask_bid_delta' and key == stock_code]
+        snapshot = None if self._book_cache is None else self._book_cache.snapshot(stock_code)
+        if snapshot is not None and len(slots) < 2:
+            return False
+        for slot in slots:
+            del self._queue[slot]
+        self._dropped_counts['ask_bid_delta'] += len(slots)
+        if snapshot is None:
+            logger.debug(f'client가 뒤처져 종목 - {stock_code} 의 ask_bid_delta 메세지를 버렸습니다.')
+            return True
+        data_dict = {'type': 'ask_bid_delta', 'key': stock_code,
+                     'value': {'seq': snapshot['seq'], 'changes': None, 'snapshot': snapshot}}
+        self._queue[self._sequence] = ('ask_bid_delta', stock_code, self.protocol.encode(data_dict))
+        self._sequence += 1
+        self._resync_count += 1
+        logger.debug(f'client가 뒤처져 종목 - {stock_code} 의 ask_bid_delta {len(slots)}개를 전체 호가로 바꾸었습니다.')
+        return True
+
+    def _drain(self, unused=None) -> None:
+        """
+        socket의 전송 buffer가 high watermark 아래로 내려갈 때까지 대기열의 frame을 전송합니다.
+        socket의 bytesWritten signal에 의해서도 호출됩니다.
+        """
+        # batch에 있는 frame들이 대기열의 frame들보다 먼저 만들어졌으므로 먼저 전송합니다.
+        self._flush()
+        while self._queue and self.socket.bytesToWrite() < self._high_watermark:
+            _, (_, _, frame) = self._queue.popitem(last=False)
+            self._write(frame)
+
+    def receive(self) -> Iterator[dict]:
+        """
+        socket에 도착한 bytes를 모두 읽고 완성된 메세지들을 차례로 반환합니다.
+
+        Yields
+        ------
+        dict
+            client가 보낸 메세지입니다.
+        """
+        while self.socket.bytesAvailable() > 0:
+            self.protocol.feed(self.socket.readAll().data())
+            yield from self.protocol.messages()
@@ -0,0 +1,295 @@
+import logging
+from collections import defaultdict
+from typing import Callable
+
+from .connection import ClientConnection, unscope_message
+
+logger = logging.getLogger(__name__)
+
+class Hub():
+    """
+    하나의 KiwoomOCX를 여러 client가 공유할 수 있도록 서버의 메세지를 client들에게 분배하는 클래스
+
+    메세지는 (type, key)로 구분되며 다음 세 가지 방식으로 전달됩니다.
+
+    reply - 요청한 client에게만 한 번 전달됩니다. (TR 결과, 조건검색 결과 등)
+    deliver - 주문처럼 소유자가 있는 메세지를 소유자에게 전달합니다.
+    publish - 실시간 정보를 구독한 client들에게만 전달됩니다.
+
+    받을 client가 없는 reply와 deliver 메세지는 다른 client의 데이터가 섞이지 않도록 버려집니다.
+    """
+
+    def __init__(self):
+        self._connections: list[ClientConnection] = []
+        self._requesters: dict[tuple[str, str], list[ClientConnection]] = defaultdict(list)
+        self._owners: dict[tuple[str, str], ClientConnection] = {}
+        # 구독한 client마다 받고 싶은 항목들의 집합을 저장합니다.
+        self._subscribers: dict[tuple[str, str], dict[ClientConnection, frozenset]] = defaultdict(dict)
+        self._field_unions: dict[tuple[str, str], frozenset] = {}
+
+    def add_client(self, connection: ClientConnection) -> None:
+        """
+        새로 연결된 client를 등록합니다.
+
+        Parameters
+        ----------
+        connection : ClientConnection
+            새로 연결된 client의 connection입니다.
+        """
+        self._connections.append(connection)
+        logger.info(f'client가 연결되었습니다. 현재 client 수 - {len(self._connections)}')
+
+    def remove_client(self, connection: ClientConnection) -> None:
+        """
+        연결이 끊어진 client와 관련된 모든 요청, 소유권, 구독을 제거합니다.
+
+        Parameters
+        ----------
+        connection : ClientConnection
+            연결이 끊어진 client의 connection입니다.
+        """
+        if connection in self._connections:
+            self._connections.remove(connection)
+        for requesters in self._requesters.values():
+            while connection in requesters:
+                requesters.remove(connection)
+        for key in [key for key, owner in self._owners.items() if owner is connection]:
+            del self._owners[key]
+        for subscription_key, subscribers in self._subscribers.items():
+            if subscribers.pop(connection, None) is not None:
+                self._field_unions.pop(subscription_key, None)
+        logger.info(f'client의 연결이 끊어졌습니다. 현재 client 수 - {len(self._connections)}')
+
+    def expect(self, msg_type: str, key: str, connection: ClientConnection) -> None:
+        """
+        (msg_type, key) 메세지를 기다리는 client를 등록합니다.
+
+        Parameters
+        ----------
+        msg_type : str
+            기다리는 메세지의 type입니다.
+        key : str
+            기다리는 메세지의 key입니다. TR 결과의 경우 request_name입니다.
+        connection : ClientConnection
+            메세지를 기다리는 client입니다.
+        """
+        self._requesters[(msg_type, key)].append(connection)
+
+    def requester_of(self, msg_type: str, key: str) -> ClientConnection | None:
+        """
+        (msg_type, key) 메세지를 기다리고 있는 첫번째 client를 반환합니다.
+
+        Returns
+        -------
+        ClientConnection | None
+            기다리는 client가 없다면 None을 반환합니다.
+        """
+        requesters = self._requesters.get((msg_type, key))
+        return requesters[0] if requesters else None
+
+    def set_owner(self, msg_type: str, key: str, connection: ClientConnection) -> None:
+        """
+        (msg_type, key) 메세지의 소유자를 지정합니다.
+        release_owner가 호출되기 전까지 해당 메세지는 소유자에게만 전달됩니다.
+        """
+        self._owners[(msg_type, key)] = connection
+
+    def owner_of(self, msg_type: str, key: str) -> ClientConnection | None:
+        """
+        (msg_type, key) 메세지의 소유자를 반환합니다. 소유자가 없다면 None을 반환합니다.
+        """
+        return self._owners.get((msg_type, key))
+
+    def release_owner(self, msg_type: str, key: str) -> None:
+        """
+        (msg_type, key) 메세지의 소유자 지정을 해제합니다.
+        """
+        self._owners.pop((msg_type, key), None)
+
+    def subscribe(self, msg_type: str, key: str, connection: ClientConnection, fields: frozenset) -> None:
+        """
+        client가 (msg_type, key) 실시간 메세지를 받도록 구독합니다.
+        이미 구독중이라면 받고 싶은 항목들만 변경됩니다.
+
+        Parameters
+        ----------
+        msg_type : str
+            실시간 메세지의 type입니다. ex) 'price_change'
+        key : str
+            실시간 메세지의 key입니다. 보통 종목코드입니다.
+        connection : ClientConnection
+            구독하는 client입니다.
+        fields : frozenset
+            client가 받고 싶은 항목들의 이름입니다.
+        """
+        self._subscribers[(msg_type, key)][connection] = frozenset(fields)
+        self._field_unions.pop((msg_type, key), None)
+
+    def unsubscribe(self, msg_type: str, key: str, connection: ClientConnection) -> None:
+        """
+        client의 (msg_type, key) 실시간 메세지 구독을 해제합니다.
+        """
+        subscribers = self._subscribers.get((msg_type, key))
+        if subscribers is not None and subscribers.pop(connection, None) is not None:
+            self._field_unions.pop((msg_type, key), None)
+
+    def unsubscribe_all(self, msg_type: str, connection: ClientConnection) -> list[str]:
+        """
+        client가 구독한 msg_type의 모든 실시간 메세지 구독을 해제합니다.
+
+        Returns
+        -------
+        list[str]
+            구독이 해제된 메세지의 key들입니다.
+        """
+        keys = []
+        for subscription_key, subscribers in self._subscribers.items():
+            if subscription_key[0] == msg_type and subscribers.pop(connection, None) is not None:
+                self._field_unions.pop(subscription_key, None)
+                keys.append(subscription_key[1])
+        return keys
+
+    def move_subscriptions(self, msg_type: str, new_msg_type: str, connection: ClientConnection) -> None:
+        """
+        client가 구독한 msg_type의 실시간 메세지들을 같은 항목으로 new_msg_type에 다시 구독합니다.
+        """
+        moved = {key: subscribers[connection] for (subscribed_type, key), subscribers in self._subscribers.items()
+                 if subscribed_type == msg_type and connection in subscribers}
+        self.unsubscribe_all(msg_type, connection)
+        for key, fields in moved.items():
+            self.subscribe(new_msg_type, key, connection, fields)
+
+    def has_subscribers(self, msg_type: str, key: str) -> bool:
+        """
+        (msg_type, key) 실시간 메세지를 구독한 client가 있는지 확인합니다.
+        """
+        return len(self._subscribers.get((msg_type, key), ())) > 0
+
+    def keys_of(self, msg_type: str) -> set[str]:
+        """
+        구독한 client가 있는 msg_type 실시간 메세지의 key들을 반환합니다.
+        """
+        return {key for (subscribed_type, key), subscribers in self._subscribers.items()
+                if subscribed_type == msg_type and subscribers}
+
+    def fields_of(self, msg_type: str, key: str) -> frozenset:
+        """
+        (msg_type, key) 실시간 메세지를 구독한 client들이 받고 싶은 항목들의 합집합을 반환합니다.
+        합집합은 구독이 변경될 때까지 저장되어 재사용됩니다.
+        """
+        subscription_key = (msg_type, key)
+        fields = self._field_unions.get(subscription_key)
+        if fields is None:
+            fields = frozenset().union(*self._subscribers.get(subscription_key, {}).values())
+            self._field_unions[subscription_key] = fields
+        return fields
+
+    def reply(self, data_dict: dict) -> None:
+        """
+        메세지를 기다리고 있던 client들에게 전달합니다.
+        기다리는 client가 없다면 (연결이 끊어졌다면) 기록하고 버립니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            'type'과 'key'를 가진 메세지입니다.
+        """
+        requesters = self._requesters.pop((data_dict['type'], data_dict['key']), None)
+        if requesters:
+            self._send(requesters, data_dict)
+        else:
+            logger.info(f'기다리는 client가 없는 메세지 - ({data_dict["type"]}, {data_dict["key"]}) 을(를) 버립니다.')
+
+    def fail(self, msg_type: str, key: str, error: Exception) -> None:
+        """
+        (msg_type, key) 메세지를 기다리던 client들에게 메세지 대신 request_error를 전달하고 기다림을 해제합니다.
+        요청이 실패하여 메세지가 오지 않을 때 호출합니다.
+
+        Parameters
+        ----------
+        msg_type : str
+            기다리던 메세지의 type입니다.
+        key : str
+            기다리던 메세지의 key입니다. 보통 request_name입니다.
+        error : Exception
+            요청이 실패한 이유입니다.
+        """
+        requesters = self._requesters.pop((msg_type, key), None)
+        if requesters:
+            self._send(requesters, {'type': 'request_error', 'key': key, 'value': str(error)})
+
+    def deliver(self, data_dict: dict) -> None:
+        """
+        메세지를 소유자에게 전달합니다.
+        소유자가 없다면 기록하고 버립니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            'type'과 'key'를 가진 메세지입니다.
+        """
+        owner = self._owners.get((data_dict['type'], data_dict['key']))
+        if owner is not None:
+            self._send([owner], data_dict)
+        else:
+            logger.info(f'소유자가 없는 메세지 - ({data_dict["type"]}, {data_dict["key"]}) 을(를) 버립니다.')
+
+    def publish(self, data_dict: dict) -> None:
+        """
+        실시간 메세지를 구독한 client들에게만 전달합니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            'type'과 'key'를 가진 메세지입니다.
+        """
+        subscribers = self._subscribers.get((data_dict['type'], data_dict['key']))
+        if subscribers:
+            self._send(subscribers, data_dict)
+
+    def publish_fields(self, data_dict: dict, project: Callable[[dict, frozenset], dict] | None = None) -> None:
+        """
+        실시간 메세지를 구독한 client마다 받고 싶은 항목들만 골라서 전달합니다.
+        같은 항목들을 구독한 client들에게는 한 번만 직렬화됩니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            'type'과 'key', 그리고 fields_of의 항목들의 값을 가진 'value'로 이루어진 메세지입니다.
+        project : Callable[[dict, frozenset], dict] | None
+            value와 client가 받고 싶은 항목들로 그 client에게 전달할 value를 만드는 함수입니다.
+            None이라면 value는 항목 이름을 key로 가진 dict이며, 받고 싶은 항목들만 남깁니다.
+        """
+        subscribers = self._subscribers.get((data_dict['type'], data_dict['key']))
+        if not subscribers:
+            return
+        value = data_dict['value']
+        groups: dict[frozenset, list[ClientConnection]] = defaultdict(list)
+        for connection, fields in subscribers.items():
+            groups[fields].append(connection)
+        for fields, connections in groups.items():
+            if project is not None:
+                self._send(connections, {**data_dict, 'value': project(value, fields)})
+            elif fields.issuperset(value):
+                self._send(connections, data_dict)
+            else:
+                projected = {name: item for name, item in value.items() if name in fields}
+                self._send(connections, {**data_dict, 'value': projected})
+
+    def broadcast(self, data_dict: dict) -> None:
+        """
+        메세지를 연결된 모든 client에게 전달합니다.
+        """
+        self._send(self._connections, data_dict)
+
+    def _send(self, connections, data_dict: dict) -> None:
+        """
+        메세지를 (wire mode, schema mode)별로 한 번씩만 직렬화하여 여러 client에게 전송합니다.
+        """
+        data_dict = unscope_message(data_dict)
+        frames = {}
+        for connection in list(connections):
+            frame_format = connection.protocol.format
+            if frame_format not in frames:
+                frames[frame_format] = connection.protocol.encode(data_dict)
+            connection.send_frame(frames[frame_format], data_dict['type'], data_dict['key'])
@@ -100,6 +100,21 @@ class KiwoomOCX(QAxWidget):
         result = self.dynamicCall('SendCondition(QString, Qstring, int, int)', screen_no, condition_name, condition_index, request_type)
         return result
 
+    def send_condition_stop(self, screen_no: str, condition_name: str, condition_index: int) -> None:
+        """
+        실시간 조건검색을 중지합니다.
+
+        Parameters
+        ----------
+        screen_no : str
+            실시간 조건검색을 요청한 화면번호입니다.
+        condition_name : str
+            조건검색식의 이름입니다.
+        condition_index : int
+            조건검색식의 인덱스입니다.
+        """
+        self.dynamicCall('SendConditionStop(QString, QString, int)', screen_no, condition_name, condition_index)
+
     def set_input_value(self, input_name: str, input_value: str) -> None:
         """
         TR 데이터 조회를 위해 이와 관련된 입력 값을 설정하는 함수입니다.
@@ -136,6 +151,35 @@ class KiwoomOCX(QAxWidget):
         result = self.dynamicCall('CommRqData(Qstring, Qstring, int, Qstring)', request_name, tr_code, request_type, screen_no)
         return result
 
+    def comm_kw_rq_data(self, stock_codes: str, is_next: bool, code_count: int, type_flag: int,
+                        request_name: str, screen_no: str) -> int:
+        """
+        여러 종목의 관심종목 정보(OPTKWFID)를 한 번에 요청합니다.
+
+        Parameters
+        ----------
+        stock_codes : str
+            요청할 종목 코드의 목록입니다. ';'로 구분되어있으며 최대 100개입니다.
+        is_next : bool
+            연속 조회 여부입니다.
+        code_count : int
+            종목 코드의 개수입니다.
+        type_flag : int
+            0일시 주식 종목을, 3일시 선물옵션 종목을 의미합니다.
+        request_name : str
+            요청 이름입니다. unique 해야합니다.
+        screen_no : str
+            화면 번호입니다.
+
+        Returns
+        -------
+        int
+            정상적으로 요청되었을 시 0을 반환합니다. 실패했을 경우 그 이외의 값을 반환합니다.
+        """
+        result = self.dynamicCall('CommKwRqData(QString, bool, int, int, QString, QString)',
+                                  stock_codes, is_next, code_count, type_flag, request_name, screen_no)
+        return result
+
     def send_order(self, order_name: str, screen_no: str, account_number: str, order_type: int, 
                    stock_code: str, amount: int, price: int, how: str, original_order_number: str) -> int:
         """
@@ -200,6 +244,30 @@ class KiwoomOCX(QAxWidget):
         result = self.dynamicCall('SetRealReg(Qstring, Qstring, Qstring, Qstring)', screen_no, stock_codes, fids, is_add)
         return result
 
+    def set_real_remove(self, screen_no: str, stock_code: str) -> None:
+        """
+        화면번호에 등록된 종목의 실시간 정보 등록을 해제합니다.
+
+        Parameters
+        ----------
+        screen_no : str
+            종목이 등록된 화면번호입니다. 'ALL'일시 모든 화면에서 해제합니다.
+        stock_code : str
+            등록을 해제할 종목 코드입니다. 'ALL'일시 화면의 모든 종목을 해제합니다.
+        """
+        self.dynamicCall('SetRealRemove(QString, QString)', screen_no, stock_code)
+
+    def disconnect_real_data(self, screen_no: str) -> None:
+        """
+        화면번호에 등록된 모든 실시간 정보의 등록을 해제합니다.
+
+        Parameters
+        ----------
+        screen_no : str
+            등록을 해제할 화면번호입니다.
+        """
+        self.dynamicCall('DisconnectRealData(QString)', screen_no)
+
     def get_comm_data(self, tr_code: str, request_name: str, index: int, data_name: str) -> str:
         """
         TR 요청에 따른 데이터를 가져옵니다.
@@ -224,6 +292,26 @@ class KiwoomOCX(QAxWidget):
         data = self.dynamicCall('GetCommData(QString, Qstring, int, Qstring)', tr_code, request_name, index, data_name)
         return data
     
+    def get_comm_data_ex(self, tr_code: str, record_name: str) -> list[list[str]]:
+        """
+        TR 요청에 따른 멀티 데이터 전체를 한 번에 가져옵니다.
+        tr_data_handler에서 호출됩니다.
+
+        Parameters
+        ----------
+        tr_code : str
+            TR 데이터의 코드입니다.
+        record_name : str
+            멀티 데이터의 레코드 이름입니다.
+
+        Returns
+        -------
+        list[list[str]]
+            행마다 멀티 데이터의 모든 항목이 KOA Studio에 정의된 순서대로 들어있는 2차원 리스트입니다.
+        """
+        data = self.dynamicCall('GetCommDataEx(QString, QString)', tr_code, record_name)
+        return data
+
     def get_repeat_cnt(self, tr_code: str, tr_name: str) -> int:
         """
         멀티데이터를 다 받기 위해서 가져와야 할 횟수를 반환합니다.\n
@@ -0,0 +1,146 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 이 횟수만큼 호가가 변경될 때마다 delta 대신 전체 호가를 전송하여 client가 재동기화할 수 있도록 합니다.
+DEFAULT_SNAPSHOT_INTERVAL = 100
+
+# 종목마다 저장하는 호가의 최대 차선 수입니다.
+MAX_BOOK_DEPTH = 10
+
+BID = 0
+ASK = 1
+
+class OrderBook():
+    """
+    한 종목의 10차선 호가를 고정된 크기의 배열에 저장하는 클래스
+
+    배열은 실시간 데이터의 추출 순서와 같이 매수호가, 매수호가 수량, 매도호가, 매도호가 수량이
+    MAX_BOOK_DEPTH개씩 배치되며, 호가가 들어올 때마다 새로 만들지 않고 제자리에서 갱신됩니다.
+    """
+
+    __slots__ = ('levels', 'depth', 'seq')
+
+    def __init__(self):
+        self.levels: list = [None] * (4 * MAX_BOOK_DEPTH)
+        # 실시간 데이터로 채워진 차선 수입니다. 구독한 차선 수가 적다면 10보다 작을 수 있습니다.
+        self.depth = 0
+        self.seq = 0
+
+    def side(self, side: int) -> list[tuple]:
+        """
+        채워진 차선까지의 (호가, 수량)의 리스트를 반환합니다.
+        """
+        price_offset = 2 * side * MAX_BOOK_DEPTH
+        volume_offset = price_offset + MAX_BOOK_DEPTH
+        levels = self.levels
+        return [(levels[price_offset + index], levels[volume_offset + index]) for index in range(self.depth)]
+
+class OrderBookCache():
+    """
+    구독중인 종목별로 호가를 메모리에 유지하고, 변경된 호가와 sequence number를 계산하는 클래스
+
+    실시간 호가가 들어올 때마다 갱신되므로 구독중인 종목의 현재 호가는 TR 요청 없이 바로 조회할 수 있습니다.
+    """
+
+    def __init__(self, snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL):
+        """
+        OrderBookCache 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        snapshot_interval : int
+            몇 번의 변경마다 전체 호가를 전송할지 나타냅니다.
+        """
+        self.snapshot_interval = snapshot_interval
+        self._books: dict[str, OrderBook] = {}
+
+    def update(self, stock_code: str, values: list) -> tuple[int, list]:
+        """
+        새로운 호가로 저장된 호가를 갱신하고 변경된 호가를 반환합니다.
+
+        Parameters
+        ----------
+        stock_code : str
+            종목 코드입니다.
+        values : list
+            1차선부터 구독한 차선까지의 매수호가, 매수호가 수량, 매도호가, 매도호가 수량이
+            차선 수만큼씩 배치된 리스트입니다. 주식호가잔량 plan이 추출한 값과 같습니다.
+
+        Returns
+        -------
+        tuple[int, list]
+            변경 이후의 sequence number와 변경된 호가의 리스트를 반환합니다.
+            변경된 호가는 [구분(0: 매수, 1: 매도), 차선 인덱스, 호가, 수량]입니다.
+            변경된 호가가 없다면 sequence number는 증가하지 않습니다.
+        """
+        book = self._books.get(stock_code)
+        if book is None:
+            book = OrderBook()
+            self._books[stock_code] = book
+        depth = len(values) // 4
+        # 구독한 호가 차선 수가 바뀌었다면 채워지지 않은 차선은 비워서 오래된 호가가 남지 않게 합니다.
+        if depth != book.depth:
+            book.levels[:] = [None] * (4 * MAX_BOOK_DEPTH)
+            book.depth = depth
+
+        levels = book.levels
+        changes = []
+        for side in (BID, ASK):
+            price_offset = 2 * side * MAX_BOOK_DEPTH
+            volume_offset = price_offset + MAX_BOOK_DEPTH
+            value_offset = 2 * side * depth
+            for index in range(depth):
+                price = values[value_offset + index]
+                volume = values[value_offset + depth + index]
+                if levels[price_offset + index] != price or levels[volume_offset + index] != volume:
+                    levels[price_offset + index] = price
+                    levels[volume_offset + index] = volume
+                    changes.append([side, index, price, volume])
+        if changes:
+            book.seq += 1
+        return book.seq, changes
+
+    def remove(self, stock_code: str) -> None:
+        """
+        종목의 저장된 호가를 버립니다. 다시 구독할 때 오래된 호가가 조회되지 않도록 호출합니다.
+        """
+        self._books.pop(stock_code, None)
+
+    def depth_of(self, stock_code: str) -> int:
+        """
+        종목의 저장된 호가 차선 수를 반환합니다. 호가를 받은 적이 없다면 0을 반환합니다.
+        """
+        book = self._books.get(stock_code)
+        return 0 if book is None else book.depth
+
+    def is_snapshot_due(self, stock_code: str) -> bool:
+        """
+        현재 sequence number에서 주기적인 전체 호가를 전송해야 하는지 확인합니다.
+        """
+        book = self._books.get(stock_code)
+        return (0 if book is None else book.seq) % self.snapshot_interval == 0
+
+    def snapshot(self, stock_code: str) -> dict | None:
+        """
+        종목의 마지막 호가 전체를 반환합니다.
+
+        Parameters
+        ----------
+        stock_code : str
+            종목 코드입니다.
+
+        Returns
+        -------
+        dict | None
+            sequence number와 매수, 매도 호가정보를 담은 dict입니다.
+            아직 호가를 받은 적이 없는 종목이라면 None을 반환합니다.
+        """
+        book = self._books.get(stock_code)
+        if book is None or book.depth == 0:
+            return None
+        return {
+            'seq': book.seq,
+            '매수호가정보': book.side(BID),
+            '매도호가정보': book.side(ASK),
+        }
@@ -0,0 +1,384 @@
+import logging
+from collections import deque
+from typing import Callable
+
+from .utils import clean_string, clean_integer, unscope_request_name
+
+logger = logging.getLogger(__name__)
+
+# 주문의 상태입니다. 같은 이름의 event가 상태가 바뀔 때마다 client에게 전달됩니다.
+ACCEPTED = 'accepted'
+PARTIAL = 'partial'
+FILLED = 'filled'
+CANCELLED = 'cancelled'
+AMENDED = 'amended'
+REJECTED = 'rejected'
+CLOSED_STATES = (FILLED, CANCELLED, AMENDED, REJECTED)
+# 접수되었지만 아직 확인되지 않은 정정, 취소 주문의 상태입니다. event로 전달되지는 않습니다.
+PENDING = 'pending'
+
+# 완료된 주문 이후에 늦게 도착하는 체결 데이터를 무시하기 위해 기억하는 주문번호의 수입니다.
+MAX_CLOSED_ORDERS = 1000
+
+def _integer(value: str) -> int:
+    # 체결 데이터의 수량과 가격은 빈 문자열로 전달되기도 하므로 0으로 취급합니다.
+    return clean_integer(value) or 0
+
+def _stock_code(value: str) -> str:
+    # 체결 데이터의 종목코드 맨 앞에는 주식의 구분 알파벳이 붙어있습니다.
+    stock_code = clean_string(value)
+    return stock_code[1:] if stock_code[:1].isalpha() else stock_code
+
+class Order():
+    """
+    주문번호 하나의 현재 상태와 체결 현황을 저장하는 클래스
+    """
+
+    __slots__ = ('order_number', 'stock_code', 'stock_name', 'order_type', 'order_amount', 'order_price',
+                 'nontraded_amount', 'original_order_number', 'state', 'last_price', 'last_amount',
+                 'pending_amendment')
+
+    def __init__(self, order_number: str, stock_code: str, stock_name: str, order_type: str, order_amount: int,
+                 order_price: int, nontraded_amount: int, original_order_number: str):
+        self.order_number = order_number
+        self.stock_code = stock_code
+        self.stock_name = stock_name
+        self.order_type = order_type
+        self.order_amount = order_amount
+        self.order_price = order_price
+        self.nontraded_amount = nontraded_amount
+        self.original_order_number = original_order_number
+        # 정정, 취소 주문은 확인되기 전까지 미체결 주문이 아닙니다.
+        self.state = PENDING if self.is_amendment else ACCEPTED
+        # 마지막 체결의 단위체결가와 단위체결량입니다.
+        self.last_price = 0
+        self.last_amount = 0
+        # 이 주문에 대해 접수된 정정 혹은 취소 주문의 주문구분 끝자리('정정', '취소')입니다.
+        self.pending_amendment: str | None = None
+
+    @property
+    def traded_amount(self) -> int:
+        return self.order_amount - self.nontraded_amount
+
+    @property
+    def is_amendment(self) -> bool:
+        """
+        다른 주문을 정정하거나 취소하는 주문인지 나타냅니다.
+        """
+        return self.order_type.endswith('취소') or self.order_type.endswith('정정')
+
+    @property
+    def is_cancel(self) -> bool:
+        return self.order_type.endswith('취소')
+
+    def to_dict(self) -> dict:
+        return {
+            '주문번호': self.order_number,
+            '종목코드': self.stock_code,
+            '종목명': self.stock_name,
+            '주문구분': self.order_type,
+            '주문수량': self.order_amount,
+            '주문가격': self.order_price,
+            '미체결수량': self.nontraded_amount,
+            '누적체결량': self.traded_amount,
+            '원주문번호': self.original_order_number,
+            '상태': self.state,
+        }
+
+    def to_event(self, event: str) -> dict:
+        """
+        client에게 전달할 order_event의 value를 반환합니다. 체결가와 체결량은 이번 체결의 값입니다.
+        """
+        event_dict = self.to_dict()
+        del event_dict['상태']
+        event_dict['event'] = event
+        event_dict['체결가'] = self.last_price
+        event_dict['체결량'] = self.last_amount
+        return event_dict
+
+class OrderBasket():
+    """
+    send_orders로 함께 전송된 주문들이 모두 완료되었는지 확인하는 클래스
+    """
+
+    def __init__(self, request_name: str, request_names: list[str]):
+        """
+        OrderBasket 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        request_name : str
+            basket의 request_name입니다. 모든 주문이 완료되면 이 이름으로 basket_result가 전달됩니다.
+        request_names : list[str]
+            basket에 포함된 주문들의 request_name입니다.
+        """
+        self.request_name = request_name
+        # 주문별로 주문번호, 완료된 상태, 누적체결량을 전송한 순서대로 저장합니다.
+        self.results = {name: {'request_name': unscope_request_name(name), '주문번호': '', '상태': None,
+                               '누적체결량': 0} for name in request_names}
+        self._remaining = len(self.results)
+
+    @property
+    def is_done(self) -> bool:
+        return self._remaining == 0
+
+    def settle(self, request_name: str, state: str, traded_amount: int) -> None:
+        """
+        basket에 포함된 주문 하나의 완료를 기록합니다.
+        """
+        result = self.results[request_name]
+        if result['상태'] is None:
+            result['상태'] = state
+            result['누적체결량'] = traded_amount
+            self._remaining -= 1
+
+    def to_dict(self) -> dict:
+        """
+        client에게 전달할 basket_result의 value를 반환합니다. 주문별 결과와 상태별 주문 수를 담습니다.
+        """
+        orders = list(self.results.values())
+        counts = {state: sum(order['상태'] == state for order in orders) for state in CLOSED_STATES}
+        return {'orders': orders, **counts}
+
+class OrderTracker():
+    """
+    체결 데이터로 주문번호별 주문의 상태를 관리하고 상태가 바뀔 때마다 event를 만드는 클래스
+
+    주문상태를 먼저 읽고, 그 상태를 처리하는데 필요한 FID만 OCX로부터 가져옵니다.
+    이미 알고 있는 주문이라면 변하지 않는 항목은 다시 가져오지 않습니다.
+    """
+
+    def __init__(self):
+        self._orders: dict[str, Order] = {}
+        self._closed = deque(maxlen=MAX_CLOSED_ORDERS)
+        # 완료된 주문번호의 상태와 누적체결량입니다.
+        self._closed_states: dict[str, tuple[str, int]] = {}
+        # 주문번호를 받기 전에는 request_name으로, 받은 후에는 주문번호로 basket을 찾습니다.
+        self._basket_requests: dict[str, OrderBasket] = {}
+        self._basket_orders: dict[str, tuple[OrderBasket, str]] = {}
+        self._completed_baskets: list[OrderBasket] = []
+        # 전송했지만 주문 TR의 응답을 아직 받지 못한 주문들의 request_name입니다.
+        self._unacknowledged: set[str] = set()
+
+    def apply(self, read: Callable[[str], str]) -> tuple[str, Order | None, list[dict]]:
+        """
+        체결 관련 데이터 하나를 반영합니다.
+
+        Parameters
+        ----------
+        read : Callable[[str], str]
+            FID의 한글 이름을 받아 체결 데이터의 값을 반환하는 함수입니다.
+
+        Returns
+        -------
+        tuple[str, Order | None, list[dict]]
+            주문상태, 데이터가 가리키는 주문, 그리고 client에게 전달할 order_event의 value들입니다.
+            이미 완료된 주문의 늦은 데이터라면 주문은 None입니다.
+        """
+        order_status = clean_string(read('주문상태'))
+        order_number = clean_string(read('주문번호'))
+        if order_number in self._closed_states:
+            return order_status, None, []
+
+        order = self._orders.get(order_number)
+        is_new = order is None
+        if is_new and order_status == '거부':
+            # 접수되기 전에 거부된 주문은 접수 event 없이 거부로 완료됩니다.
+            order = self._read_order(order_number, read)
+            self._orders[order_number] = order
+            return order_status, order, [self._close(order, REJECTED)]
+        if is_new:
+            order = self._read_order(order_number, read)
+            self._orders[order_number] = order
+            events = [order.to_event(ACCEPTED)]
+            # 원주문의 미체결이 정리될 때 취소된 것인지 정정된 것인지 구분하기 위해 기록합니다.
+            original = self._orders.get(order.original_order_number) if order.is_amendment else None
+            if original is not None:
+                original.pending_amendment = order.order_type[-2:]
+        else:
+            events = []
+
+        if order_status == '접수':
+            if is_new:
+                return order_status, order, events
+            nontraded_amount = _integer(read('미체결수량'))
+            # 정정, 취소되어 미체결이 정리된 주문은 잔량이 0인 접수로 다시 들어옵니다.
+            if order.state != PENDING and order.nontraded_amount > 0 and nontraded_amount == 0:
+                order.nontraded_amount = 0
+                events.append(self._close(order, AMENDED if order.pending_amendment == '정정' else CANCELLED))
+            elif order.state == PENDING:
+                order.nontraded_amount = nontraded_amount
+
+        elif order_status == '체결':
+            if not is_new:
+                order.nontraded_amount = _integer(read('미체결수량'))
+            order.last_price = _integer(read('단위체결가'))
+            order.last_amount = _integer(read('단위체결량'))
+            if order.nontraded_amount == 0:
+                events.append(self._close(order, FILLED))
+            else:
+                order.state = PARTIAL
+                events.append(order.to_event(PARTIAL))
+
+        elif order_status == '확인':
+            if not order.is_amendment:
+                raise NotImplementedError(f'예상치 못한 주문구분 - {order.order_type} 입니다.')
+            events.extend(self._confirm_amendment(order))
+
+        elif order_status == '거부':
+            original = self._orders.get(order.original_order_number) if order.is_amendment else None
+            if original is not None:
+                original.pending_amendment = None
+            events.append(self._close(order, REJECTED))
+
+        else:
+            raise NotImplementedError(f'확인되지 않은 주문 상태 - {order_status}입니다.')
+        return order_status, order, events
+
+    def seed(self, rows: list[dict]) -> None:
+        """
+        proxy가 실행되기 전에 접수된 미체결 주문들을 미체결 조회 결과로 추가합니다.
+        이미 알고 있는 주문은 체결 데이터가 더 최신이므로 변경하지 않습니다.
+
+        Parameters
+        ----------
+        rows : list[dict]
+            opt10075의 결과입니다.
+        """
+        for row in rows:
+            order_number = row['주문번호']
+            if order_number in self._orders or order_number in self._closed_states or not row['미체결수량']:
+                continue
+            order = Order(order_number, row['종목코드'], row['종목명'], row['주문구분'], row['주문수량'],
+                          row['주문가격'], row['미체결수량'], row['원주문번호'])
+            # 미체결 조회에 나오는 정정 주문은 이미 확인된 주문입니다.
+            order.state = PARTIAL if order.traded_amount > 0 else ACCEPTED
+            self._orders[order_number] = order
+        missing = [order.order_number for order in self.open_orders()
+                   if order.order_number not in {row['주문번호'] for row in rows}]
+        if missing:
+            logger.warning(f'미체결 조회 결과에 없는 미체결 주문이 있습니다. 주문번호 - {missing}')
+
+    def open_orders(self) -> list[Order]:
+        """
+        체결되거나 취소되지 않은 주문들을 접수된 순서대로 반환합니다.
+        취소 주문과 확인되지 않은 정정 주문은 포함하지 않으며, 확인된 정정 주문은 원주문을 대신합니다.
+        """
+        return [order for order in self._orders.values() if order.state in (ACCEPTED, PARTIAL)]
+
+    def get(self, order_number: str) -> Order | None:
+        return self._orders.get(order_number)
+
+    def is_closed(self, order_number: str) -> bool:
+        """
+        체결, 취소, 정정, 거부로 완료된 주문번호인지 확인합니다.
+        """
+        return order_number in self._closed_states
+
+    def submit(self, request_name: str) -> None:
+        """
+        주문 TR의 응답을 기다리는 주문을 등록합니다. acknowledge가 호출될 때까지 기다리는 것으로 간주됩니다.
+        """
+        self._unacknowledged.add(request_name)
+
+    def has_unacknowledged(self) -> bool:
+        """
+        주문 TR의 응답을 기다리는 주문이 있는지 확인합니다.
+        그 동안 도착한 모르는 주문번호의 체결 데이터는 기다리는 주문의 것일 수 있습니다.
+        """
+        return bool(self._unacknowledged)
+
+    def add_basket(self, basket: OrderBasket) -> None:
+        """
+        주문번호를 받기 전의 basket을 등록합니다.
+        """
+        for request_name in basket.results:
+            self._basket_requests[request_name] = basket
+
+    def acknowledge(self, request_name: str, order_number: str) -> None:
+        """
+        주문 TR의 응답을 받았음을 등록하고, basket에 포함된 주문이라면 주문번호를 등록합니다.
+
+        Parameters
+        ----------
+        request_name : str
+            주문의 request_name입니다.
+        order_number : str
+            주문 TR의 응답으로 받은 주문번호입니다. 빈 문자열이라면 주문이 거부된 것입니다.
+        """
+        self._unacknowledged.discard(request_name)
+        basket = self._basket_requests.pop(request_name, None)
+        if basket is None:
+            return
+        basket.results[request_name]['주문번호'] = order_number
+        # 주문 TR의 응답보다 체결 데이터가 먼저 도착하여 이미 완료된 주문일 수 있습니다.
+        closed = (REJECTED, 0) if not order_number else self._closed_states.get(order_number)
+        if closed is not None:
+            self._settle(basket, request_name, *closed)
+        else:
+            self._basket_orders[order_number] = (basket, request_name)
+
+    def completed_baskets(self) -> list[OrderBasket]:
+        """
+        마지막으로 호출된 이후에 모든 주문이 완료된 basket들을 반환합니다.
+        """
+        completed_baskets, self._completed_baskets = self._completed_baskets, []
+        return completed_baskets
+
+    def _read_order(self, order_number: str, read: Callable[[str], str]) -> Order:
+        return Order(
+            order_number,
+            _stock_code(read('종목코드')),
+            clean_string(read('종목명')),
+            clean_string(read('주문구분')),
+            _integer(read('주문수량')),
+            _integer(read('주문가격')),
+            _integer(read('미체결수량')),
+            clean_string(read('원주문번호')),
+        )
+
+    def _confirm_amendment(self, amendment: Order) -> list[dict]:
+        """
+        정정 혹은 취소 주문이 확인되었을 때 원주문의 잔량을 줄입니다.
+
+        취소 주문은 확인과 함께 cancelled로 완료되며, 그 event는 원주문의 cancelled event로 대신합니다.
+        정정 주문은 확인된 이후부터 새로운 가격의 미체결 주문이 되고, 원주문에는 amended event가 전달됩니다.
+        """
+        if amendment.is_cancel:
+            self._close(amendment, CANCELLED)
+        else:
+            amendment.state = ACCEPTED
+            amendment.nontraded_amount = amendment.order_amount
+
+        events = []
+        original = self._orders.get(amendment.original_order_number)
+        if original is None or original.state in CLOSED_STATES:
+            return events
+        original.pending_amendment = None
+        state = CANCELLED if amendment.is_cancel else AMENDED
+        original.nontraded_amount = max(original.nontraded_amount - amendment.order_amount, 0)
+        if original.nontraded_amount == 0:
+            events.append(self._close(original, state))
+        else:
+            # 일부만 정정, 취소되었다면 남은 수량은 원래의 가격으로 계속 미체결로 남습니다.
+            events.append(original.to_event(state))
+        return events
+
+    def _close(self, order: Order, state: str) -> dict:
+        order.state = state
+        del self._orders[order.order_number]
+        if len(self._closed) == self._closed.maxlen:
+            self._closed_states.pop(self._closed[0], None)
+        self._closed.append(order.order_number)
+        self._closed_states[order.order_number] = (state, order.traded_amount)
+        basket_order = self._basket_orders.pop(order.order_number, None)
+        if basket_order is not None:
+            self._settle(*basket_order, state, order.traded_amount)
+        return order.to_event(state)
+
+    def _settle(self, basket: OrderBasket, request_name: str, state: str, traded_amount: int) -> None:
+        if basket.is_done:
+            return
+        basket.settle(request_name, state, traded_amount)
+        if basket.is_done:
+            self._completed_baskets.append(basket)
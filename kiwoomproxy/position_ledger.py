@@ -0,0 +1,266 @@
+import time
+import logging
+from typing import Callable
+
+from PyQt5.QtCore import QTimer
+
+from .kiwoom_ocx import KiwoomOCX
+from .screen_allocator import ScreenAllocator
+from .scheduler import RequestScheduler, TR, LOW_PRIORITY, OVERFLOW_ERRORS
+from .tr_registry import get_tr_spec
+from .tr_request import TrRequest, TrRequestTable
+from .order_tracker import OrderTracker
+
+logger = logging.getLogger(__name__)
+
+# 잔고와 예수금을 TR로 다시 조회하여 체결 데이터로 갱신한 값과 맞추는 기본 주기(초)입니다.
+DEFAULT_RECONCILE_INTERVAL = 300.0
+
+# 동기화할 TR들입니다. 보유주식, 주문가능금액, 미체결 주문의 순서로 요청합니다.
+LEDGER_TRS = ('opw00018', 'opw00001', 'opt10075')
+# 여러 페이지로 나누어 조회될 수 있는 TR들입니다.
+PAGINATED_LEDGER_TRS = ('opw00018', 'opt10075')
+
+# client의 요청과 겹치지 않도록 ledger가 보내는 TR의 request_name 앞에 붙습니다.
+LEDGER_REQUEST_PREFIX = '__ledger__'
+
+class PositionLedger():
+    """
+    계좌의 보유주식과 주문가능금액을 메모리에 유지하여 get_balance와 get_deposit을 TR 없이 처리하는 클래스
+
+    로그인 직후 opw00018과 opw00001로 한 번 채워지고, 보유주식은 잔고 체결 데이터로 갱신됩니다.
+    opw00018을 조회하는 동안 들어온 잔고 체결 데이터는 조회 결과보다 최신이므로 조회 결과 대신 사용됩니다.
+    주문가능금액은 체결 데이터로 계산할 수 없으므로 주문이 접수되거나 체결되면 다시 조회해야 합니다.
+    정해진 주기마다 두 TR을 다시 조회하여 메모리의 값과 다른 점이 있다면 기록하고 TR의 값으로 바로잡습니다.
+    같은 주기로 opt10075를 조회하여 proxy가 모르는 미체결 주문을 OrderTracker에 추가합니다.
+    """
+
+    def __init__(self, ocx: KiwoomOCX, scheduler: RequestScheduler, tr_requests: TrRequestTable,
+                 screens: ScreenAllocator, orders: OrderTracker, reconcile_interval: float | None = DEFAULT_RECONCILE_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        PositionLedger 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            TR을 요청할 OCX입니다.
+        scheduler : RequestScheduler
+            호출 제한 안에서 TR을 요청할 scheduler입니다.
+        tr_requests : TrRequestTable
+            응답을 기다리는 TR들을 보관하는 테이블입니다.
+        screens : ScreenAllocator
+            TR 요청에 사용할 화면번호를 할당하는 객체입니다.
+        orders : OrderTracker
+            미체결 조회 결과를 전달할 객체입니다.
+        reconcile_interval : float | None
+            TR로 다시 조회하는 주기(초)입니다. None이라면 로그인 직후에만 조회합니다.
+        clock : Callable[[], float]
+            현재 시각(초)을 반환하는 함수입니다.
+        """
+        self._ocx = ocx
+        self._scheduler = scheduler
+        self._tr_requests = tr_requests
+        self._screens = screens
+        self._orders = orders
+        self._clock = clock
+        self.account_number = None
+        # 처음 조회가 끝나기 전에는 None이며, 그 동안의 요청은 TR로 처리됩니다.
+        self._positions: dict[str, dict] | None = None
+        self._deposit: int | None = None
+        # 연속 조회 중인 TR의 페이지들을 모읍니다.
+        self._pages: dict[str, list] = {}
+        self._in_flight: set[str] = set()
+        # opw00018을 조회하는 동안 잔고 체결 데이터로 갱신된 종목들의 최신 값입니다. 보유수량이 0이 되었다면 None입니다.
+        # 조회 결과보다 나중의 값이므로 조회가 끝났을 때 조회 결과 대신 사용됩니다.
+        self._balance_updates: dict[str, dict | None] = {}
+        self._synced_at: dict[str, float] = {}
+        self.mismatches = 0
+        self._timer = QTimer()
+        self._timer.timeout.connect(self.reconcile)
+        self.set_reconcile_interval(reconcile_interval)
+
+    def set_reconcile_interval(self, reconcile_interval: float | None) -> None:
+        """
+        TR로 다시 조회하는 주기(초)를 설정합니다. None이라면 주기적으로 조회하지 않습니다.
+        """
+        self._reconcile_interval = reconcile_interval
+        if reconcile_interval is None:
+            self._timer.stop()
+        elif self.account_number is not None:
+            self._timer.start(int(reconcile_interval * 1000))
+
+    def start(self, account_number: str) -> None:
+        """
+        로그인 이후 계좌의 보유주식과 주문가능금액을 처음 조회하고 주기적인 조회를 시작합니다.
+
+        Parameters
+        ----------
+        account_number : str
+            보유주식과 주문가능금액을 유지할 계좌번호입니다.
+        """
+        self.account_number = account_number
+        self.set_reconcile_interval(self._reconcile_interval)
+        self.reconcile()
+
+    def reconcile(self) -> None:
+        """
+        보유주식, 주문가능금액, 미체결 주문을 TR로 다시 조회합니다. 이미 조회중인 TR은 다시 요청하지 않습니다.
+        """
+        if self.account_number is None:
+            return
+        for tr_code in LEDGER_TRS:
+            if tr_code not in self._in_flight:
+                self._request(tr_code)
+
+    def owns(self, tr_request: TrRequest) -> bool:
+        """
+        ledger가 보낸 TR인지 확인합니다.
+        """
+        return tr_request.request_name.startswith(LEDGER_REQUEST_PREFIX)
+
+    def receive(self, tr_request: TrRequest, tr_result, next_data, screen_no: str) -> None:
+        """
+        ledger가 보낸 TR의 응답을 반영합니다. 다음 페이지가 있다면 이어서 요청합니다.
+
+        Parameters
+        ----------
+        tr_request : TrRequest
+            응답을 받은 ledger의 TR입니다.
+        tr_result
+            TrSpec으로 변환된 응답입니다.
+        next_data
+            연속 조회 여부입니다.
+        screen_no : str
+            응답을 받은 화면번호입니다. 연속 조회는 같은 화면으로 요청합니다.
+        """
+        tr_code = tr_request.tr_code
+        if tr_code == 'opw00001':
+            self._in_flight.discard(tr_code)
+            self._reconcile_deposit(tr_result)
+            return
+
+        tr_request.pages += 1
+        self._pages.setdefault(tr_code, []).append(tr_result)
+        if tr_request.has_next_page(next_data):
+            self._tr_requests.add(tr_request)
+            self._submit(tr_request, 2, screen_no)
+            return
+        self._in_flight.discard(tr_code)
+        pages = self._pages.pop(tr_code)
+        if tr_code == 'opw00018':
+            self._reconcile_positions({stock_code: row for page in pages for stock_code, row in page.items()})
+        else:
+            self._orders.seed([row for page in pages for row in page])
+            self._synced_at[tr_code] = self._clock()
+
+    def observe_deposit(self, tr_request: TrRequest, deposit: int) -> None:
+        """
+        client가 요청한 opw00001의 응답이 ledger의 계좌라면 주문가능금액으로 저장합니다.
+        """
+        if ('계좌번호', self.account_number) in tr_request.input_list:
+            self._deposit = deposit
+            self._synced_at['opw00001'] = self._clock()
+
+    def apply_balance(self, account_number: str, info_dict: dict) -> None:
+        """
+        잔고 체결 데이터로 종목의 보유주식을 갱신합니다. 보유수량이 0이 된 종목은 제거합니다.
+        ledger의 계좌가 아닌 체결 데이터는 무시합니다.
+
+        Parameters
+        ----------
+        account_number : str
+            체결 데이터의 계좌번호입니다.
+        info_dict : dict
+            종목코드, 종목명, 보유수량, 주문가능수량, 매입단가를 담은 dict입니다.
+        """
+        if account_number != self.account_number:
+            return
+        position = dict(info_dict) if info_dict['보유수량'] else None
+        if 'opw00018' in self._in_flight:
+            self._balance_updates[info_dict['종목코드']] = position
+        if self._positions is None:
+            return
+        if position is not None:
+            self._positions[info_dict['종목코드']] = position
+        else:
+            self._positions.pop(info_dict['종목코드'], None)
+
+    def invalidate_deposit(self) -> None:
+        """
+        주문이 접수되거나 체결되어 저장된 주문가능금액이 더 이상 유효하지 않음을 등록합니다.
+        """
+        self._deposit = None
+
+    def get_positions(self) -> dict[str, dict] | None:
+        """
+        종목코드를 key로 하는 보유주식을 반환합니다. 아직 조회하지 못했다면 None을 반환합니다.
+        """
+        return self._positions
+
+    def get_deposit(self) -> int | None:
+        """
+        주문가능금액을 반환합니다. 아직 조회하지 못했거나 주문 이후 다시 조회하지 않았다면 None을 반환합니다.
+        """
+        return self._deposit
+
+    def get_stats(self) -> dict:
+        """
+        보유 종목 수, 주문가능금액의 유효 여부, TR별 마지막 조회 이후의 시간(초), 불일치 횟수를 반환합니다.
+        """
+        now = self._clock()
+        return {
+            'positions': None if self._positions is None else len(self._positions),
+            'deposit_valid': self._deposit is not None,
+            'synced_ago': {tr_code: now - synced_at for tr_code, synced_at in self._synced_at.items()},
+            'mismatches': self.mismatches,
+        }
+
+    def _request(self, tr_code: str) -> None:
+        spec = get_tr_spec(tr_code)
+        # 보유주식과 미체결 주문은 한 번에 일부만 조회되므로 마지막 페이지까지 이어서 요청합니다.
+        tr_request = TrRequest(tr_code, f'{LEDGER_REQUEST_PREFIX}{tr_code}',
+                               spec.make_inputs({'계좌번호': self.account_number}),
+                               paginate=tr_code in PAGINATED_LEDGER_TRS)
+        self._in_flight.add(tr_code)
+        self._tr_requests.add(tr_request)
+        self._submit(tr_request, 0, self._screens.next_tr_screen())
+
+    def _submit(self, tr_request: TrRequest, request_type: int, screen_no: str) -> None:
+        # 주기적인 조회가 client의 요청을 지연시키지 않도록 낮은 우선순위로 요청합니다.
+        def job() -> int:
+            result = tr_request.request(self._ocx, request_type, screen_no)
+            if result != 0 and result not in OVERFLOW_ERRORS:
+                self._in_flight.discard(tr_request.tr_code)
+                self._tr_requests.pop(tr_request.request_name)
+                self._pages.pop(tr_request.tr_code, None)
+                if tr_request.tr_code == 'opw00018':
+                    self._balance_updates.clear()
+                raise RuntimeError(f'잔고 동기화를 위한 {tr_request.tr_code} 요청에 실패하였습니다. '
+                                   f'err_code - {result}')
+            return result
+        self._scheduler.submit(TR, tr_request.request_name, job, LOW_PRIORITY)
+
+    def _reconcile_positions(self, positions: dict[str, dict]) -> None:
+        # 조회하는 동안 들어온 잔고 체결 데이터가 조회 결과보다 최신이므로 그 종목들은 체결 데이터의 값을 사용합니다.
+        for stock_code, position in self._balance_updates.items():
+            if position is not None:
+                positions[stock_code] = position
+            else:
+                positions.pop(stock_code, None)
+        self._balance_updates.clear()
+        if self._positions is not None and self._positions != positions:
+            self.mismatches += 1
+            changed = sorted(stock_code for stock_code in self._positions.keys() | positions.keys()
+                             if self._positions.get(stock_code) != positions.get(stock_code))
+            logger.warning(f'체결 데이터로 갱신한 보유주식이 조회 결과와 다릅니다. 종목 - {changed}')
+        self._positions = positions
+        self._synced_at['opw00018'] = self._clock()
+        logger.info(f'보유주식 {len(positions)}종목을 동기화하였습니다.')
+
+    def _reconcile_deposit(self, deposit: int) -> None:
+        if self._deposit is not None and self._deposit != deposit:
+            self.mismatches += 1
+            logger.warning(f'저장된 주문가능금액 - {self._deposit} 이(가) 조회 결과 - {deposit} 와(과) 다릅니다.')
+        self._deposit = deposit
+        self._synced_at['opw00001'] = self._clock()
@@ -6,6 +6,19 @@ from PyQt5.QtWidgets import QApplication
 from PyQt5.QtNetwork import QTcpServer, QHostAddress
 
 from .kiwoom_ocx import KiwoomOCX
+from .connection import (ClientConnection, DEFAULT_MAX_QUEUE_SIZE, DEFAULT_HIGH_WATERMARK,
+                         DEFAULT_FLUSH_INTERVAL_MS)
+from .hub import Hub
+from .order_book import OrderBookCache
+from .tr_request import TrRequestTable
+from .scheduler import RequestScheduler
+from .screen_allocator import ScreenAllocator
+from .subscription_manager import SubscriptionManager
+from .tr_cache import TrCache
+from .condition_manager import ConditionManager, DEFAULT_CONDITION_CACHE_PATH
+from .position_ledger import PositionLedger, DEFAULT_RECONCILE_INTERVAL
+from .order_tracker import OrderTracker
+from .trigger_book import TriggerBook
 from .client_handler import ClientHandler
 from .server_handler import ServerHandler
 
@@ -15,9 +28,28 @@ class Proxy():
         self._server = QTcpServer()
         self._address = None
         self._port_number = None
-        self._socket = None
-        self._client_handler = None
-        self._server_handler = None       
+        self._ocx = None
+        self._hub = Hub()
+        self._book_cache = OrderBookCache()
+        self._tr_requests = TrRequestTable()
+        self._scheduler = None
+        self._screens = ScreenAllocator()
+        self._subscriptions = None
+        self._tr_cache = TrCache()
+        self._conditions = None
+        self._condition_cache_path = DEFAULT_CONDITION_CACHE_PATH
+        self._ledger = None
+        self._orders = OrderTracker()
+        self._triggers = TriggerBook()
+        self._reconcile_interval = DEFAULT_RECONCILE_INTERVAL
+        self._client_handlers = {}
+        self._server_handler = None
+        self._send_queue_options = {
+            'max_queue_size': DEFAULT_MAX_QUEUE_SIZE,
+            'high_watermark': DEFAULT_HIGH_WATERMARK,
+            'policy': 'conflate',
+        }
+        self._flush_interval_ms = DEFAULT_FLUSH_INTERVAL_MS
 
     def set_port(self, port_number: int):
         self._port_number = port_number
@@ -25,6 +57,27 @@ class Proxy():
     def set_address(self, address: str):
         self._address = address
 
+    def set_send_queue(self, max_queue_size: int, high_watermark: int, policy: str = 'conflate'):
+        self._send_queue_options = {
+            'max_queue_size': max_queue_size,
+            'high_watermark': high_watermark,
+            'policy': policy,
+        }
+
+    def set_flush_interval(self, flush_interval_ms: int):
+        self._flush_interval_ms = flush_interval_ms
+
+    def set_tr_cache_ttl(self, tr_code: str, ttl: float):
+        self._tr_cache.set_ttl(tr_code, ttl)
+
+    def set_condition_cache_path(self, path: str | None):
+        self._condition_cache_path = path
+
+    def set_reconcile_interval(self, reconcile_interval: float | None):
+        self._reconcile_interval = reconcile_interval
+        if self._ledger is not None:
+            self._ledger.set_reconcile_interval(reconcile_interval)
+
     def start(self, log_level: str = 'ERROR'):
         app = QApplication([])
 
@@ -47,12 +100,40 @@ class Proxy():
             ]
         )
 
+        # OCX와 서버 핸들러는 모든 client가 공유하므로 한 번만 생성합니다.
+        self._ocx = KiwoomOCX()
+        self._scheduler = RequestScheduler()
+        self._subscriptions = SubscriptionManager(self._ocx, self._screens)
+        self._conditions = ConditionManager(self._ocx, self._screens, self._condition_cache_path)
+        self._ledger = PositionLedger(self._ocx, self._scheduler, self._tr_requests, self._screens, self._orders,
+                                      self._reconcile_interval)
+        self._server_handler = ServerHandler(self._ocx, self._hub, self._book_cache, self._tr_requests,
+                                             self._scheduler, self._tr_cache, self._conditions, self._ledger,
+                                             self._orders, self._triggers)
         self._server.listen(QHostAddress(self._address), self._port_number)
         self._server.newConnection.connect(self._start_market)
-        self._ocx = KiwoomOCX()
         app.exec_()
     
     def _start_market(self):
-        self._socket = self._server.nextPendingConnection()
-        self._client_handler = ClientHandler(self._ocx, self._socket)
-        self._server_handler = ServerHandler(self._ocx, self._socket)
\ No newline at end of file
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            connection = ClientConnection(socket, flush_interval_ms=self._flush_interval_ms,
+                                          book_cache=self._book_cache, **self._send_queue_options)
+            self._hub.add_client(connection)
+            self._client_handlers[connection] = ClientHandler(self._ocx, connection, self._hub, self._book_cache,
+                                                              self._tr_requests, self._scheduler, self._screens,
+                                                              self._subscriptions, self._tr_cache, self._conditions,
+                                                              self._ledger, self._orders, self._triggers)
+            socket.disconnected.connect(lambda connection=connection: self._close_market(connection))
+
+    def _close_market(self, connection: ClientConnection):
+        # 연결이 끊어진 client가 요청하여 대기중인 조회와 주문은 실행하지 않습니다.
+        self._scheduler.cancel_owner(connection)
+        # 연결이 끊어진 client만 사용하던 실시간 등록은 OCX에서도 해제합니다.
+        self._subscriptions.release_all(connection)
+        self._conditions.release_all(connection)
+        self._triggers.release_all(connection)
+        self._hub.remove_client(connection)
+        self._client_handlers.pop(connection, None)
+        connection.close()
+        connection.socket.deleteLater()
\ No newline at end of file
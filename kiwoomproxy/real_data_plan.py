@@ -0,0 +1,152 @@
+from typing import Callable
+
+from .utils import clean_integer, clean_float, clean_string, clean_signed_integer, clean_signed_float
+from .kiwoom_api_const import KOR_NAME_TO_FID
+
+# 실시간 데이터의 각 항목을 어떻게 변환할지 나타냅니다. 정의되지 않은 항목은 부호 없는 정수로 변환합니다.
+# 전일 대비와 등락율의 '-'는 하락을, 거래량의 '-'는 매도 체결을 뜻하므로 부호를 유지합니다.
+FIELD_DECODERS: dict[str, Callable[[str], object]] = {
+    '체결시간': clean_string,
+    '호가시간': clean_string,
+    '전일 대비': clean_signed_integer,
+    '등락율': clean_signed_float,
+    '거래량': clean_signed_integer,
+    '체결강도': clean_float,
+}
+
+# 주식체결 신호에서 client가 선택할 수 있는 항목들입니다.
+# 추출된 값과 compact schema의 배열은 항상 이 순서를 따릅니다.
+PRICE_CHANGE_FIELDS = ('현재가', '시가', '고가', '저가', '전일 대비', '등락율', '거래량',
+                       '누적거래량', '누적거래대금', '체결시간', '(최우선)매도호가', '(최우선)매수호가', '체결강도')
+DEFAULT_PRICE_CHANGE_FIELDS = frozenset(PRICE_CHANGE_FIELDS[:4])
+MAX_ASK_BID_DEPTH = 10
+
+class RealDataPlan():
+    """
+    실시간 데이터 한 종류를 추출하는 방법을 미리 계산해둔 클래스
+
+    어떤 FID를 어떤 순서로 가져와서 어떻게 변환할지를 한 번만 계산해두고,
+    실시간 데이터가 들어올 때마다 이를 그대로 실행합니다.
+    """
+
+    def __init__(self, names: tuple[str, ...]):
+        """
+        추출할 항목들의 FID와 변환 함수를 미리 계산합니다.
+
+        Parameters
+        ----------
+        names : tuple[str, ...]
+            추출할 항목의 이름들입니다. 추출된 값은 이 순서대로 배치됩니다.
+        """
+        self.names = tuple(names)
+        self.fids = tuple(int(KOR_NAME_TO_FID[name]) for name in self.names)
+        self.decoders = tuple(FIELD_DECODERS.get(name, clean_integer) for name in self.names)
+        self._steps = tuple(zip(self.fids, self.decoders))
+
+    def extract(self, ocx, stock_code: str) -> list:
+        """
+        OCX로부터 항목들을 가져와 변환한 값들을 반환합니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            실시간 데이터를 가져올 OCX입니다.
+        stock_code : str
+            실시간 데이터의 종목 코드입니다.
+
+        Returns
+        -------
+        list
+            names의 순서대로 배치된 값들입니다.
+        """
+        get_comm_real_data = ocx.get_comm_real_data
+        return [decode(get_comm_real_data(stock_code, fid)) for fid, decode in self._steps]
+
+def price_change_fields(fields: list[str] | None) -> frozenset:
+    """
+    client가 요청한 주식체결 항목들을 검증합니다.
+
+    Parameters
+    ----------
+    fields : list[str] | None
+        받고 싶은 항목들의 이름입니다. None이라면 기본 항목들을 사용합니다.
+
+    Returns
+    -------
+    frozenset
+        검증된 항목들의 집합입니다.
+    """
+    if fields is None:
+        return DEFAULT_PRICE_CHANGE_FIELDS
+    for field in fields:
+        if field not in PRICE_CHANGE_FIELDS:
+            raise ValueError(f'실시간 가격정보에서 지원하지 않는 항목 - {field} 입니다.')
+    if len(fields) == 0:
+        raise ValueError('실시간 가격정보에서 받을 항목이 비어있습니다.')
+    return frozenset(fields)
+
+def ask_bid_change_fields(depth: int) -> frozenset:
+    """
+    1차선부터 depth차선까지의 호가와 호가 수량 항목들을 반환합니다.
+
+    Parameters
+    ----------
+    depth : int
+        받고 싶은 호가의 차선 수입니다. 1이면 최우선 호가만 받습니다.
+
+    Returns
+    -------
+    frozenset
+        해당 차선들의 항목들의 집합입니다.
+    """
+    if not 1 <= depth <= MAX_ASK_BID_DEPTH:
+        raise ValueError(f'호가 차선 수는 1 이상 {MAX_ASK_BID_DEPTH} 이하여야 합니다. - {depth}')
+    return frozenset(_ask_bid_names(depth))
+
+def ask_bid_depth(fields: frozenset) -> int:
+    """
+    ask_bid_change_fields로 만들어진 항목들의 호가 차선 수를 반환합니다.
+    """
+    return sum(1 for num in range(1, MAX_ASK_BID_DEPTH + 1) if f'매수호가{num}' in fields)
+
+def _ask_bid_names(depth: int) -> tuple[str, ...]:
+    # 매수호가 1~depth, 매수호가 수량 1~depth, 매도호가 1~depth, 매도호가 수량 1~depth의 순서로 배치됩니다.
+    return (tuple(f'매수호가{num}' for num in range(1, depth + 1)) +
+            tuple(f'매수호가 수량{num}' for num in range(1, depth + 1)) +
+            tuple(f'매도호가{num}' for num in range(1, depth + 1)) +
+            tuple(f'매도호가 수량{num}' for num in range(1, depth + 1)))
+
+_price_change_plans: dict[frozenset, RealDataPlan] = {}
+_ask_bid_change_plans: dict[frozenset, RealDataPlan] = {}
+
+def get_price_change_plan(fields: frozenset) -> RealDataPlan:
+    """
+    주어진 항목들만 추출하는 주식체결 plan을 반환합니다.
+    같은 항목들에 대한 plan은 한 번만 만들어집니다.
+
+    Parameters
+    ----------
+    fields : frozenset
+        추출할 항목들의 집합입니다.
+    """
+    plan = _price_change_plans.get(fields)
+    if plan is None:
+        plan = RealDataPlan(tuple(name for name in PRICE_CHANGE_FIELDS if name in fields))
+        _price_change_plans[fields] = plan
+    return plan
+
+def get_ask_bid_change_plan(fields: frozenset) -> RealDataPlan:
+    """
+    주어진 항목들을 모두 포함하는 가장 얕은 주식호가잔량 plan을 반환합니다.
+    추출된 값은 매수호가, 매수호가 수량, 매도호가, 매도호가 수량의 순서로 depth개씩 배치됩니다.
+
+    Parameters
+    ----------
+    fields : frozenset
+        ask_bid_change_fields로 만들어진 항목들의 합집합입니다.
+    """
+    plan = _ask_bid_change_plans.get(fields)
+    if plan is None:
+        plan = RealDataPlan(_ask_bid_names(ask_bid_depth(fields)))
+        _ask_bid_change_plans[fields] = plan
+    return plan
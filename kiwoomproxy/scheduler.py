@@ -0,0 +1,243 @@
+import math
+import time
+import heapq
+import logging
+import itertools
+from collections import deque
+from typing import Callable
+
+from PyQt5.QtCore import Qt, QTimer
+
+logger = logging.getLogger(__name__)
+
+# 키움증권 Open API의 호출 제한입니다. (최대 호출 수, 기간(초))의 튜플로 나타냅니다.
+# 조회 TR은 1초에 5회, 1분에 100회, 1시간에 1000회로 제한됩니다.
+TR_RATE_LIMITS = ((5, 1.0), (100, 60.0), (1000, 3600.0))
+# 주문은 1초에 5회로 제한됩니다.
+ORDER_RATE_LIMITS = ((5, 1.0),)
+
+TR = 'tr'
+ORDER = 'order'
+
+# 숫자가 작을수록 먼저 실행됩니다. 같은 우선순위의 요청은 들어온 순서대로 실행됩니다.
+HIGH_PRIORITY = 0
+NORMAL_PRIORITY = 1
+LOW_PRIORITY = 2
+
+# 제한을 지켰음에도 조회 과부하(-200) 혹은 주문 과부하(-308)가 반환되면 이 시간(초) 이후에 다시 시도합니다.
+RETRY_DELAY = 1.0
+OVERFLOW_ERRORS = (-200, -308)
+# 같은 우선순위 안에서 다시 시도하는 요청은 새로운 요청보다 먼저, 서로 간에는 들어온 순서대로 실행됩니다.
+RETRY = 0
+FRESH = 1
+
+class RateLimiter():
+    """
+    최근 호출 시각들을 저장하여 여러 기간의 호출 제한을 동시에 지키는 클래스
+
+    기간마다 최대 호출 수만큼의 token을 가진 bucket과 같지만, 기간의 경계에서
+    두 배의 호출이 몰리지 않도록 어느 구간에서도 제한을 넘지 않는 sliding window로 계산합니다.
+    """
+
+    def __init__(self, limits: tuple[tuple[int, float], ...]):
+        """
+        RateLimiter 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        limits : tuple[tuple[int, float], ...]
+            (최대 호출 수, 기간(초))의 튜플입니다.
+        """
+        self.limits = limits
+        self._history = deque(maxlen=max(count for count, _ in limits))
+
+    def wait_time(self, now: float) -> float:
+        """
+        지금부터 다음 호출이 가능할 때까지 기다려야 하는 시간(초)을 반환합니다.
+        """
+        return max(self._wait_time(self._history, now), 0.0)
+
+    def acquire(self, now: float) -> None:
+        """
+        now에 호출하였음을 기록합니다. wait_time이 0일 때만 호출해야 합니다.
+        """
+        self._history.append(now)
+
+    def estimate(self, n: int, now: float) -> float:
+        """
+        지금부터 n번째 호출이 가능해질 때까지 기다려야 하는 시간(초)을 반환합니다.
+
+        Parameters
+        ----------
+        n : int
+            앞에 대기중인 호출을 포함한 순번입니다. 1이면 wait_time과 같습니다.
+        now : float
+            현재 시각입니다.
+        """
+        history = deque(self._history, maxlen=self._history.maxlen)
+        at = now
+        for _ in range(n - 1):
+            at += max(self._wait_time(history, at), 0.0)
+            history.append(at)
+        at += max(self._wait_time(history, at), 0.0)
+        return at - now
+
+    def _wait_time(self, history: deque, now: float) -> float:
+        wait = 0.0
+        for count, period in self.limits:
+            if len(history) >= count:
+                wait = max(wait, history[-count] + period - now)
+        return wait
+
+class RequestScheduler():
+    """
+    조회 TR과 주문을 키움증권의 호출 제한을 넘지 않도록 우선순위 대기열에 쌓았다가 실행하는 클래스
+
+    조회 TR과 주문은 서로 다른 대기열과 호출 제한을 가지므로 한 쪽이 밀려도 다른 쪽은 지연되지 않습니다.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        RequestScheduler 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        clock : Callable[[], float]
+            현재 시각(초)을 반환하는 함수입니다. 테스트에서는 가짜 시계를 넣을 수 있습니다.
+        """
+        self._clock = clock
+        self._limiters = {TR: RateLimiter(TR_RATE_LIMITS), ORDER: RateLimiter(ORDER_RATE_LIMITS)}
+        # 대기열의 원소는 (우선순위, 다시 시도하는 요청인지, 순번, 요청 이름, job, on_error, owner)입니다.
+        self._queues: dict[str, list] = {TR: [], ORDER: []}
+        self._retry_at = {TR: 0.0, ORDER: 0.0}
+        self._counter = itertools.count()
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self.dispatch)
+
+    def submit(self, kind: str, request_name: str, job: Callable[[], int],
+               priority: int = NORMAL_PRIORITY, on_error: Callable[[Exception], None] | None = None,
+               owner=None) -> float:
+        """
+        요청을 대기열에 넣습니다. 대기 없이 실행할 수 있다면 즉시 실행합니다.
+
+        Parameters
+        ----------
+        kind : str
+            'tr' 혹은 'order'입니다.
+        request_name : str
+            로그에 남길 요청의 이름입니다.
+        job : Callable[[], int]
+            OCX를 호출하고 그 결과 코드를 반환하는 함수입니다.
+        priority : int
+            요청의 우선순위입니다. 숫자가 작을수록 먼저 실행됩니다.
+        on_error : Callable[[Exception], None] | None
+            job이 예외를 발생시켰을 때 그 예외로 호출됩니다. 요청한 client에게 실패를 알리는데 사용합니다.
+        owner
+            요청한 client입니다. 보통 ClientConnection이며, cancel_owner로 대기중인 요청을 취소할 때 사용합니다.
+
+        Returns
+        -------
+        float
+            요청이 실행될 때까지의 예상 대기시간(초)입니다. 즉시 실행되었다면 0입니다.
+        """
+        if kind not in self._queues:
+            raise ValueError(f'유효하지 않은 요청 종류 - {kind} 입니다.')
+        queue = self._queues[kind]
+        now = self._clock()
+        if not queue and self._wait_time(kind, now) == 0:
+            self._run(kind, request_name, job, priority, on_error, owner, now)
+            # 과부하로 거부되어 다시 대기열에 들어갔을 수 있습니다.
+            self._schedule(now)
+            return 0.0
+
+        position = 1 + sum(1 for entry in queue if entry[0] <= priority)
+        heapq.heappush(queue, (priority, FRESH, next(self._counter), request_name, job, on_error, owner))
+        wait = max(self._limiters[kind].estimate(position, now), self._retry_at[kind] - now)
+        logger.info(f'요청 - {request_name} 이(가) 대기열에 추가되었습니다. 예상 대기시간 - {wait:.3f}초')
+        self._schedule(now)
+        return wait
+
+    def dispatch(self) -> None:
+        """
+        호출 제한이 허락하는 만큼 대기열의 요청들을 우선순위 순서대로 실행합니다.
+        """
+        now = self._clock()
+        for kind, queue in self._queues.items():
+            while queue and self._wait_time(kind, now) == 0:
+                priority, _, _, request_name, job, on_error, owner = heapq.heappop(queue)
+                self._run(kind, request_name, job, priority, on_error, owner, now)
+        self._schedule(now)
+
+    def cancel_owner(self, owner) -> int:
+        """
+        owner가 요청하여 대기중인 요청들을 실행하지 않고 대기열에서 제거합니다. client의 연결이 끊어졌을 때 호출됩니다.
+        제거된 요청의 on_error는 취소되었다는 RuntimeError로 호출되어, 같은 응답을 기다리던 다른 client와
+        주문 상태를 정리할 수 있습니다.
+
+        Parameters
+        ----------
+        owner
+            submit할 때 사용한 client입니다.
+
+        Returns
+        -------
+        int
+            취소된 요청의 수입니다.
+        """
+        cancelled = []
+        for kind, queue in self._queues.items():
+            kept = [entry for entry in queue if entry[6] is not owner]
+            if len(kept) == len(queue):
+                continue
+            cancelled.extend(entry for entry in queue if entry[6] is owner)
+            heapq.heapify(kept)
+            self._queues[kind] = kept
+        for entry in sorted(cancelled):
+            request_name, on_error = entry[3], entry[5]
+            logger.info(f'요청 - {request_name} 이(가) 연결이 끊어진 client의 요청이므로 취소되었습니다.')
+            if on_error is not None:
+                on_error(RuntimeError(f'요청 - {request_name} 이(가) 취소되었습니다.'))
+        self._schedule(self._clock())
+        return len(cancelled)
+
+    def get_stats(self) -> dict:
+        """
+        대기열마다 대기중인 요청 수와 다음 요청까지의 대기시간(초)을 반환합니다.
+        """
+        now = self._clock()
+        return {kind: {'depth': len(queue), 'wait': self._wait_time(kind, now)}
+                for kind, queue in self._queues.items()}
+
+    def _wait_time(self, kind: str, now: float) -> float:
+        return max(self._limiters[kind].wait_time(now), self._retry_at[kind] - now, 0.0)
+
+    def _run(self, kind: str, request_name: str, job: Callable[[], int], priority: int,
+             on_error: Callable[[Exception], None] | None, owner, now: float) -> None:
+        """
+        호출을 기록하고 job을 실행합니다.
+        과부하로 거부되었다면 같은 우선순위의 새로운 요청들보다 먼저, 먼저 거부된 요청들보다는 나중에 다시 실행합니다.
+        """
+        self._limiters[kind].acquire(now)
+        try:
+            result = job()
+        except Exception as error:
+            logger.exception(f'요청 - {request_name} 을(를) 실행하는 중 오류가 발생하였습니다.')
+            if on_error is not None:
+                on_error(error)
+            return
+        if result in OVERFLOW_ERRORS:
+            logger.warning(f'요청 - {request_name} 이(가) 과부하로 거부되어 {RETRY_DELAY}초 후 다시 시도합니다.')
+            self._retry_at[kind] = now + RETRY_DELAY
+            heapq.heappush(self._queues[kind], (priority, RETRY, next(self._counter), request_name, job, on_error, owner))
+
+    def _schedule(self, now: float) -> None:
+        """
+        대기중인 요청이 있다면 가장 먼저 실행 가능한 시각에 dispatch가 호출되도록 timer를 설정합니다.
+        """
+        waits = [self._wait_time(kind, now) for kind, queue in self._queues.items() if queue]
+        if not waits:
+            self._timer.stop()
+            return
+        self._timer.start(math.ceil(min(waits) * 1000))
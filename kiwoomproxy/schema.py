@@ -0,0 +1,55 @@
+from .real_data_plan import PRICE_CHANGE_FIELDS
+
+# compact schema에서 각 메세지의 value가 어떤 순서의 배열로 전송되는지 나타냅니다.
+# client는 schema 메세지로 이 정보를 한 번 전달받은 후 배열의 위치로 각 값을 해석합니다.
+MESSAGE_SCHEMAS = {
+    'price_change': PRICE_CHANGE_FIELDS,
+    'ask_bid_change': ('매수호가정보', '매도호가정보'),
+    'ask_bid_delta': ('seq', 'changes', 'snapshot'),
+    'order_result': ('종목코드', '종목명', '주문상태', '주문구분', '주문수량',
+                     '체결가', '체결량', '미체결수량', '주문번호'),
+    'order_event': ('event', '주문번호', '종목코드', '종목명', '주문구분', '주문수량', '주문가격',
+                    '미체결수량', '누적체결량', '체결가', '체결량', '원주문번호'),
+    'balance_change': ('종목코드', '종목명', '보유수량', '주문가능수량', '매입단가'),
+}
+
+# dict - 한글 key를 가진 dict로 value를 전송합니다. 기존 easykiwoom client와 호환되는 기본 모드입니다.
+# compact - MESSAGE_SCHEMAS에 정의된 메세지의 value를 위치 기반 배열로 전송합니다.
+SCHEMA_MODES = ('dict', 'compact')
+
+def check_schema_mode(schema: str) -> None:
+    """
+    주어진 schema mode가 유효한지 확인합니다.
+
+    Parameters
+    ----------
+    schema : str
+        확인할 schema mode입니다.
+    """
+    if schema not in SCHEMA_MODES:
+        raise ValueError(f'유효하지 않은 schema mode - {schema} 입니다.')
+
+def to_compact(data_dict: dict) -> dict:
+    """
+    메세지의 value를 MESSAGE_SCHEMAS에 정의된 순서의 배열로 변환합니다.
+    schema가 정의되지 않은 메세지는 그대로 반환합니다.
+
+    Parameters
+    ----------
+    data_dict : dict
+        'type', 'key', 'value'를 가진 메세지입니다.
+
+    Returns
+    -------
+    dict
+        value가 배열로 변환된 메세지입니다.
+        value에 없는 필드는 None이 되며, 배열 끝의 None들은 전송되지 않습니다.
+    """
+    fields = MESSAGE_SCHEMAS.get(data_dict['type'])
+    value = data_dict['value']
+    if fields is None or not isinstance(value, dict):
+        return data_dict
+    values = [value.get(field) for field in fields]
+    while values and values[-1] is None:
+        values.pop()
+    return {'type': data_dict['type'], 'key': data_dict['key'], 'value': values}
@@ -0,0 +1,202 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 키움증권 Open API는 최대 200개의 화면번호를 사용할 수 있습니다.
+# TR 요청과 주문은 응답을 받으면 화면이 필요없으므로 적은 수의 화면을 순환하며 사용하고,
+# 실시간 정보는 등록이 유지되어야 하므로 TR과 겹치지 않는 화면들에 나누어 등록합니다.
+TR_SCREENS = tuple(f'{screen_no:04}' for screen_no in range(1, 51))
+REAL_SCREENS = tuple(f'{screen_no:04}' for screen_no in range(5001, 5141))
+# 실시간 조건검색은 최대 10개까지 동시에 사용할 수 있으며 조건검색식마다 화면 하나를 차지합니다.
+CONDITION_SCREENS = tuple(f'{screen_no:04}' for screen_no in range(9001, 9011))
+
+# 하나의 화면에 실시간 등록할 수 있는 최대 종목 수입니다.
+MAX_CODES_PER_SCREEN = 100
+
+class ScreenAllocator():
+    """
+    TR 요청용 화면과 실시간 등록용 화면을 분리하여 할당하는 클래스
+
+    실시간 등록은 종목마다 하나의 화면에 고정되며, 화면당 최대 종목 수를 넘지 않는 선에서
+    가능한 적은 수의 화면에 모아서 등록합니다. 종목이 모두 해제된 화면은 다시 사용할 수 있습니다.
+    """
+
+    def __init__(self, tr_screens: tuple[str, ...] = TR_SCREENS, real_screens: tuple[str, ...] = REAL_SCREENS,
+                 max_codes_per_screen: int = MAX_CODES_PER_SCREEN,
+                 condition_screens: tuple[str, ...] = CONDITION_SCREENS):
+        """
+        ScreenAllocator 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        tr_screens : tuple[str, ...]
+            TR 요청과 주문에 순환하며 사용할 화면번호들입니다.
+        real_screens : tuple[str, ...]
+            실시간 등록에 사용할 화면번호들입니다.
+        max_codes_per_screen : int
+            하나의 화면에 실시간 등록할 수 있는 최대 종목 수입니다.
+        condition_screens : tuple[str, ...]
+            실시간 조건검색에 사용할 화면번호들입니다.
+        """
+        if set(tr_screens) & set(real_screens) or set(condition_screens) & (set(tr_screens) | set(real_screens)):
+            raise ValueError('TR, 실시간, 조건검색 화면번호는 서로 겹칠 수 없습니다.')
+        self._tr_screens = tr_screens
+        self._tr_index = 0
+        self._real_screens = real_screens
+        self.max_codes_per_screen = max_codes_per_screen
+        # 실시간 화면마다 등록된 종목과 그 종목의 FID들을 저장합니다.
+        self._registrations: dict[str, dict[str, frozenset]] = {}
+        self._code_screens: dict[str, str] = {}
+        self._condition_screens = condition_screens
+        self._used_condition_screens: set[str] = set()
+
+    def next_tr_screen(self) -> str:
+        """
+        TR 요청이나 주문에 사용할 화면번호를 반환합니다.
+        TR 화면번호들을 순환하며 실시간 화면번호는 반환하지 않습니다.
+        """
+        screen_no = self._tr_screens[self._tr_index]
+        self._tr_index = (self._tr_index + 1) % len(self._tr_screens)
+        return screen_no
+
+    def acquire_condition_screen(self) -> str:
+        """
+        실시간 조건검색에 사용할 화면번호를 할당합니다.
+        """
+        for screen_no in self._condition_screens:
+            if screen_no not in self._used_condition_screens:
+                self._used_condition_screens.add(screen_no)
+                return screen_no
+        raise RuntimeError(f'실시간 조건검색은 최대 {len(self._condition_screens)}개까지 사용할 수 있습니다.')
+
+    def release_condition_screen(self, screen_no: str) -> None:
+        """
+        실시간 조건검색에 사용하던 화면번호를 반납합니다.
+        """
+        self._used_condition_screens.discard(screen_no)
+
+    def screen_of(self, stock_code: str) -> str | None:
+        """
+        종목이 실시간 등록된 화면번호를 반환합니다. 등록되지 않았다면 None을 반환합니다.
+        """
+        return self._code_screens.get(stock_code)
+
+    def fids_of(self, stock_code: str) -> frozenset:
+        """
+        종목이 실시간 등록된 FID들을 반환합니다. 등록되지 않았다면 빈 집합을 반환합니다.
+        """
+        screen_no = self._code_screens.get(stock_code)
+        if screen_no is None:
+            return frozenset()
+        return self._registrations[screen_no][stock_code]
+
+    def assign_real(self, stock_code_list: list[str], fid_list: list[str]) -> dict[str, list[str]]:
+        """
+        종목들을 실시간 화면에 할당하고 새로 등록해야 하는 종목들을 화면별로 반환합니다.
+
+        이미 할당된 종목은 같은 화면을 사용하며, 받고 있지 않은 FID가 있을 때만 다시 등록합니다.
+        새로운 종목은 여유가 있는 화면 중 가장 먼저 열린 화면에 할당됩니다.
+
+        Parameters
+        ----------
+        stock_code_list : list[str]
+            실시간 등록할 종목 코드의 리스트입니다.
+        fid_list : list[str]
+            받고 싶은 FID들의 리스트입니다.
+
+        Returns
+        -------
+        dict[str, list[str]]
+            화면번호별로 SetRealReg에 추가로 등록해야 하는 종목들입니다.
+        """
+        fids = frozenset(fid_list)
+        to_register: dict[str, list[str]] = {}
+        for stock_code in dict.fromkeys(stock_code_list):
+            screen_no = self._code_screens.get(stock_code)
+            if screen_no is None:
+                screen_no = self._find_real_screen()
+                self._registrations.setdefault(screen_no, {})[stock_code] = fids
+                self._code_screens[stock_code] = screen_no
+            else:
+                registered_fids = self._registrations[screen_no][stock_code]
+                if fids <= registered_fids:
+                    continue
+                self._registrations[screen_no][stock_code] = registered_fids | fids
+            to_register.setdefault(screen_no, []).append(stock_code)
+        return to_register
+
+    def release_real(self, stock_code_list: list[str]) -> list[str]:
+        """
+        종목들의 실시간 화면 할당을 해제합니다.
+
+        Parameters
+        ----------
+        stock_code_list : list[str]
+            실시간 등록을 해제할 종목 코드의 리스트입니다.
+
+        Returns
+        -------
+        list[str]
+            종목이 빠진 화면번호들입니다.
+        """
+        changed_screens = []
+        for stock_code in stock_code_list:
+            screen_no = self._code_screens.pop(stock_code, None)
+            if screen_no is None:
+                continue
+            registrations = self._registrations[screen_no]
+            del registrations[stock_code]
+            if not registrations:
+                del self._registrations[screen_no]
+            if screen_no not in changed_screens:
+                changed_screens.append(screen_no)
+        return changed_screens
+
+    def revert_real(self, previous_fids: dict[str, frozenset]) -> None:
+        """
+        실시간 등록에 실패한 종목들의 화면 할당을 assign_real 이전으로 되돌립니다.
+
+        Parameters
+        ----------
+        previous_fids : dict[str, frozenset]
+            assign_real을 호출하기 전 fids_of로 얻은 종목별 FID들입니다. 비어있다면 할당되지 않았던 종목입니다.
+        """
+        for stock_code, fids in previous_fids.items():
+            if not fids:
+                self.release_real([stock_code])
+            else:
+                self._registrations[self._code_screens[stock_code]][stock_code] = fids
+
+    def get_stats(self) -> dict:
+        """
+        화면번호의 사용 현황을 반환합니다.
+
+        Returns
+        -------
+        dict
+            TR 화면 수, 사용중인 실시간 화면별 종목 수, 남은 실시간 화면 수, 실시간 등록된 종목 수,
+            사용중인 실시간 조건검색 화면들입니다.
+        """
+        return {
+            'tr_screens': len(self._tr_screens),
+            'real_screens': {screen_no: len(registrations)
+                             for screen_no, registrations in self._registrations.items()},
+            'free_real_screens': len(self._real_screens) - len(self._registrations),
+            'real_codes': len(self._code_screens),
+            'condition_screens': sorted(self._used_condition_screens),
+        }
+
+    def _find_real_screen(self) -> str:
+        """
+        새로운 종목을 등록할 실시간 화면을 찾습니다.
+        이미 사용중인 화면 중 여유가 있는 화면을 우선하여 화면 수를 최소화합니다.
+        """
+        for screen_no in self._real_screens:
+            registrations = self._registrations.get(screen_no)
+            if registrations is not None and len(registrations) < self.max_codes_per_screen:
+                return screen_no
+        for screen_no in self._real_screens:
+            if screen_no not in self._registrations:
+                return screen_no
+        raise RuntimeError(f'실시간 등록에 사용할 화면번호가 부족합니다. 최대 종목 수 - '
+                           f'{len(self._real_screens) * self.max_codes_per_screen}')
@@ -1,10 +1,19 @@
 import logging
-import json
-from PyQt5.QtNetwork import QTcpSocket
 
 from .utils import *
 from .kiwoom_api_const import *
 from .kiwoom_ocx import KiwoomOCX
+from .hub import Hub
+from .order_book import OrderBookCache
+from .tr_registry import get_tr_spec
+from .tr_request import TrRequest, TrRequestTable
+from .tr_cache import TrCache
+from .condition_manager import ConditionManager
+from .position_ledger import PositionLedger
+from .order_tracker import OrderTracker, CLOSED_STATES, FILLED, CANCELLED, REJECTED
+from .trigger_book import TriggerBook, TRIGGER_FIELDS
+from .scheduler import RequestScheduler, TR, HIGH_PRIORITY, OVERFLOW_ERRORS
+from .real_data_plan import get_price_change_plan, get_ask_bid_change_plan, ask_bid_depth
 
 logger = logging.getLogger(__name__)
 
@@ -13,20 +22,48 @@ class ServerHandler():
     서버로부터 보내진 수신 신호를 처리하는 클래스
     """
 
-    def __init__(self, ocx: KiwoomOCX, socket: QTcpSocket):
+    def __init__(self, ocx: KiwoomOCX, hub: Hub, book_cache: OrderBookCache, tr_requests: TrRequestTable,
+                 scheduler: RequestScheduler, tr_cache: TrCache, conditions: ConditionManager,
+                 ledger: PositionLedger, orders: OrderTracker, triggers: TriggerBook):
         """
         서버 핸들러를 초기화합니다.
+        OCX의 signal은 프록시 전체에서 한 번만 연결되어야 하므로 서버 핸들러도 하나만 존재합니다.
 
         Parameters
         ----------
         ocx : KiwoomOCX
-            _description_
-        socket: QTcpSocket
-            Client 측의 요청을 읽기 위한 socket입니다.
-            socket은 미리 연결되어있어야 합니다.
+            키움증권 측과 OCX로 통신하기 위해 사용되는 객체입니다.
+        hub: Hub
+            처리된 결과를 client들에게 분배하기 위한 객체입니다.
+        book_cache: OrderBookCache
+            delta 모드의 client에게 변경된 호가만 보내기 위해 마지막 호가를 저장하는 객체입니다.
+        tr_requests: TrRequestTable
+            응답을 기다리는 TR 요청의 정보를 ClientHandler와 공유하기 위한 객체입니다.
+        scheduler: RequestScheduler
+            연속 조회를 호출 제한 안에서 이어서 요청하기 위한 객체입니다.
+        tr_cache: TrCache
+            TR 결과를 저장하고 같은 요청을 기다리던 client들에게 전달하기 위한 객체입니다.
+        conditions: ConditionManager
+            실시간 조건검색 중인 조건검색식의 편입 종목을 저장하는 객체입니다.
+        ledger: PositionLedger
+            체결 데이터로 보유주식을 갱신하고 잔고 동기화 TR의 응답을 받는 객체입니다.
+        orders: OrderTracker
+            체결 데이터로 주문번호별 주문의 상태를 관리하는 객체입니다.
+        triggers: TriggerBook
+            실시간 데이터로 확인할 조건 주문들을 보관하는 객체입니다.
         """
         self._ocx = ocx
-        self._socket = socket
+        self._hub = hub
+        self._book_cache = book_cache
+        self._tr_requests = tr_requests
+        self._scheduler = scheduler
+        self._tr_cache = tr_cache
+        self._conditions = conditions
+        self._ledger = ledger
+        self._orders = orders
+        self._triggers = triggers
+        # 주문 TR의 응답보다 먼저 도착하여 받을 client를 아직 모르는 주문 메세지들을 주문번호별로 보관합니다.
+        self._early_order_messages: dict[str, list[dict]] = {}
         self._set_signal_slots_for_ocx(self._ocx)
         
     def _set_signal_slots_for_ocx(self, ocx: KiwoomOCX):
@@ -34,14 +71,11 @@ class ServerHandler():
         ocx.OnReceiveTrData.connect(self._tr_data_handler)
         ocx.OnReceiveConditionVer.connect(self._condition_name_result_handler)
         ocx.OnReceiveTrCondition.connect(self._condition_search_result_handler)
+        ocx.OnReceiveRealCondition.connect(self._real_condition_handler)
         ocx.OnReceiveChejanData.connect(self._chejan_data_handler)
         ocx.OnReceiveRealData.connect(self._real_data_handler)
         ocx.OnReceiveMsg.connect(self._server_msg_handler)
 
-    def _send_to_client(self, data_dict: dict):
-        data = json.dumps(data_dict) + '\n'
-        self._socket.write(data.encode())
-
     @trace
     def _login_result_handler(self, result: int) -> None:
         """
@@ -57,7 +91,12 @@ class ServerHandler():
             logger.info('성공적으로 로그인했습니다.')
         else:
             raise ConnectionError(f'로그인에 실패하였습니다. - err_code {result}')
-        self._send_to_client({'type': 'login_result', 'key': '', 'value': result})
+        self._hub.reply({'type': 'login_result', 'key': '', 'value': result})
+
+        # ClientHandler.load_account_number와 같이 첫번째 계좌의 잔고를 유지합니다.
+        account_list = self._ocx.get_login_info('ACCLIST').split(';')[:-1]
+        if account_list:
+            self._ledger.start(account_list[0])
     
     @trace
     def _tr_data_handler(self, screen_no: str, request_name: str, tr_code: str, tr_name: str, next_data: int,
@@ -79,95 +118,108 @@ class ServerHandler():
             연속 조회의 필요 여부를 나타냅니다. 0일시 필요없음을, 2일시 필요함을 의미합니다.
             멀티 데이터일 때 해당됩니다.
         """
-        # 주문 가능 금액 요청
-        if tr_code == 'opw00001':
-            deposit = clean_integer(self._ocx.get_comm_data(tr_code, request_name, 0, '주문가능금액'))
-            tr_result = deposit
-        
-        # 보유 주식 요청
-        elif tr_code == 'opw00018':
-            balance_dict = {}
-            info_num = self._ocx.get_repeat_cnt(tr_code, tr_name)
-            for i in range(info_num):
-                stock_code = clean_string(self._ocx.get_comm_data(tr_code, request_name, i, '종목번호'))
-                stock_name = clean_string(self._ocx.get_comm_data(tr_code, request_name, i, '종목명'))
-                amount = clean_integer(self._ocx.get_comm_data(tr_code, request_name, i, '보유수량'))
-                available_amount = clean_integer(self._ocx.get_comm_data(tr_code, request_name, i, '매매가능수량'))
-                purchased_price = clean_integer(self._ocx.get_comm_data(tr_code, request_name, i, '매입가'))
-
-                # stock_code의 맨 앞 문자는 주식의 구분 알파벳이므로 제외합니다.
-                stock_code = stock_code[1:]
-
-                balance_dict[stock_code] = {
-                    '종목코드': stock_code,
-                    '종목명': stock_name,
-                    '보유수량': amount,
-                    '주문가능수량': available_amount,
-                    '매입단가': purchased_price,
-                }
-            tr_result = balance_dict
-        
-        # 주식 기본 정보 요청
-        elif tr_code == 'opt10001':
-            cur_price = clean_integer(self._ocx.get_comm_data(tr_code, request_name, 0, '현재가'))
-            start_price = clean_integer(self._ocx.get_comm_data(tr_code, request_name, 0, '시가'))
-            high_price = clean_integer(self._ocx.get_comm_data(tr_code, request_name, 0, '고가'))
-            low_price = clean_integer(self._ocx.get_comm_data(tr_code, request_name, 0, '저가'))
-            info_dict = {
-                '현재가': cur_price,
-                '시가': start_price,
-                '고가': high_price,
-                '저가': low_price,
-            }
-            tr_result = info_dict
-        
-        # 주식 호가 정보 요청
-        elif tr_code == 'opt10004':
-            bid_info_list = []
-            ask_info_list = []
-            orders = ['최우선'] + [f'{i}차선' for i in range(2, 11)]
-            # 키움증권 API가 6차선 때만 특별한 이유없이 일관성이 깨집니다.
-            for order in orders:
-                # 매수6차선호가 매수6차선잔량 (X), 매수6우선호가 매수6우선잔량 (O)
-                if order == '6차선':
-                    order = '6우선'
-                cur_bid_price = self._ocx.get_comm_data(tr_code, request_name, 0, f'매수{order}호가')
-                cur_bid_amount = self._ocx.get_comm_data(tr_code, request_name, 0, f'매수{order}잔량')
-                bid_info_list.append((int(cur_bid_price.strip('+- ')), int(cur_bid_amount.strip('+- '))))
-            for order in orders:
-                cur_ask_price = self._ocx.get_comm_data(tr_code, request_name, 0, f'매도{order}호가')
-                # 매도6차선잔량 (X), 매도6우선잔량 (O)
-                if order == '6차선':
-                    order = '6우선'
-                cur_ask_amount = self._ocx.get_comm_data(tr_code, request_name, 0, f'매도{order}잔량')
-                ask_info_list.append((int(cur_ask_price.strip('+- ')), int(cur_ask_amount.strip('+- '))))
-            info_dict = {
-                '매수호가정보': bid_info_list,
-                '매도호가정보': ask_info_list,
-            }
-            tr_result = info_dict
-        
-        # 거래량 급증 주식 요청
-        elif tr_code == 'opt10023':
-            stock_codes = []
-            info_num = self._ocx.get_repeat_cnt(tr_code, tr_name)
-            for i in range(info_num):
-                stock_code = clean_string(self._ocx.get_comm_data(tr_code, request_name, i, '종목코드'))
-                stock_codes.append(stock_code)
-            tr_result = stock_codes
-
-        # 주문 요청
-        elif (tr_code == 'KOA_NORMAL_BUY_KP_ORD' or tr_code == 'KOA_NORMAL_SELL_KP_ORD' or
-             tr_code == 'KOA_NORMAL_BUY_KQ_ORD' or tr_code == 'KOA_NORMAL_SELL_KQ_ORD' or
-             tr_code == 'KOA_NORMAL_KP_CANCEL' or tr_code == 'KOA_NORMAL_KQ_CANCEL'):
-            # 주문 요청이 들어오면 주문 번호를 받고 보냅니다.
-            order_number = clean_string(self._ocx.get_comm_data(tr_code, request_name, 0, '주문번호'))
-            tr_result = order_number
-            
+        # TR 코드별로 선언된 TrSpec에 따라 데이터를 가져옵니다.
+        spec = get_tr_spec(tr_code)
+        tr_request = self._tr_requests.pop(request_name)
+        columnar = tr_request is not None and tr_request.columnar
+        tr_result = spec.decode(self._ocx, tr_code, tr_name, request_name, columnar)
+
+        # 잔고 동기화를 위해 proxy가 보낸 TR은 client에게 전달하지 않습니다.
+        if tr_request is not None and self._ledger.owns(tr_request):
+            self._ledger.receive(tr_request, tr_result, next_data, screen_no)
+            return
+        if tr_request is not None and tr_code == 'opw00001':
+            self._ledger.observe_deposit(tr_request, tr_result)
+
+        if tr_request is not None and tr_request.paginate:
+            self._stream_tr_page(tr_request, tr_result, next_data, screen_no)
+            return
+
+        # 여러 요청으로 나누어진 요청은 모든 결과가 모였을 때 client의 request_name으로 한 번만 전달합니다.
+        if tr_request is not None and tr_request.bulk is not None:
+            if tr_request.bulk.add(tr_result):
+                bulk_name = tr_request.bulk.request_name
+                self._hub.reply({'type': 'tr_result', 'key': bulk_name, 'value': (tr_request.bulk.result, next_data)})
+            return
+
+        # 이후의 체결 데이터는 주문을 요청한 client에게만 전달되도록 합니다.
+        if spec.is_order:
+            self._orders.acknowledge(request_name, tr_result)
+            requester = self._hub.requester_of('tr_result', request_name)
+            if requester is not None and tr_result:
+                self._hub.set_owner('order_result', tr_result, requester)
+                self._hub.set_owner('order_event', tr_result, requester)
+            elif requester is not None:
+                # 주문번호 없이 응답이 왔다면 서버에서 주문이 거부된 것이므로 request_name으로 알립니다.
+                self._hub.set_owner('order_event', request_name, requester)
+                self._hub.deliver({'type': 'order_event', 'key': request_name,
+                                   'value': {'event': REJECTED, '주문번호': ''}})
+                self._hub.release_owner('order_event', request_name)
+
+        value = (tr_result, next_data)
+        self._hub.reply({'type': 'tr_result', 'key': request_name, 'value': value})
+        if spec.is_order:
+            self._deliver_early_order_messages(tr_result)
+            self._deliver_basket_results()
+
+        # 응답을 기다리는 동안 들어온 같은 요청들에게도 각자의 request_name으로 결과를 전달합니다.
+        if tr_request is not None and not spec.is_order:
+            for follower_name in dict.fromkeys(self._tr_cache.complete(TrCache.key_of(tr_request), value)):
+                if follower_name != request_name:
+                    self._hub.reply({'type': 'tr_result', 'key': follower_name, 'value': value})
+
+    def _stream_tr_page(self, tr_request: TrRequest, tr_result, next_data, screen_no: str) -> None:
+        """
+        자동 연속 조회 중인 요청의 페이지를 client에게 전달하고 다음 페이지를 요청합니다.
+        마지막 페이지였다면 받은 페이지 수를 담은 tr_end를 전달합니다.
+
+        Parameters
+        ----------
+        tr_request : TrRequest
+            페이지를 받은 TR 요청입니다.
+        tr_result
+            TrSpec으로 가져온 이번 페이지의 데이터입니다.
+        next_data
+            연속 조회의 필요 여부입니다.
+        screen_no : str
+            이번 페이지를 받은 화면번호입니다. 연속 조회도 같은 화면번호로 요청합니다.
+        """
+        request_name = tr_request.request_name
+        # 요청한 client의 연결이 끊어졌다면 더 이상 전달하거나 요청하지 않습니다.
+        if self._hub.requester_of('tr_end', request_name) is None:
+            self._hub.release_owner('tr_page', request_name)
+            return
+
+        tr_request.pages += 1
+        self._hub.deliver({'type': 'tr_page', 'key': request_name,
+                           'value': {'page': tr_request.pages, 'data': tr_result}})
+        if tr_request.has_next_page(next_data):
+            def job() -> int:
+                result = tr_request.request(self._ocx, 2, screen_no)
+                if result not in OVERFLOW_ERRORS and result != 0:
+                    raise RuntimeError(f'연속 조회 요청에 실패하였습니다. err_code - {result}')
+                return result
+
+            def on_error(error: Exception) -> None:
+                # 실패를 알린 후 지금까지 받은 페이지 수로 연속 조회를 끝냅니다.
+                requester = self._hub.requester_of('tr_end', request_name)
+                if requester is not None:
+                    requester.send({'type': 'request_error', 'key': request_name, 'value': str(error)})
+                self._end_tr_pages(tr_request)
+
+            self._tr_requests.add(tr_request)
+            # 이미 시작된 요청을 먼저 끝낼 수 있도록 새로운 요청보다 먼저 실행합니다.
+            self._scheduler.submit(TR, request_name, job, HIGH_PRIORITY, on_error)
         else:
-            raise NotImplementedError(f'아직 구현되지 않은 TR 코드 - {tr_code} 입니다.')
-        
-        self._send_to_client({'type': 'tr_result', 'key': request_name, 'value': (tr_result, next_data)})
+            self._end_tr_pages(tr_request)
+
+    def _end_tr_pages(self, tr_request: TrRequest) -> None:
+        """
+        자동 연속 조회를 끝내고 client에게 tr_end를 전달합니다.
+        """
+        self._tr_requests.pop(tr_request.request_name)
+        self._hub.release_owner('tr_page', tr_request.request_name)
+        self._hub.reply({'type': 'tr_end', 'key': tr_request.request_name, 'value': {'pages': tr_request.pages}})
 
     @trace
     def _condition_name_result_handler(self, is_success: int, msg: str) -> None:
@@ -186,7 +238,11 @@ class ServerHandler():
         if is_success == 1:
             logger.info('조건검색식이 준비되었습니다.')
         else:
-            raise ConnectionError(f'조건검색식을 불러오는 준비에 실패하였습니다. err_code - {is_success}')
+            error = ConnectionError(f'조건검색식을 불러오는 준비에 실패하였습니다. err_code - {is_success}')
+            self._conditions.fail_load()
+            for _, condition_name, _ in self._conditions.take_pending():
+                self._hub.fail('matching_stocks', condition_name, error)
+            raise error
         
         condition_list = []
         result = self._ocx.get_condition_name_list()
@@ -194,7 +250,19 @@ class ServerHandler():
         for index_and_name in index_and_name_list:
             index, name = index_and_name.split('^')
             condition_list.append({'name': name, 'index': int(index)})
-        self._send_to_client({'type': 'condition_names', 'key': '', 'value': condition_list})
+        self._conditions.set_condition_list(self._ocx.get_login_info('USER_ID'), condition_list)
+
+        # 저장된 목록을 이미 받은 client들을 위해 백그라운드로 불러온 경우에는 전달하지 않습니다.
+        if self._hub.requester_of('condition_names', '') is not None:
+            self._hub.reply({'type': 'condition_names', 'key': '', 'value': condition_list})
+
+        # 로드가 완료되기를 기다리던 조건검색 요청들을 요청합니다.
+        for _, condition_name, request in self._conditions.take_pending():
+            try:
+                request()
+            except RuntimeError as error:
+                logger.exception(f'조건검색식 - {condition_name} 의 검색 요청에 실패하였습니다.')
+                self._hub.fail('matching_stocks', condition_name, error)
 
     @trace
     def _condition_search_result_handler(self, screen_no: str, stock_codes: str, condition_name: str, 
@@ -216,7 +284,38 @@ class ServerHandler():
             연속 조회가 필요한지 나타내는 값입니다. 0이면 필요없음을, 2이면 필요함을 의미합니다.
         """
         stock_code_list = stock_codes.split(';')[:-1]
-        self._send_to_client({'type': 'matching_stocks', 'key': condition_name, 'value': stock_code_list})
+        self._conditions.set_stock_codes(condition_name, stock_code_list)
+        self._hub.reply({'type': 'matching_stocks', 'key': condition_name, 'value': stock_code_list})
+
+    @trace
+    def _real_condition_handler(self, stock_code: str, event_type: str, condition_name: str,
+                                condition_index: str) -> None:
+        """
+        실시간 조건검색 중인 조건검색식에 종목이 편입되거나 이탈했을 때 호출되는 핸들러입니다.
+
+        조건검색식을 구독한 client들에게 condition_enter 혹은 condition_exit를 전달합니다.
+
+        Parameters
+        ----------
+        stock_code : str
+            편입되거나 이탈한 종목 코드입니다.
+        event_type : str
+            'I'이면 편입을, 'D'이면 이탈을 의미합니다.
+        condition_name : str
+            조건검색식의 이름입니다.
+        condition_index : str
+            조건검색식의 인덱스입니다.
+        """
+        if event_type == 'I':
+            msg_type = 'condition_enter'
+        elif event_type == 'D':
+            msg_type = 'condition_exit'
+        else:
+            raise ValueError(f'유효하지 않은 실시간 조건검색 타입 - {event_type} 입니다.')
+
+        # 같은 편입, 이탈이 반복되어 들어오는 경우는 전달하지 않습니다.
+        if self._conditions.apply(condition_name, stock_code, event_type == 'I'):
+            self._hub.publish({'type': msg_type, 'key': condition_name, 'value': stock_code})
 
     @trace
     def _chejan_data_handler(self, data_type: str, info_num: int, fid_list: str) -> None:
@@ -237,61 +336,40 @@ class ServerHandler():
             데이터에서 가져올 수 있는 FID의 리스트입니다.
             ';'로 구분되어 있습니다.
         """
+        # 주문이 접수되거나 체결되면 저장된 예수금과 잔고는 더 이상 유효하지 않습니다.
+        # 보유주식은 아래의 잔고 데이터로 ledger에서 갱신되지만 주문가능금액은 다시 조회해야 합니다.
+        self._tr_cache.invalidate('opw00001')
+        self._tr_cache.invalidate('opw00018')
+        self._ledger.invalidate_deposit()
+
         # 체결 관련 데이터
         if data_type == '0':
-            order_number = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['주문번호']))
-            stock_code = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['종목코드']))
-            stock_name = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['종목명']))
-            order_status = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['주문상태']))
-            order_type = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['주문구분']))
-            order_amount = clean_integer(self._ocx.get_chejan_data(KOR_NAME_TO_FID['주문수량']))
-            traded_price = clean_integer(self._ocx.get_chejan_data(KOR_NAME_TO_FID['체결가']))
-            traded_amount = clean_integer(self._ocx.get_chejan_data(KOR_NAME_TO_FID['체결량']))
-            nontraded_amount = clean_integer(self._ocx.get_chejan_data(KOR_NAME_TO_FID['미체결수량']))
-            
-            if order_status == '접수':
-                # 다른 접수 신호는 무시하고 미체결 클리어 신호만 처리합니다.
-                if nontraded_amount == 0:
-                    info_dict = {
-                        '종목코드': stock_code,
-                        '종목명': stock_name,
-                        '주문상태': order_status,
-                        '주문구분': order_type,
-                        '주문수량': order_amount,
-                        '체결가': 0,
-                        '체결량': 0,
-                        '미체결수량': 0,
-                        '주문번호': order_number,
-                    }
-                    self._send_to_client({'type': 'order_result', 'key': order_number, 'value': info_dict})
-
-            elif order_status == '확인':
-                if order_type == '매수취소' or order_type == '매도취소':
-                    self._send_to_client({'type': 'order_result', 'key': order_number, 'value': {}})
+            # 주문상태를 먼저 읽고 그 상태에 필요한 FID만 가져옵니다.
+            order_status, order, events = self._orders.apply(self._read_chejan)
+            for event in events:
+                order_number = event['주문번호']
+                self._deliver_order_message({'type': 'order_event', 'key': order_number, 'value': event})
+                # 일부만 정정, 취소된 주문은 계속 미체결로 남아있습니다.
+                if event['event'] not in CLOSED_STATES or self._orders.get(order_number) is not None:
+                    continue
+                self._hub.release_owner('order_event', order_number)
+
+                # 기존 client와의 호환을 위해 완전히 체결되었거나 미체결이 정리된 주문은 order_result로도 전달합니다.
+                if event['event'] == FILLED:
+                    logger.info(f'{event["종목코드"]} {event["종목명"]} - 주문이 완전히 체결되었습니다. '
+                                f'주문수량: {event["주문수량"]}')
+                    self._deliver_order_result(order_number, self._to_order_result(event, '체결'))
+                elif event['event'] == CANCELLED:
+                    self._deliver_order_result(order_number, self._to_order_result(event, '접수'))
                 else:
-                    raise NotImplementedError(f'예상치 못한 주문구분 - {order_type} 입니다.')
-            
-            elif order_status == '체결':
-                info_dict = {
-                    '종목코드': stock_code,
-                    '종목명': stock_name,
-                    '주문상태': order_status,
-                    '주문구분': order_type,
-                    '주문수량': order_amount,
-                    '체결가': traded_price,
-                    '체결량': traded_amount,
-                    '미체결수량': nontraded_amount,
-                    '주문번호': order_number,
-                }
-                logger.info(f'{info_dict["종목코드"]} {info_dict["종목명"]} - 주문이 일부 혹은 완전히 체결되었습니다.')
-                logger.info(f'{info_dict["종목코드"]} {info_dict["종목명"]} - 체결량: {info_dict["체결량"]}, 주문수량: {info_dict["주문수량"]}')
-                
-                # 주문이 완전히 체결되었을 때만 보냅니다.
-                if nontraded_amount == 0:
-                    self._send_to_client({'type': 'order_result', 'key': order_number, 'value': info_dict})
-            
-            else:
-                raise NotImplementedError(f'확인되지 않은 주문 상태 - {order_status}입니다.')
+                    self._hub.release_owner('order_result', order_number)
+
+            # 취소 주문 자체는 확인되었을 때 빈 order_result로 완료를 알립니다.
+            # 정정 주문은 확인된 이후에 새로운 주문으로서 체결됩니다.
+            if order is not None and order_status == '확인' and order.is_cancel:
+                self._hub.release_owner('order_event', order.order_number)
+                self._deliver_order_result(order.order_number, {})
+            self._deliver_basket_results()
 
         # 잔고 관련 데이터
         elif data_type == '1':
@@ -309,11 +387,75 @@ class ServerHandler():
                 '주문가능수량': available_amount,
                 '매입단가': avg_buy_price,
             }
-            self._send_to_client({'type': 'balance_change', 'key': info_dict['종목코드'], 'value': info_dict})
+            account_number = clean_string(self._ocx.get_chejan_data(KOR_NAME_TO_FID['계좌번호']))
+            self._ledger.apply_balance(account_number, info_dict)
+            self._hub.broadcast({'type': 'balance_change', 'key': info_dict['종목코드'], 'value': info_dict})
 
         elif data_type == '4':
             raise NotImplementedError('파생잔고 변경은 아직 구현되지 않았습니다.')
 
+    def _read_chejan(self, name: str) -> str:
+        return self._ocx.get_chejan_data(KOR_NAME_TO_FID[name])
+
+    def _to_order_result(self, event: dict, order_status: str) -> dict:
+        traded = order_status == '체결'
+        return {
+            '종목코드': event['종목코드'],
+            '종목명': event['종목명'],
+            '주문상태': order_status,
+            '주문구분': event['주문구분'],
+            '주문수량': event['주문수량'],
+            '체결가': event['체결가'] if traded else 0,
+            '체결량': event['누적체결량'] if traded else 0,
+            '미체결수량': 0,
+            '주문번호': event['주문번호'],
+        }
+
+    def _deliver_order_result(self, order_number: str, info_dict: dict) -> None:
+        self._deliver_order_message({'type': 'order_result', 'key': order_number, 'value': info_dict})
+        self._hub.release_owner('order_result', order_number)
+
+    def _deliver_order_message(self, data_dict: dict) -> None:
+        # 체결 데이터는 주문 TR의 응답보다 먼저 도착하기도 하므로, 응답을 기다리는 주문이 있다면 보관합니다.
+        if self._hub.owner_of(data_dict['type'], data_dict['key']) is None and self._orders.has_unacknowledged():
+            self._early_order_messages.setdefault(data_dict['key'], []).append(data_dict)
+        else:
+            self._hub.deliver(data_dict)
+
+    def _deliver_early_order_messages(self, order_number: str) -> None:
+        # 주문 TR의 응답으로 소유자가 정해졌으므로 보관했던 메세지들을 전달합니다.
+        messages = self._early_order_messages.pop(order_number, []) if order_number else []
+        for data_dict in messages:
+            self._hub.deliver(data_dict)
+        # 이미 완료된 주문이라면 이후에 받을 메세지가 없습니다.
+        if messages and self._orders.is_closed(order_number):
+            self._hub.release_owner('order_event', order_number)
+            self._hub.release_owner('order_result', order_number)
+        if self._early_order_messages and not self._orders.has_unacknowledged():
+            # 기다리는 주문이 없다면 남은 메세지들은 proxy 밖에서 전송된 주문의 것입니다.
+            logger.info(f'요청한 client가 없는 주문 - {list(self._early_order_messages)} 의 메세지를 버립니다.')
+            self._early_order_messages.clear()
+
+    def _deliver_basket_results(self) -> None:
+        # send_orders의 모든 주문이 완료되었다면 주문별 결과를 모아 한 번 전달합니다.
+        for basket in self._orders.completed_baskets():
+            self._hub.deliver({'type': 'basket_result', 'key': basket.request_name, 'value': basket.to_dict()})
+            self._hub.release_owner('basket_result', basket.request_name)
+
+    @staticmethod
+    def _project_ask_bid(info_dict: dict, fields: frozenset) -> dict:
+        # 구독한 client가 받고 싶은 차선까지만 전달합니다.
+        depth = ask_bid_depth(fields)
+        if depth == len(info_dict['매수호가정보']):
+            return info_dict
+        return {name: levels[:depth] for name, levels in info_dict.items()}
+
+    def _fire_triggers(self, real_type: str, stock_code: str, value: int | None) -> None:
+        for rule in self._triggers.check(real_type, stock_code, value):
+            logger.info(f'조건 주문 - {rule.request_name} 의 조건 {rule.condition} {rule.level} 을(를) '
+                        f'{stock_code} 의 값 {value} 이(가) 만족하였습니다.')
+            rule.fire(rule, value)
+
     @trace
     def _real_data_handler(self, stock_code: str, signal_type: str, unused) -> None:
         """
@@ -330,38 +472,67 @@ class ServerHandler():
         # 실시간 가격 정보를 등록한 뒤 주식이 체결되었을 때 발생하는 신호
         # '체결 시간'은 HHMMSS의 문자열 포맷으로 전달됩니다.
         if signal_type == '주식체결':
-            cur_price = clean_integer(self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID['현재가']))
-            start_price = clean_integer(self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID['시가']))
-            high_price = clean_integer(self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID['고가']))
-            low_price = clean_integer(self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID['저가']))
-            info_dict = {
-                '현재가': cur_price,
-                '시가': start_price,
-                '고가': high_price,
-                '저가': low_price,
-            }
-            self._send_to_client({'type': 'price_change', 'key': stock_code, 'value': info_dict})
+            has_subscribers = self._hub.has_subscribers('price_change', stock_code)
+            has_triggers = self._triggers.has_rules(signal_type, stock_code)
+            if not has_subscribers and not has_triggers:
+                return
+            # 구독한 client들이 받고 싶은 항목들의 합집합만 OCX로부터 가져옵니다.
+            info_dict = {}
+            if has_subscribers:
+                plan = get_price_change_plan(self._hub.fields_of('price_change', stock_code))
+                info_dict = dict(zip(plan.names, plan.extract(self._ocx, stock_code)))
+            # 조건 주문은 client에게 전달하기 전에 먼저 확인하여 바로 주문합니다.
+            # 조건 주문이 감시하는 값은 구독 항목에 섞지 않고, 구독한 client가 받지 않는 값이라면 따로 가져옵니다.
+            if has_triggers:
+                if '현재가' in info_dict:
+                    price = info_dict['현재가']
+                else:
+                    price = get_price_change_plan(TRIGGER_FIELDS[signal_type]).extract(self._ocx, stock_code)[0]
+                self._fire_triggers(signal_type, stock_code, price)
+            if has_subscribers:
+                self._hub.publish_fields({'type': 'price_change', 'key': stock_code, 'value': info_dict})
 
 
         # 실시간 호가정보를 등록한 뒤 호가의 변경이 일어났을 때 발생하는 신호
         elif signal_type == '주식호가잔량':
-            bid_info_list = []
-            ask_info_list = []
-            for num in range(10):
-                cur_bid_price = self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매수호가{num + 1}'])
-                cur_bid_amount = self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매수호가 수량{num + 1}'])
-                cur_bid_price, cur_bid_amount = clean_integer(cur_bid_price), clean_integer(cur_bid_amount)
-                bid_info_list.append((cur_bid_price, cur_bid_amount))
-            for num in range(10):
-                cur_ask_price = self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매도호가{num + 1}'])
-                cur_ask_amount = self._ocx.get_comm_real_data(stock_code, KOR_NAME_TO_FID[f'매도호가 수량{num + 1}'])
-                cur_ask_price, cur_ask_amount = clean_integer(cur_ask_price), clean_integer(cur_ask_amount)
-                ask_info_list.append((cur_ask_price, cur_ask_amount))
-            info_dict = {
-                '매수호가정보': bid_info_list,
-                '매도호가정보': ask_info_list,
-            }
-            self._send_to_client({'type': 'ask_bid_change', 'key': stock_code, 'value': info_dict})
+            has_full_subscribers = self._hub.has_subscribers('ask_bid_change', stock_code)
+            has_delta_subscribers = self._hub.has_subscribers('ask_bid_delta', stock_code)
+            has_triggers = self._triggers.has_rules(signal_type, stock_code)
+            if not has_full_subscribers and not has_delta_subscribers and not has_triggers:
+                return
+            # 구독한 client들이 받고 싶은 가장 깊은 차선까지만 OCX로부터 가져옵니다.
+            # 구독한 client의 호가에는 최우선 호가가 항상 포함되므로 조건 주문은 그 값으로 확인하고,
+            # 구독한 client가 없을 때만 조건 주문을 위해 최우선 호가를 가져옵니다.
+            fields = self._hub.fields_of('ask_bid_change', stock_code) | self._hub.fields_of('ask_bid_delta', stock_code)
+            plan = get_ask_bid_change_plan(fields or TRIGGER_FIELDS[signal_type])
+            values = plan.extract(self._ocx, stock_code)
+            if has_triggers:
+                # 최우선 매수호가와 매도호가 중 하나라도 없다면 스프레드를 알 수 없습니다.
+                best_bid, best_ask = values[0], values[len(values) // 2]
+                spread = best_ask - best_bid if best_bid and best_ask else None
+                self._fire_triggers(signal_type, stock_code, spread)
+            if not has_full_subscribers and not has_delta_subscribers:
+                return
+            # 구독중인 종목의 호가는 메모리에 유지되어 get_ask_bid_info를 TR 없이 처리할 수 있습니다.
+            seq, changes = self._book_cache.update(stock_code, values)
+            if has_full_subscribers:
+                depth = len(values) // 4
+                info_dict = {
+                    '매수호가정보': list(zip(values[0:depth], values[depth:2 * depth])),
+                    '매도호가정보': list(zip(values[2 * depth:3 * depth], values[3 * depth:])),
+                }
+                self._hub.publish_fields({'type': 'ask_bid_change', 'key': stock_code, 'value': info_dict},
+                                         self._project_ask_bid)
+
+            # delta 모드의 client에게는 변경된 호가만 보내고, 주기적으로 전체 호가를 보냅니다.
+            if has_delta_subscribers and changes:
+                if self._book_cache.is_snapshot_due(stock_code):
+                    snapshot = self._book_cache.snapshot(stock_code)
+                    self._hub.publish({'type': 'ask_bid_delta', 'key': stock_code,
+                                       'value': {'seq': seq, 'changes': None, 'snapshot': snapshot}})
+                else:
+                    self._hub.publish({'type': 'ask_bid_delta', 'key': stock_code,
+                                       'value': {'seq': seq, 'changes': changes, 'snapshot': None}})
 
         # 장외주식호가
         elif signal_type == 'ECN주식호가잔량':
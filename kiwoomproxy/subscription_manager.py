@@ -0,0 +1,172 @@
+import logging
+from collections import Counter
+
+from .kiwoom_ocx import KiwoomOCX
+from .screen_allocator import ScreenAllocator
+
+logger = logging.getLogger(__name__)
+
+class SubscriptionManager():
+    """
+    여러 client의 실시간 등록을 (종목 코드, FID 집합)별로 참조 횟수를 세어 OCX에 한 번씩만 등록하는 클래스
+
+    같은 종목을 여러 client가 등록해도 OCX에는 한 번만 등록되고,
+    마지막 client가 해제했을 때만 OCX의 등록이 해제됩니다.
+    종목에 남아있는 FID 집합이 줄어들어도 다시 등록하지 않습니다.
+    SetRealRemove와 SetRealReg 사이에 남은 client들의 실시간 데이터가 끊기기 때문이며,
+    더 이상 받지 않는 항목은 hub가 구독한 client마다 걸러냅니다.
+    """
+
+    def __init__(self, ocx: KiwoomOCX, screens: ScreenAllocator):
+        """
+        SubscriptionManager 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            실시간 정보를 등록하고 해제할 OCX입니다.
+        screens : ScreenAllocator
+            실시간 등록에 사용할 화면번호를 할당하는 객체입니다.
+        """
+        self._ocx = ocx
+        self._screens = screens
+        # (종목 코드, FID 집합)마다 그 등록을 사용하는 client와 사용 횟수를 저장합니다.
+        self._references: dict[tuple[str, frozenset], Counter] = {}
+        self._fid_sets: dict[str, set[frozenset]] = {}
+
+    def acquire(self, holder, stock_code_list: list[str], fid_list: list[str]) -> None:
+        """
+        holder가 종목들의 실시간 정보를 사용한다고 등록합니다.
+        OCX에 등록되어있지 않은 FID가 있는 종목만 새로 등록합니다.
+
+        Parameters
+        ----------
+        holder
+            등록을 사용하는 client입니다. 보통 ClientConnection입니다.
+        stock_code_list : list[str]
+            실시간 정보를 등록할 종목 코드의 리스트입니다.
+        fid_list : list[str]
+            받고 싶은 FID들의 리스트입니다.
+        """
+        fids = frozenset(fid_list)
+        previous_fids = {stock_code: self._screens.fids_of(stock_code) for stock_code in stock_code_list}
+        for stock_code in stock_code_list:
+            self._references.setdefault((stock_code, fids), Counter())[holder] += 1
+            self._fid_sets.setdefault(stock_code, set()).add(fids)
+        registered_codes = []
+        try:
+            for screen_no, screen_code_list in self._screens.assign_real(stock_code_list, fid_list).items():
+                self._set_real_reg(screen_no, screen_code_list, fid_list)
+                registered_codes.extend((screen_no, stock_code) for stock_code in screen_code_list)
+        except Exception:
+            # 등록에 실패하면 참조 횟수와 화면 할당을 acquire 이전으로 되돌려 해제되지 않는 등록이 남지 않도록 합니다.
+            for stock_code in stock_code_list:
+                self._drop_reference(holder, stock_code, fids)
+            for screen_no, stock_code in registered_codes:
+                if not previous_fids[stock_code]:
+                    self._ocx.set_real_remove(screen_no, stock_code)
+            self._screens.revert_real(previous_fids)
+            for stock_code, fids_before in previous_fids.items():
+                if not fids_before and not self._fid_sets.get(stock_code):
+                    self._fid_sets.pop(stock_code, None)
+            raise
+
+    def release(self, holder, stock_code_list: list[str], fid_list: list[str]) -> None:
+        """
+        holder가 acquire했던 종목들의 실시간 정보를 더 이상 사용하지 않는다고 등록합니다.
+
+        Parameters
+        ----------
+        holder
+            acquire할 때 사용한 client입니다.
+        stock_code_list : list[str]
+            실시간 등록을 해제할 종목 코드의 리스트입니다.
+        fid_list : list[str]
+            acquire할 때 사용한 FID들의 리스트입니다.
+        """
+        fids = frozenset(fid_list)
+        unused_codes = [stock_code for stock_code in stock_code_list if self._drop_reference(holder, stock_code, fids)]
+        self._shrink(unused_codes)
+
+    def release_all(self, holder) -> None:
+        """
+        holder의 모든 실시간 등록을 해제합니다. client의 연결이 끊어졌을 때 호출됩니다.
+        """
+        held = [key for key, references in self._references.items() if holder in references]
+        for stock_code, fids in held:
+            references = self._references[(stock_code, fids)]
+            references.pop(holder)
+            if not references:
+                del self._references[(stock_code, fids)]
+                self._fid_sets[stock_code].discard(fids)
+        self._shrink(list(dict.fromkeys(stock_code for stock_code, _ in held)))
+
+    def get_stats(self) -> dict:
+        """
+        실시간 등록의 현황을 반환합니다.
+
+        Returns
+        -------
+        dict
+            OCX에 등록된 종목 수, (종목 코드, FID 집합)의 수, 모든 client의 참조 횟수의 합입니다.
+        """
+        return {
+            'codes': len(self._fid_sets),
+            'subscriptions': len(self._references),
+            'references': sum(sum(references.values()) for references in self._references.values()),
+        }
+
+    def _drop_reference(self, holder, stock_code: str, fids: frozenset) -> bool:
+        """
+        holder의 (종목 코드, FID 집합) 참조를 하나 줄입니다.
+
+        Returns
+        -------
+        bool
+            아무도 사용하지 않게 된 FID 집합이 있다면 True를 반환합니다.
+        """
+        references = self._references.get((stock_code, fids))
+        if references is None or references[holder] == 0:
+            return False
+        references[holder] -= 1
+        if references[holder] == 0:
+            del references[holder]
+        if references:
+            return False
+        del self._references[(stock_code, fids)]
+        self._fid_sets[stock_code].discard(fids)
+        return True
+
+    def _shrink(self, stock_code_list: list[str]) -> None:
+        """
+        참조가 줄어든 종목들 중 남은 FID 집합이 없는 종목은 등록을 해제하고 화면에서 제거합니다.
+        FID 집합이 하나라도 남아있다면 OCX의 등록을 그대로 유지합니다.
+        """
+        for stock_code in stock_code_list:
+            if self._fid_sets.get(stock_code):
+                continue
+            self._fid_sets.pop(stock_code, None)
+            screen_no = self._screens.screen_of(stock_code)
+            if screen_no is None:
+                continue
+            self._ocx.set_real_remove(screen_no, stock_code)
+            self._screens.release_real([stock_code])
+            logger.info(f'종목 - {stock_code} 의 실시간 등록이 해제되었습니다.')
+
+    def _set_real_reg(self, screen_no: str, stock_code_list: list[str], fid_list: list[str]) -> None:
+        """
+        화면의 기존 등록과 함께 종목들을 실시간 등록합니다.
+        """
+        stock_code_str = ''
+        for stock_code in stock_code_list:
+            stock_code_str += stock_code + ';'
+        fid_str = ''
+        for fid in fid_list:
+            fid_str += fid + ';'
+
+        # set_real_reg API를 호출합니다.
+        result = self._ocx.set_real_reg(screen_no, stock_code_str, fid_str, '1')
+        if result == 0:
+            logger.info('실시간 정보가 정상적으로 등록되었습니다.')
+        else:
+            raise RuntimeError(f'등록에 실패하였습니다. err_code - {result}')
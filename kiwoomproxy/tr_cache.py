@@ -0,0 +1,148 @@
+import time
+import logging
+from typing import Callable
+
+from .tr_request import TrRequest
+
+logger = logging.getLogger(__name__)
+
+# TR 코드별로 결과를 재사용할 시간(초)입니다. 등록되지 않은 TR은 저장하지 않고 동시 요청만 합칩니다.
+DEFAULT_TR_TTLS = {
+    'opt10001': 1.0,
+    'opt10004': 0.2,
+    'opw00001': 1.0,
+}
+
+class TrCache():
+    """
+    같은 입력의 조회 TR 요청을 하나로 합치고 그 결과를 TR별 유효시간 동안 재사용하는 클래스
+
+    같은 요청이 응답을 기다리는 중이라면 새로운 요청은 comm_rq_data를 호출하지 않고 그 응답을 함께 받으며,
+    유효시간 안에 다시 요청되면 저장된 결과를 바로 돌려줍니다.
+    """
+
+    def __init__(self, ttls: dict[str, float] | None = None, clock: Callable[[], float] = time.monotonic):
+        """
+        TrCache 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        ttls : dict[str, float] | None
+            TR 코드별 결과의 유효시간(초)입니다. None이라면 DEFAULT_TR_TTLS를 사용합니다.
+        clock : Callable[[], float]
+            현재 시각(초)을 반환하는 함수입니다.
+        """
+        self._ttls = dict(DEFAULT_TR_TTLS if ttls is None else ttls)
+        self._clock = clock
+        # 저장된 결과와 그 만료 시각입니다.
+        self._results: dict[tuple, tuple[float, object]] = {}
+        # 응답을 기다리고 있는 요청마다 함께 결과를 받을 request_name들입니다.
+        self._in_flight: dict[tuple, list[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def set_ttl(self, tr_code: str, ttl: float) -> None:
+        """
+        TR 코드의 결과 유효시간(초)을 설정합니다. 0 이하라면 결과를 저장하지 않습니다.
+        """
+        if ttl > 0:
+            self._ttls[tr_code] = ttl
+        else:
+            self._ttls.pop(tr_code, None)
+            self.invalidate(tr_code)
+
+    @staticmethod
+    def key_of(tr_request: TrRequest) -> tuple:
+        """
+        같은 결과를 받는 요청들을 구분하기 위한 key를 반환합니다.
+        """
+        return (tr_request.tr_code, tuple(tr_request.input_list), tr_request.columnar)
+
+    def get(self, key: tuple):
+        """
+        유효시간이 지나지 않은 결과가 있다면 반환합니다. 없다면 None을 반환합니다.
+        """
+        cached = self._results.get(key)
+        if cached is not None:
+            expires_at, value = cached
+            if self._clock() < expires_at:
+                self.hits += 1
+                return value
+            del self._results[key]
+        return None
+
+    def join(self, key: tuple, request_name: str) -> bool:
+        """
+        같은 요청이 응답을 기다리는 중이라면 그 응답을 함께 받도록 등록합니다.
+
+        Returns
+        -------
+        bool
+            등록되었다면 True를, 기다리는 요청이 없어서 새로 요청해야 한다면 False를 반환합니다.
+        """
+        followers = self._in_flight.get(key)
+        if followers is None:
+            return False
+        followers.append(request_name)
+        self.coalesced += 1
+        return True
+
+    def start(self, key: tuple) -> None:
+        """
+        새로운 요청이 응답을 기다리기 시작했음을 등록합니다.
+        """
+        self._in_flight[key] = []
+        self.misses += 1
+
+    def abandon(self, key: tuple) -> list[str]:
+        """
+        요청이 실패하여 응답이 오지 않음을 등록합니다.
+
+        Returns
+        -------
+        list[str]
+            함께 결과를 기다리던 request_name들입니다.
+        """
+        return self._in_flight.pop(key, [])
+
+    def complete(self, key: tuple, value) -> list[str]:
+        """
+        응답을 저장하고 함께 결과를 기다리던 request_name들을 반환합니다.
+
+        Parameters
+        ----------
+        key : tuple
+            응답을 받은 요청의 key입니다.
+        value
+            client에게 전달할 결과입니다.
+
+        Returns
+        -------
+        list[str]
+            같은 결과를 전달해야 하는 다른 request_name들입니다.
+        """
+        ttl = self._ttls.get(key[0])
+        if ttl is not None:
+            self._results[key] = (self._clock() + ttl, value)
+        return self._in_flight.pop(key, [])
+
+    def invalidate(self, tr_code: str) -> None:
+        """
+        TR 코드의 저장된 결과를 모두 버립니다. 주문이 체결되어 잔고가 바뀌었을 때처럼 결과가 바뀌었을 때 호출합니다.
+        """
+        for key in [key for key in self._results if key[0] == tr_code]:
+            del self._results[key]
+
+    def get_stats(self) -> dict:
+        """
+        저장된 결과를 재사용한 횟수, 새로 요청한 횟수, 응답을 함께 받은 횟수 등을 반환합니다.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'entries': len(self._results),
+            'in_flight': len(self._in_flight),
+            'ttls': dict(self._ttls),
+        }
@@ -0,0 +1,336 @@
+from typing import Any, Callable
+
+from .utils import clean_integer, clean_string, clean_float, clean_integer_column, clean_string_column
+
+# 한 열 전체를 한 번에 변환하는 함수들입니다. 없는 경우 한 칸씩 decoder를 호출합니다.
+COLUMN_DECODERS = {
+    clean_integer: clean_integer_column,
+    clean_string: clean_string_column,
+}
+
+class TrField():
+    """
+    TR 데이터의 항목 하나를 어떻게 가져와서 어떤 이름으로 변환할지 나타내는 클래스
+    """
+
+    def __init__(self, name: str, alias: str | None = None, decoder: Callable[[str], Any] = clean_integer):
+        """
+        Parameters
+        ----------
+        name : str
+            GetCommData로 가져올 항목의 이름입니다.
+        alias : str | None
+            결과에 사용될 이름입니다. None이라면 name을 그대로 사용합니다.
+        decoder : Callable[[str], Any]
+            가져온 문자열을 변환하는 함수입니다.
+        """
+        self.name = name
+        self.alias = alias if alias is not None else name
+        self.decoder = decoder
+        self.column_decoder = COLUMN_DECODERS.get(decoder)
+
+    def decode_column(self, values: list[str]) -> list:
+        """
+        한 열의 문자열들을 한 번에 변환합니다.
+        """
+        if self.column_decoder is not None:
+            return self.column_decoder(values)
+        return [self.decoder(value) for value in values]
+
+class TrSpec():
+    """
+    TR 코드 하나의 입력값, 싱글 데이터와 멀티 데이터의 항목, 그리고 결과의 형태를 선언하는 클래스
+
+    TR을 추가할 때는 TrSpec을 선언하여 TR_REGISTRY에 등록하기만 하면 됩니다.
+    """
+
+    def __init__(self, tr_code: str, description: str, inputs: tuple = (), single_fields: tuple = (),
+                 multi_fields: tuple = (), build: Callable[[dict, list], Any] | None = None, is_order: bool = False,
+                 ex_columns: tuple | None = None):
+        """
+        Parameters
+        ----------
+        tr_code : str
+            TR 코드입니다.
+        description : str
+            로그와 에러 메세지에 사용될 TR의 설명입니다.
+        inputs : tuple
+            (입력 이름, 기본값)의 tuple입니다. SetInputValue가 이 순서대로 호출됩니다.
+            기본값이 None인 입력은 요청시 반드시 전달되어야 합니다.
+        single_fields : tuple[TrField, ...]
+            싱글 데이터의 항목들입니다.
+        multi_fields : tuple[TrField, ...]
+            멀티 데이터의 한 행에 들어있는 항목들입니다.
+        build : Callable[[dict, list], Any] | None
+            싱글 데이터의 dict와 멀티 데이터의 행 리스트로 최종 결과를 만드는 함수입니다.
+            None이라면 싱글 데이터의 dict를 그대로 결과로 사용합니다.
+        is_order : bool
+            주문 TR인지 나타냅니다.
+        ex_columns : tuple | None
+            GetCommDataEx가 반환하는 멀티 데이터의 모든 항목 이름입니다. KOA Studio에 정의된 순서를 따릅니다.
+            선언된 TR은 GetCommData를 칸마다 호출하는 대신 멀티 데이터 전체를 한 번에 가져옵니다.
+        """
+        self.tr_code = tr_code
+        self.description = description
+        self.inputs = tuple(inputs)
+        self.single_fields = tuple(single_fields)
+        self.multi_fields = tuple(multi_fields)
+        self.build = build if build is not None else single_dict
+        self.is_order = is_order
+        self.ex_columns = ex_columns
+        if ex_columns is not None:
+            self._ex_indexes = tuple(ex_columns.index(field.name) for field in self.multi_fields)
+
+    def make_inputs(self, given: dict) -> list[tuple[str, str]]:
+        """
+        전달된 입력값과 기본값을 합쳐 SetInputValue에 전달할 (입력 이름, 값)들을 반환합니다.
+
+        Parameters
+        ----------
+        given : dict
+            요청시 전달된 입력값들입니다.
+
+        Returns
+        -------
+        list[tuple[str, str]]
+            선언된 순서의 (입력 이름, 값)들입니다.
+        """
+        unknown = set(given) - {name for name, _ in self.inputs}
+        if unknown:
+            raise ValueError(f'{self.tr_code}에서 사용하지 않는 입력입니다. - {sorted(unknown)}')
+        input_list = []
+        for name, default in self.inputs:
+            value = given.get(name, default)
+            if value is None:
+                raise ValueError(f'{self.tr_code}의 입력 - {name} 이(가) 전달되지 않았습니다.')
+            input_list.append((name, str(value)))
+        return input_list
+
+    def decode(self, ocx, tr_code: str, tr_name: str, request_name: str, columnar: bool = False) -> Any:
+        """
+        OnReceiveTrData가 호출되었을 때 OCX로부터 데이터를 가져와 결과를 만듭니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            데이터를 가져올 OCX입니다.
+        tr_code : str
+            TR 코드입니다.
+        tr_name : str
+            멀티 데이터의 레코드 이름입니다.
+        request_name : str
+            요청 이름입니다.
+        columnar : bool
+            True일시 build 함수 대신 싱글 데이터의 값들과 멀티 데이터의 항목별 배열을 담은 dict를 반환합니다.
+
+        Returns
+        -------
+        Any
+            build 함수로 만들어진 결과입니다.
+        """
+        get_comm_data = ocx.get_comm_data
+        single = {field.alias: field.decoder(get_comm_data(tr_code, request_name, 0, field.name))
+                  for field in self.single_fields}
+        columns = self._decode_columns(ocx, tr_code, tr_name, request_name) if self.multi_fields else {}
+        if columnar:
+            return {**single, **columns}
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        return self.build(single, rows)
+
+    def _decode_columns(self, ocx, tr_code: str, tr_name: str, request_name: str) -> dict[str, list]:
+        """
+        멀티 데이터를 항목별 배열로 가져와 열 단위로 변환합니다.
+        """
+        if self.ex_columns is not None:
+            table = ocx.get_comm_data_ex(tr_code, tr_name) or []
+            raw_columns = [[row[index] for row in table] for index in self._ex_indexes]
+        else:
+            get_comm_data = ocx.get_comm_data
+            row_count = ocx.get_repeat_cnt(tr_code, tr_name)
+            raw_columns = [[get_comm_data(tr_code, request_name, index, field.name) for index in range(row_count)]
+                           for field in self.multi_fields]
+        return {field.alias: field.decode_column(values) for field, values in zip(self.multi_fields, raw_columns)}
+
+def single_dict(single: dict, rows: list) -> dict:
+    """
+    싱글 데이터의 dict를 그대로 결과로 사용합니다.
+    """
+    return single
+
+def single_value(single: dict, rows: list) -> Any:
+    """
+    싱글 데이터의 유일한 항목의 값을 결과로 사용합니다.
+    """
+    return next(iter(single.values()))
+
+def row_list(single: dict, rows: list) -> list[dict]:
+    """
+    멀티 데이터의 행 리스트를 그대로 결과로 사용합니다.
+    """
+    return rows
+
+def column(alias: str) -> Callable[[dict, list], list]:
+    """
+    멀티 데이터에서 한 항목의 값들만 리스트로 만드는 build 함수를 반환합니다.
+    """
+    def build(single: dict, rows: list) -> list:
+        return [row[alias] for row in rows]
+    return build
+
+def keyed_rows(alias: str) -> Callable[[dict, list], dict]:
+    """
+    멀티 데이터의 행들을 한 항목의 값을 key로 하는 dict로 만드는 build 함수를 반환합니다.
+    """
+    def build(single: dict, rows: list) -> dict:
+        return {row[alias]: row for row in rows}
+    return build
+
+def _clean_stock_code(value: str) -> str:
+    # 종목코드 맨 앞의 문자는 주식의 구분 알파벳이므로 제외합니다.
+    return clean_string(value)[1:]
+
+# 키움증권 API가 6차선 때만 특별한 이유없이 일관성이 깨집니다.
+# 매수6차선호가 매수6차선잔량 (X), 매수6우선호가 매수6우선잔량 (O), 매도6차선호가 (O), 매도6우선잔량 (O)
+_ASK_BID_ORDERS = ['최우선'] + [f'{i}차선' for i in range(2, 11)]
+
+def _ask_bid_fields() -> tuple[TrField, ...]:
+    fields = []
+    for level, order in enumerate(_ASK_BID_ORDERS, start=1):
+        irregular_order = '6우선' if order == '6차선' else order
+        fields.append(TrField(f'매수{irregular_order}호가', f'매수호가{level}'))
+        fields.append(TrField(f'매수{irregular_order}잔량', f'매수잔량{level}'))
+        fields.append(TrField(f'매도{order}호가', f'매도호가{level}'))
+        fields.append(TrField(f'매도{irregular_order}잔량', f'매도잔량{level}'))
+    return tuple(fields)
+
+def _ask_bid_levels(single: dict, rows: list) -> dict:
+    levels = range(1, len(_ASK_BID_ORDERS) + 1)
+    return {
+        '매수호가정보': [(single[f'매수호가{level}'], single[f'매수잔량{level}']) for level in levels],
+        '매도호가정보': [(single[f'매도호가{level}'], single[f'매도잔량{level}']) for level in levels],
+    }
+
+_ACCOUNT_INPUTS = (('계좌번호', None), ('비밀번호입력매체구분', '00'))
+
+_ORDER_FIELDS = (TrField('주문번호', decoder=clean_string),)
+
+TR_REGISTRY: dict[str, TrSpec] = {spec.tr_code: spec for spec in [
+    TrSpec(
+        'opw00001', '주문가능금액 조회',
+        inputs=_ACCOUNT_INPUTS + (('조회구분', '2'),),
+        single_fields=(TrField('주문가능금액'),),
+        build=single_value,
+    ),
+    TrSpec(
+        'opw00018', '보유주식 조회',
+        inputs=_ACCOUNT_INPUTS + (('조회구분', '1'),),
+        multi_fields=(
+            TrField('종목번호', '종목코드', _clean_stock_code),
+            TrField('종목명', decoder=clean_string),
+            TrField('보유수량'),
+            TrField('매매가능수량', '주문가능수량'),
+            TrField('매입가', '매입단가'),
+        ),
+        build=keyed_rows('종목코드'),
+        ex_columns=('종목번호', '종목명', '평가손익', '수익률(%)', '매입가', '전일종가', '보유수량', '매매가능수량',
+                    '현재가', '전일매수수량', '전일매도수량', '금일매수수량', '금일매도수량', '매입금액', '매입수수료',
+                    '평가금액', '평가수수료', '세금', '수수료합', '보유비중(%)', '신용구분', '신용구분명', '대출일'),
+    ),
+    TrSpec(
+        'opt10001', '주식 기본 정보',
+        inputs=(('종목코드', None),),
+        single_fields=(TrField('현재가'), TrField('시가'), TrField('고가'), TrField('저가')),
+    ),
+    TrSpec(
+        # CommKwRqData로 요청되며 종목마다 한 행씩 받습니다.
+        'OPTKWFID', '관심종목 정보',
+        multi_fields=(
+            TrField('종목코드', decoder=clean_string),
+            TrField('종목명', decoder=clean_string),
+            TrField('현재가'), TrField('시가'), TrField('고가'), TrField('저가'),
+            TrField('등락율', decoder=clean_float),
+            TrField('거래량'),
+        ),
+        build=keyed_rows('종목코드'),
+    ),
+    TrSpec(
+        'opt10004', '주식 호가 정보',
+        inputs=(('종목코드', None),),
+        single_fields=_ask_bid_fields(),
+        build=_ask_bid_levels,
+    ),
+    TrSpec(
+        'opt10023', '거래량 급증 주식 조회',
+        inputs=(('시장구분', '000'), ('정렬구분', None), ('시간구분', '2'),
+                ('거래량구분', '5'), ('종목조건', '20'), ('가격구분', '0')),
+        multi_fields=(TrField('종목코드', decoder=clean_string),),
+        build=column('종목코드'),
+        ex_columns=('종목코드', '종목명', '현재가', '전일대비기호', '전일대비', '등락률',
+                    '이전거래량', '현재거래량', '급증량', '급증률'),
+    ),
+    TrSpec(
+        'opt10075', '미체결 조회',
+        inputs=(('계좌번호', None), ('전체종목구분', '0'), ('매매구분', '0'), ('종목코드', ''), ('체결구분', '1')),
+        multi_fields=(
+            TrField('주문번호', decoder=clean_string),
+            TrField('종목코드', decoder=clean_string),
+            TrField('종목명', decoder=clean_string),
+            TrField('주문상태', decoder=clean_string),
+            TrField('주문구분', decoder=clean_string),
+            TrField('주문수량'),
+            TrField('주문가격'),
+            TrField('미체결수량'),
+            TrField('체결량'),
+            TrField('원주문번호', decoder=clean_string),
+        ),
+        build=row_list,
+    ),
+    TrSpec(
+        'opt10080', '주식 분봉 차트 조회',
+        inputs=(('종목코드', None), ('틱범위', '1'), ('수정주가구분', '1')),
+        multi_fields=(
+            TrField('체결시간', decoder=clean_string),
+            TrField('시가'), TrField('고가'), TrField('저가'), TrField('현재가'), TrField('거래량'),
+        ),
+        build=row_list,
+        ex_columns=('현재가', '거래량', '체결시간', '시가', '고가', '저가', '수정주가구분', '수정비율',
+                    '대업종구분', '소업종구분', '종목정보', '수정주가이벤트', '전일종가'),
+    ),
+    TrSpec(
+        'opt10081', '주식 일봉 차트 조회',
+        inputs=(('종목코드', None), ('기준일자', None), ('수정주가구분', '1')),
+        multi_fields=(
+            TrField('일자', decoder=clean_string),
+            TrField('시가'), TrField('고가'), TrField('저가'), TrField('현재가'),
+            TrField('거래량'), TrField('거래대금'),
+        ),
+        build=row_list,
+        ex_columns=('종목코드', '현재가', '거래량', '거래대금', '일자', '시가', '고가', '저가', '수정주가구분',
+                    '수정비율', '대업종구분', '소업종구분', '종목정보', '수정주가이벤트', '전일종가'),
+    ),
+] + [
+    # 주문 요청이 들어오면 주문 번호를 받고 보냅니다.
+    TrSpec(tr_code, '주문', single_fields=_ORDER_FIELDS, build=single_value, is_order=True)
+    for tr_code in ['KOA_NORMAL_BUY_KP_ORD', 'KOA_NORMAL_SELL_KP_ORD', 'KOA_NORMAL_BUY_KQ_ORD',
+                    'KOA_NORMAL_SELL_KQ_ORD', 'KOA_NORMAL_KP_CANCEL', 'KOA_NORMAL_KQ_CANCEL',
+                    'KOA_NORMAL_KP_MODIFY', 'KOA_NORMAL_KQ_MODIFY']
+]}
+
+def get_tr_spec(tr_code: str) -> TrSpec:
+    """
+    TR 코드에 해당하는 TrSpec을 반환합니다.
+
+    Parameters
+    ----------
+    tr_code : str
+        TR 코드입니다.
+
+    Returns
+    -------
+    TrSpec
+        등록된 TrSpec입니다.
+    """
+    spec = TR_REGISTRY.get(tr_code)
+    if spec is None:
+        raise NotImplementedError(f'아직 구현되지 않은 TR 코드 - {tr_code} 입니다.')
+    return spec
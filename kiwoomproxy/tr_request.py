@@ -0,0 +1,167 @@
+import logging
+
+from .kiwoom_ocx import KiwoomOCX
+
+logger = logging.getLogger(__name__)
+
+# CommKwRqData 한 번에 요청할 수 있는 최대 종목 수입니다.
+MAX_BULK_CODES = 100
+
+class TrRequest():
+    """
+    client가 요청한 TR 하나의 정보를 그 응답이 도착할 때까지 보관하는 클래스
+    """
+
+    def __init__(self, tr_code: str, request_name: str, input_list: list[tuple[str, str]], columnar: bool = False,
+                 paginate: bool = False, max_pages: int | None = None, stock_code_list: list[str] | None = None,
+                 bulk: 'BulkTrResult | None' = None):
+        """
+        Parameters
+        ----------
+        tr_code : str
+            요청한 TR 코드입니다.
+        request_name : str
+            unique한 요청의 이름입니다.
+        input_list : list[tuple[str, str]]
+            SetInputValue에 전달한 (입력 이름, 값)들입니다.
+        columnar : bool
+            결과를 멀티 데이터의 항목별 배열로 받을지 나타냅니다.
+        paginate : bool
+            True일시 proxy가 연속 조회를 이어서 요청하고 각 페이지를 tr_page로 전달합니다.
+        max_pages : int | None
+            paginate일 때 받을 최대 페이지 수입니다. None이라면 마지막 페이지까지 받습니다.
+        stock_code_list : list[str] | None
+            CommKwRqData로 요청할 종목 코드들입니다. None이라면 CommRqData로 요청합니다.
+        bulk : BulkTrResult | None
+            여러 요청으로 나누어진 요청이라면 결과를 모을 객체입니다.
+        """
+        self.tr_code = tr_code
+        self.request_name = request_name
+        self.input_list = input_list
+        self.columnar = columnar
+        self.paginate = paginate
+        self.max_pages = max_pages
+        self.pages = 0
+        self.stock_code_list = stock_code_list
+        self.bulk = bulk
+
+    def request(self, ocx: KiwoomOCX, request_type: int, screen_no: str) -> int:
+        """
+        입력값을 설정하고 TR 데이터를 요청합니다.
+        입력값은 OCX 전체에서 공유되므로 요청 직전에 설정해야 합니다.
+
+        Parameters
+        ----------
+        ocx : KiwoomOCX
+            TR 데이터를 요청할 OCX입니다.
+        request_type : int
+            0이면 처음 조회를, 2이면 연속 조회를 의미합니다.
+        screen_no : str
+            화면번호입니다.
+
+        Returns
+        -------
+        int
+            comm_rq_data의 결과 코드입니다.
+        """
+        if self.stock_code_list is not None:
+            stock_codes = ';'.join(self.stock_code_list)
+            return ocx.comm_kw_rq_data(stock_codes, request_type == 2, len(self.stock_code_list), 0,
+                                       self.request_name, screen_no)
+        for input_name, input_value in self.input_list:
+            ocx.set_input_value(input_name, input_value)
+        return ocx.comm_rq_data(self.request_name, self.tr_code, request_type, screen_no)
+
+    def has_next_page(self, next_data) -> bool:
+        """
+        방금 받은 페이지 이후에 proxy가 연속 조회를 이어서 요청해야 하는지 확인합니다.
+
+        Parameters
+        ----------
+        next_data
+            OnReceiveTrData의 연속 조회 여부입니다. '2'일시 다음 페이지가 있음을 의미합니다.
+        """
+        if not self.paginate or str(next_data) != '2':
+            return False
+        return self.max_pages is None or self.pages < self.max_pages
+
+class BulkTrResult():
+    """
+    여러 TR 요청으로 나누어 보낸 하나의 client 요청의 결과를 모으는 클래스
+    """
+
+    def __init__(self, request_name: str, chunk_count: int):
+        """
+        Parameters
+        ----------
+        request_name : str
+            client가 요청한 이름입니다. 모아진 결과는 이 이름으로 전달됩니다.
+        chunk_count : int
+            나누어 보낸 요청의 수입니다.
+        """
+        self.request_name = request_name
+        self.result = {}
+        # 요청에 실패한 나누어진 요청들의 종목 코드입니다. 결과에는 None으로 들어갑니다.
+        self.failed_codes: list[str] = []
+        self._remaining = chunk_count
+
+    def add(self, result: dict) -> bool:
+        """
+        나누어 보낸 요청 하나의 결과를 합칩니다.
+
+        Returns
+        -------
+        bool
+            모든 요청의 결과가 모였다면 True를 반환합니다.
+        """
+        self.result.update(result)
+        self._remaining -= 1
+        return self._remaining == 0
+
+    def fail(self, stock_code_list: list[str]) -> bool:
+        """
+        나누어 보낸 요청 하나가 실패했음을 기록합니다. 실패한 종목들의 결과는 None이 됩니다.
+
+        Returns
+        -------
+        bool
+            모든 요청이 끝났다면 True를 반환합니다.
+        """
+        self.failed_codes.extend(stock_code_list)
+        self.result.update(dict.fromkeys(stock_code_list))
+        self._remaining -= 1
+        return self._remaining == 0
+
+    def is_failed(self) -> bool:
+        """
+        나누어 보낸 모든 요청이 실패했는지 확인합니다.
+        """
+        return len(self.failed_codes) == len(self.result)
+
+class TrRequestTable():
+    """
+    응답을 기다리고 있는 TR 요청들을 request_name으로 찾을 수 있도록 보관하는 클래스
+    """
+
+    def __init__(self):
+        self._requests: dict[str, TrRequest] = {}
+
+    def add(self, request: TrRequest) -> None:
+        """
+        응답을 기다릴 TR 요청을 추가합니다.
+        """
+        if request.request_name in self._requests:
+            logger.warning(f'같은 이름의 TR 요청 - {request.request_name} 이(가) 이미 응답을 기다리고 있습니다.')
+        self._requests[request.request_name] = request
+
+    def get(self, request_name: str) -> TrRequest | None:
+        """
+        request_name에 해당하는 TR 요청을 반환합니다. 없다면 None을 반환합니다.
+        """
+        return self._requests.get(request_name)
+
+    def pop(self, request_name: str) -> TrRequest | None:
+        """
+        request_name에 해당하는 TR 요청을 꺼내서 반환합니다. 없다면 None을 반환합니다.
+        """
+        return self._requests.pop(request_name, None)
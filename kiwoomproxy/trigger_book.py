@@ -0,0 +1,166 @@
+import logging
+from typing import Callable
+
+from .utils import unscope_request_name
+from .kiwoom_api_const import KOR_NAME_TO_FID
+
+logger = logging.getLogger(__name__)
+
+# 조건 주문이 감시하는 값과 그 값이 들어오는 실시간 타입입니다.
+# 현재가는 주식체결로, 스프레드(최우선 매도호가 - 최우선 매수호가)는 주식호가잔량으로 확인합니다.
+TRIGGER_REAL_TYPES = {
+    '현재가': '주식체결',
+    '스프레드': '주식호가잔량',
+}
+# 조건은 감시하는 값과 비교 방법을 붙여 씁니다. ex) '현재가이하'는 현재가가 기준값 이하가 되면 주문합니다.
+TRIGGER_CONDITIONS = tuple(f'{target}{comparison}' for target in TRIGGER_REAL_TYPES for comparison in ('이상', '이하'))
+
+# 조건을 확인하기 위해 실시간 타입별로 등록하는 항목들입니다.
+TRIGGER_FIELDS = {
+    '주식체결': frozenset({'현재가'}),
+    '주식호가잔량': frozenset({'매수호가1', '매도호가1'}),
+}
+
+def trigger_fid_list(real_type: str) -> list[str]:
+    """
+    조건 주문을 확인하기 위해 실시간 등록할 FID들을 반환합니다.
+    """
+    return sorted(KOR_NAME_TO_FID[field] for field in TRIGGER_FIELDS[real_type])
+
+class TriggerRule():
+    """
+    실시간 데이터가 조건을 만족하면 한 번 주문을 전송하는 조건 주문 하나를 저장하는 클래스
+    """
+
+    __slots__ = ('request_name', 'stock_code', 'condition', 'level', 'owner', 'fire', 'real_type', '_is_above')
+
+    def __init__(self, request_name: str, stock_code: str, condition: str, level: int, owner,
+                 fire: Callable[['TriggerRule', int], None]):
+        """
+        TriggerRule 클래스의 객체를 초기화합니다.
+
+        Parameters
+        ----------
+        request_name : str
+            조건 주문의 이름입니다. 주문이 전송되면 이 이름으로 tr_result와 order_event가 전달됩니다.
+        stock_code : str
+            감시할 종목 코드입니다.
+        condition : str
+            TRIGGER_CONDITIONS 중 하나입니다.
+        level : int
+            기준값입니다.
+        owner
+            조건 주문을 등록한 client입니다. 보통 ClientConnection입니다.
+        fire : Callable[[TriggerRule, int], None]
+            조건을 만족했을 때 조건 주문과 조건을 만족한 값으로 호출되어 주문을 전송하는 함수입니다.
+        """
+        if condition not in TRIGGER_CONDITIONS:
+            raise ValueError(f'지원하지 않는 조건 - {condition} 입니다. {TRIGGER_CONDITIONS} 중 하나여야 합니다.')
+        if level < 0:
+            raise ValueError(f'유효하지 않은 기준값 - {level} 입니다.')
+        self.request_name = request_name
+        self.stock_code = stock_code
+        self.condition = condition
+        self.level = level
+        self.owner = owner
+        self.fire = fire
+        self.real_type = TRIGGER_REAL_TYPES[condition[:-2]]
+        self._is_above = condition.endswith('이상')
+
+    def matches(self, value: int | None) -> bool:
+        if value is None:
+            return False
+        return value >= self.level if self._is_above else value <= self.level
+
+    def to_dict(self) -> dict:
+        return {
+            'request_name': unscope_request_name(self.request_name),
+            '주식코드': self.stock_code,
+            '조건': self.condition,
+            '기준값': self.level,
+        }
+
+class TriggerBook():
+    """
+    client가 등록한 조건 주문들을 실시간 타입과 종목 코드별로 색인하여 보관하는 클래스
+
+    실시간 데이터가 들어올 때마다 그 종목의 조건 주문들만 확인하므로,
+    tick 하나를 확인하는 비용은 해당 종목에 등록된 조건 주문의 수에 비례합니다.
+    조건 주문은 조건을 만족하는 첫 tick에 한 번만 실행되고 제거됩니다.
+    """
+
+    def __init__(self):
+        self._rules: dict[str, TriggerRule] = {}
+        self._index: dict[str, dict[str, list[TriggerRule]]] = {real_type: {} for real_type in TRIGGER_FIELDS}
+
+    def add(self, rule: TriggerRule) -> None:
+        """
+        조건 주문을 등록합니다.
+        """
+        if rule.request_name in self._rules:
+            raise ValueError(f'이미 등록된 조건 주문 - {rule.request_name} 입니다.')
+        self._rules[rule.request_name] = rule
+        self._index[rule.real_type].setdefault(rule.stock_code, []).append(rule)
+
+    def get(self, request_name: str) -> TriggerRule | None:
+        """
+        등록된 조건 주문을 반환합니다. 등록되지 않은 조건 주문이라면 None을 반환합니다.
+        """
+        return self._rules.get(request_name)
+
+    def remove(self, request_name: str) -> TriggerRule | None:
+        """
+        조건 주문을 제거합니다. 등록되지 않은 조건 주문이라면 None을 반환합니다.
+        """
+        rule = self._rules.pop(request_name, None)
+        if rule is None:
+            return None
+        rules = self._index[rule.real_type][rule.stock_code]
+        rules.remove(rule)
+        if not rules:
+            del self._index[rule.real_type][rule.stock_code]
+        return rule
+
+    def release_all(self, owner) -> list[TriggerRule]:
+        """
+        owner가 등록한 모든 조건 주문을 제거합니다. client의 연결이 끊어졌을 때 호출됩니다.
+        """
+        return [self.remove(rule.request_name) for rule in list(self._rules.values()) if rule.owner is owner]
+
+    def has_rules(self, real_type: str, stock_code: str) -> bool:
+        """
+        실시간 타입과 종목에 확인할 조건 주문이 있는지 확인합니다.
+        """
+        return stock_code in self._index[real_type]
+
+    def rules_of(self, owner) -> list[TriggerRule]:
+        """
+        owner가 등록한 조건 주문들을 등록한 순서대로 반환합니다.
+        """
+        return [rule for rule in self._rules.values() if rule.owner is owner]
+
+    def check(self, real_type: str, stock_code: str, value: int | None) -> list[TriggerRule]:
+        """
+        실시간 데이터 하나로 종목의 조건 주문들을 확인합니다. 조건을 만족한 조건 주문은 제거되어 반환됩니다.
+
+        Parameters
+        ----------
+        real_type : str
+            실시간 데이터의 타입입니다.
+        stock_code : str
+            실시간 데이터의 종목 코드입니다.
+        value : int | None
+            조건 주문이 감시하는 값입니다. 값을 알 수 없는 tick이라면 None입니다.
+
+        Returns
+        -------
+        list[TriggerRule]
+            조건을 만족한 조건 주문들입니다.
+        """
+        rules = self._index[real_type].get(stock_code)
+        if not rules:
+            return []
+        matched = [rule for rule in rules if rule.matches(value)]
+        for rule in matched:
+            self.remove(rule.request_name)
+        return matched
@@ -1,6 +1,10 @@
+import re
 import logging
 from typing import Callable
 
+# 서로 다른 client가 같은 request_name을 사용해도 OCX와 hub에서 구분되도록 client마다 붙이는 접두사입니다.
+_REQUEST_SCOPE = re.compile(r'~\d+~')
+
 def trace(func: Callable) -> Callable:
     """
     함수의 시작과 끝을 trace하는 decorator 입니다.
@@ -17,29 +21,40 @@ def trace(func: Callable) -> Callable:
         시작과 끝을 logging하는 함수를 반환합니다.
     """
     def wrapper(*args, **kwargs):
+        # 실시간 데이터 핸들러처럼 자주 호출되는 함수에서 DEBUG 로그가 꺼져있다면 문자열을 만들지 않습니다.
+        if not logging.root.isEnabledFor(logging.DEBUG):
+            return func(*args, **kwargs)
         logging.debug(f'{func.__name__} starts with args - {args}, kwargs - {kwargs}')
         result = func(*args, **kwargs)
         logging.debug(f'{func.__name__} ends with return value - {result}')
         return result
     return wrapper
 
-_screen_no = 1
-def get_screen_no() -> str:
+def scope_request_name(scope_id: int, request_name: str) -> str:
     """
-    임의의 적당한 화면번호를 생성하고 반환합니다.
-    화면번호는 0001부터 0100까지 순환합니다.
+    client가 보낸 request_name에 client마다 다른 접두사를 붙입니다.
+
+    Parameters
+    ----------
+    scope_id : int
+        client의 connection마다 다른 번호입니다.
+    request_name : str
+        client가 보낸 request_name입니다.
 
     Returns
     -------
     str
-        화면번호를 반환합니다.
+        proxy 내부와 OCX에서 사용하는 request_name입니다.
     """
-    global _screen_no
-    screen_no_str = f'{_screen_no:04}'
-    _screen_no += 1
-    if _screen_no > 100:
-        _screen_no = 1
-    return screen_no_str
+    return f'~{scope_id}~{request_name}'
+
+def unscope_request_name(request_name: str) -> str:
+    """
+    scope_request_name으로 붙인 접두사를 제거하여 client가 보낸 request_name을 반환합니다.
+    접두사가 없는 이름은 그대로 반환합니다.
+    """
+    match = _REQUEST_SCOPE.match(request_name)
+    return request_name[match.end():] if match else request_name
 
 def clean_string(value: str) -> str:
     """
@@ -62,6 +77,8 @@ def clean_integer(value: str) -> int | None:
     문자열에서 변환된 정수를 반환합니다.
     부호는 무시합니다.
 
+    빈 문자열이 자주 전달되므로 예외를 발생시키고 잡는 대신 미리 숫자인지 확인합니다.
+
     Parameters
     ----------
     value : str
@@ -73,8 +90,107 @@ def clean_integer(value: str) -> int | None:
         변환된 정수를 반환합니다.
         변환할 수 없다면 None을 반환합니다.
     """
-    try:
-        clean_value = int(clean_string(value))
-    except ValueError:
-        clean_value = None
-    return clean_value
\ No newline at end of file
+    clean_value = clean_string(value)
+    if not clean_value.isdecimal():
+        return None
+    return int(clean_value)
+
+def clean_float(value: str) -> float | None:
+    """
+    문자열에서 변환된 실수를 반환합니다.
+    부호는 무시합니다.
+
+    Parameters
+    ----------
+    value : str
+        변환될 문자열입니다.
+
+    Returns
+    -------
+    float | None
+        변환된 실수를 반환합니다.
+        변환할 수 없다면 None을 반환합니다.
+    """
+    clean_value = clean_string(value)
+    if not clean_value.replace('.', '', 1).isdecimal():
+        return None
+    return float(clean_value)
+
+def clean_signed_integer(value: str) -> int | None:
+    """
+    문자열에서 변환된 정수를 부호를 유지하여 반환합니다.
+    전일 대비, 거래량처럼 '-'가 하락이나 매도를 뜻하는 항목에 사용합니다.
+
+    Parameters
+    ----------
+    value : str
+        변환될 문자열입니다.
+
+    Returns
+    -------
+    int | None
+        변환된 정수를 반환합니다.
+        변환할 수 없다면 None을 반환합니다.
+    """
+    magnitude = clean_integer(value)
+    if magnitude is None:
+        return None
+    return -magnitude if value.lstrip().startswith('-') else magnitude
+
+def clean_signed_float(value: str) -> float | None:
+    """
+    문자열에서 변환된 실수를 부호를 유지하여 반환합니다.
+    등락율처럼 '-'가 하락을 뜻하는 항목에 사용합니다.
+
+    Parameters
+    ----------
+    value : str
+        변환될 문자열입니다.
+
+    Returns
+    -------
+    float | None
+        변환된 실수를 반환합니다.
+        변환할 수 없다면 None을 반환합니다.
+    """
+    magnitude = clean_float(value)
+    if magnitude is None:
+        return None
+    return -magnitude if value.lstrip().startswith('-') else magnitude
+
+def clean_string_column(values: list[str]) -> list[str]:
+    """
+    문자열들에서 앞 뒤의 +, -와 공백문자를 한 번에 제거합니다.
+
+    Parameters
+    ----------
+    values : list[str]
+        기존의 문자열들입니다.
+
+    Returns
+    -------
+    list[str]
+        깨끗해진 문자열들입니다.
+    """
+    return [value.strip('+- ') for value in values]
+
+def clean_integer_column(values: list[str]) -> list[int | None]:
+    """
+    문자열들을 한 번에 정수로 변환합니다.
+    부호는 무시합니다.
+
+    numpy를 사용하지 않으므로 clean_string_column의 중간 리스트를 만들지 않고
+    공백과 부호의 제거부터 변환까지 한 번의 comprehension으로 처리합니다.
+
+    Parameters
+    ----------
+    values : list[str]
+        변환될 문자열들입니다.
+
+    Returns
+    -------
+    list[int | None]
+        변환된 정수들을 반환합니다.
+        변환할 수 없는 문자열은 None으로 변환됩니다.
+    """
+    return [int(cleaned) if cleaned.isdecimal() else None for cleaned in (value.strip('+- ') for value in values)]
@@ -0,0 +1,177 @@
+import json
+import struct
+import logging
+from typing import Iterator
+
+from .schema import check_schema_mode, to_compact
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# json - 개행문자로 구분된 JSON 입니다. 기존 easykiwoom client와 호환되는 기본 모드입니다.
+# binary - 4 byte big-endian 길이 헤더 뒤에 공백 없이 직렬화된 UTF-8 JSON이 붙는 frame입니다.
+# msgpack - 4 byte big-endian 길이 헤더 뒤에 msgpack으로 직렬화된 데이터가 붙는 frame입니다.
+#           msgpack extra(pip install kiwoomproxy[msgpack])가 설치되어있을 때만 사용할 수 있습니다.
+WIRE_MODES = ('json', 'binary', 'msgpack')
+
+_HEADER = struct.Struct('>I')
+_COMPACT_THRESHOLD = 1 << 16
+
+def check_wire_mode(mode: str) -> None:
+    """
+    주어진 wire mode를 현재 환경에서 사용할 수 있는지 확인합니다.
+
+    Parameters
+    ----------
+    mode : str
+        확인할 wire mode입니다.
+    """
+    if mode not in WIRE_MODES:
+        raise ValueError(f'유효하지 않은 wire mode - {mode} 입니다.')
+    if mode == 'msgpack' and msgpack is None:
+        raise RuntimeError('msgpack 패키지가 설치되어있지 않아 msgpack 모드를 사용할 수 없습니다.')
+
+class WireProtocol():
+    """
+    Client와 주고받는 메세지의 직렬화 및 framing 방식을 관리하는 클래스
+    """
+
+    def __init__(self):
+        """
+        기본 모드인 json 모드로 초기화합니다.
+        """
+        self.mode = 'json'
+        self.schema = 'dict'
+        # 도착한 bytes는 문자열로 변환하지 않고 그대로 쌓아둡니다.
+        # _start 이전은 이미 처리된 frame이고, _scanned 이전에는 개행문자가 없음이 확인되었습니다.
+        self._buffer = bytearray()
+        self._start = 0
+        self._scanned = 0
+
+    def set_mode(self, mode: str) -> None:
+        """
+        이후에 주고받을 메세지의 wire mode를 변경합니다.
+
+        Parameters
+        ----------
+        mode : str
+            WIRE_MODES 중 하나입니다.
+        """
+        check_wire_mode(mode)
+        self.mode = mode
+        logger.info(f'wire mode가 {mode}(으)로 변경되었습니다.')
+
+    def set_schema(self, schema: str) -> None:
+        """
+        이후에 전송할 메세지의 schema mode를 변경합니다.
+
+        Parameters
+        ----------
+        schema : str
+            SCHEMA_MODES 중 하나입니다.
+        """
+        check_schema_mode(schema)
+        self.schema = schema
+        logger.info(f'schema mode가 {schema}(으)로 변경되었습니다.')
+
+    @property
+    def format(self) -> tuple[str, str]:
+        """
+        같은 메세지를 같은 frame으로 직렬화하는 protocol끼리 공유하는 (wire mode, schema mode)입니다.
+        """
+        return (self.mode, self.schema)
+
+    def encode(self, data_dict: dict) -> bytes:
+        """
+        현재 wire mode와 schema mode에 맞게 메세지를 하나의 frame으로 직렬화합니다.
+
+        Parameters
+        ----------
+        data_dict : dict
+            전송할 메세지입니다.
+
+        Returns
+        -------
+        bytes
+            socket에 그대로 쓸 수 있는 frame입니다.
+        """
+        if self.schema == 'compact':
+            data_dict = to_compact(data_dict)
+            if self.mode == 'json':
+                return (json.dumps(data_dict, ensure_ascii=False, separators=(',', ':')) + '\n').encode()
+        if self.mode == 'json':
+            return (json.dumps(data_dict) + '\n').encode()
+        if self.mode == 'binary':
+            payload = json.dumps(data_dict, ensure_ascii=False, separators=(',', ':')).encode()
+        else:
+            payload = msgpack.packb(data_dict)
+        return _HEADER.pack(len(payload)) + payload
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        socket으로부터 읽은 bytes를 내부 buffer에 추가합니다.
+
+        Parameters
+        ----------
+        chunk : bytes
+            새로 도착한 bytes입니다.
+        """
+        self._buffer += chunk
+
+    def messages(self) -> Iterator[dict]:
+        """
+        buffer에 쌓인 완전한 frame들을 하나씩 역직렬화하여 반환합니다.
+
+        개행문자는 새로 도착한 bytes에서만 찾고, 각 frame은 완성된 이후에 한 번만 decode합니다.
+        frame을 하나 꺼낼 때마다 wire mode를 다시 확인하므로
+        모드 변경 요청 바로 뒤에 이어서 도착한 frame도 올바르게 해석됩니다.
+
+        Yields
+        ------
+        dict
+            역직렬화된 메세지입니다.
+        """
+        buffer = self._buffer
+        try:
+            while True:
+                if self.mode == 'json':
+                    end = buffer.find(b'\n', max(self._start, self._scanned))
+                    if end < 0:
+                        self._scanned = len(buffer)
+                        return
+                    frame = buffer[self._start:end]
+                    self._start = end + 1
+                    yield json.loads(frame)
+                else:
+                    if len(buffer) - self._start < _HEADER.size:
+                        return
+                    (length,) = _HEADER.unpack_from(buffer, self._start)
+                    end = self._start + _HEADER.size + length
+                    if len(buffer) < end:
+                        return
+                    frame = buffer[self._start + _HEADER.size:end]
+                    self._start = end
+                    if self.mode == 'binary':
+                        yield json.loads(frame)
+                    else:
+                        yield msgpack.unpackb(frame)
+        finally:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        이미 처리된 frame들이 차지하던 buffer의 앞부분을 제거합니다.
+
+        매 frame마다 buffer를 다시 만들지 않도록 처리된 부분이 충분히 커졌을 때만 제거합니다.
+        """
+        if self._start == len(self._buffer):
+            self._buffer.clear()
+            self._start = self._scanned = 0
+        elif self._start >= _COMPACT_THRESHOLD:
+            del self._buffer[:self._start]
+            self._scanned = max(self._scanned - self._start, 0)
+            self._start = 0
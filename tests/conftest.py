@@ -0,0 +1,7 @@
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+@pytest.fixture(scope='session', autouse=True)
+def qt_application():
+    # scheduler와 connection의 QTimer를 만들기 위해 필요합니다. event loop는 실행하지 않습니다.
+    return QCoreApplication.instance() or QCoreApplication([])
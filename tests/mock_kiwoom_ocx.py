@@ -3,7 +3,23 @@
 class MockKiwoomOCX():
     """
     TODO: 일단 클래스를 만들었지만 구현하기는 힘들듯...
+
+    실시간 데이터는 real_data에 FID별로 넣어둔 문자열을 그대로 반환합니다.
     """
+    def __init__(self):
+        # 종목 코드와 상관없이 FID별로 반환할 실시간 데이터입니다.
+        self.real_data: dict[int, str] = {}
+        self.real_data_calls = 0
+        # comm_rq_data와 send_order가 차례로 반환할 결과 코드입니다. 비어있다면 0을 반환합니다.
+        self.results: list[int] = []
+        self.requests: list[tuple] = []
+        # set_real_reg와 set_real_remove의 호출 기록입니다.
+        self.real_calls: list[tuple] = []
+        # 멀티 데이터의 행들과 GetCommDataEx가 항목들을 반환하는 순서입니다.
+        self.tr_rows: list[dict[str, str]] = []
+        self.tr_columns: tuple = ()
+        self.comm_data_calls = 0
+
     def comm_connect(self) -> int:
         pass
 
@@ -11,29 +27,51 @@ class MockKiwoomOCX():
         pass
 
     def get_condition_load(self) -> int:
-        pass
+        self.requests.append(('get_condition_load',))
+        return 1
 
     def send_condition(self, screen_no: str, condition_name: str, condition_index: int, request_type: int) -> int:
+        self.requests.append(('send_condition', condition_name, request_type))
+        return 1
+
+    def send_condition_stop(self, screen_no: str, condition_name: str, condition_index: int) -> None:
         pass
 
     def set_input_value(self, input_name: str, input_value: str) -> None:
         pass
 
     def comm_rq_data(self, request_name: str, tr_code: str, request_type: int, screen_no: str) -> int:
+        self.requests.append(('comm_rq_data', request_name))
+        return self.results.pop(0) if self.results else 0
+
+    def comm_kw_rq_data(self, stock_codes: str, is_next: bool, code_count: int, type_flag: int,
+                        request_name: str, screen_no: str) -> int:
         pass
 
     def send_order(self, order_name: str, screen_no: str, account_number: str, order_type: int, 
                    stock_code: str, amount: int, price: int, how: str, original_order_number: str) -> int:
-        pass
+        self.requests.append(('send_order', order_name))
+        return self.results.pop(0) if self.results else 0
     
     def set_real_reg(self, screen_no: str, stock_codes: str, fids: str, is_add: str) -> int:
+        self.real_calls.append(('set_real_reg', screen_no, stock_codes, fids))
+        return self.results.pop(0) if self.results else 0
+
+    def set_real_remove(self, screen_no: str, stock_code: str) -> None:
+        self.real_calls.append(('set_real_remove', screen_no, stock_code))
+
+    def disconnect_real_data(self, screen_no: str) -> None:
         pass
 
     def get_comm_data(self, tr_code: str, request_name: str, index: int, data_name: str) -> str:
-        pass
+        self.comm_data_calls += 1
+        return self.tr_rows[index][data_name]
     
+    def get_comm_data_ex(self, tr_code: str, record_name: str) -> list[list[str]]:
+        return [[row[name] for name in self.tr_columns] for row in self.tr_rows]
+
     def get_repeat_cnt(self, tr_code: str, tr_name: str) -> int:
-        pass
+        return len(self.tr_rows)
 
     def get_condition_name_list(self) -> str:
         pass
@@ -42,7 +80,8 @@ class MockKiwoomOCX():
         pass
 
     def get_comm_real_data(self, stock_code: str, fid: int) -> str:
-        pass
+        self.real_data_calls += 1
+        return self.real_data.get(int(fid), '')
 
         
 
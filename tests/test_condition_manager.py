@@ -0,0 +1,24 @@
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.condition_manager import ConditionManager
+from kiwoomproxy.screen_allocator import ScreenAllocator
+
+def test_requests_wait_for_a_single_condition_load():
+    ocx = MockKiwoomOCX()
+    conditions = ConditionManager(ocx, ScreenAllocator(), None)
+    conditions.load()
+    conditions.when_loaded('a', '급등주', lambda: conditions.start('a', '급등주', 0))
+    conditions.when_loaded('b', '급등주', lambda: conditions.start('b', '급등주', 0))
+    conditions.when_loaded('c', '거래량', lambda: conditions.start('c', '거래량', 1))
+    # 로드가 완료되기 전에는 SendCondition을 요청하지 않고 GetConditionLoad도 한 번만 요청합니다.
+    assert ocx.requests == [('get_condition_load',)]
+
+    conditions.release_all('c')
+    conditions.set_condition_list('user', [{'name': '급등주', 'index': 0}, {'name': '거래량', 'index': 1}])
+    for _, _, request in conditions.take_pending():
+        request()
+    assert ocx.requests == [('get_condition_load',), ('send_condition', '급등주', 1)]
+
+    # 로드된 후에는 바로 요청합니다.
+    conditions.when_loaded('c', '거래량', lambda: conditions.start('c', '거래량', 1))
+    assert ocx.requests[-1] == ('send_condition', '거래량', 1)
@@ -0,0 +1,84 @@
+import random
+
+from kiwoomproxy.connection import ClientConnection
+from kiwoomproxy.order_book import OrderBookCache, BID, ASK
+from kiwoomproxy.wire import WireProtocol
+
+class FakeSignal():
+    def __init__(self):
+        self.slot = None
+
+    def connect(self, slot):
+        self.slot = slot
+
+class FakeSocket():
+    """
+    write한 bytes를 client가 읽어갈 때까지 전송 buffer에 남겨두는 socket
+    """
+
+    def __init__(self):
+        self.bytesWritten = FakeSignal()
+        self.pending = 0
+        self.written = []
+
+    def bytesToWrite(self) -> int:
+        return self.pending
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+        self.pending += len(data)
+
+    def drain(self) -> None:
+        written, self.pending = self.pending, 0
+        self.bytesWritten.slot(written)
+
+def read_messages(socket: FakeSocket) -> list[dict]:
+    protocol = WireProtocol()
+    protocol.feed(b''.join(socket.written))
+    return list(protocol.messages())
+
+def apply_ask_bid_delta(book: dict, seq: int, value: dict) -> int:
+    if value['snapshot'] is not None:
+        book.clear()
+        for side, key in ((BID, '매수호가정보'), (ASK, '매도호가정보')):
+            for index, level in enumerate(value['snapshot'][key]):
+                book[(side, index)] = tuple(level)
+        return value['seq']
+    # snapshot 이후의 delta는 sequence number의 공백 없이 도착해야 합니다.
+    assert value['seq'] == seq + 1
+    for side, index, price, volume in value['changes']:
+        book[(side, index)] = (price, volume)
+    return value['seq']
+
+def test_lagging_client_converges_to_order_book():
+    generator = random.Random(0)
+    cache = OrderBookCache(snapshot_interval=1 << 30)
+    socket = FakeSocket()
+    connection = ClientConnection(socket, max_queue_size=20, high_watermark=1, flush_interval_ms=-1,
+                                  book_cache=cache)
+    for index in range(300):
+        values = [generator.randint(1, 3) for _ in range(8)]
+        seq, changes = cache.update('005930', values)
+        if changes:
+            connection.send({'type': 'ask_bid_delta', 'key': '005930',
+                             'value': {'seq': seq, 'changes': changes, 'snapshot': None}})
+        connection.send({'type': 'price_change', 'key': '005930', 'value': {'현재가': index}})
+        if index == 150:
+            connection.send({'type': 'order_event', 'key': 'order', 'value': {'event': 'accepted'}})
+    stats = connection.get_send_queue_stats()
+    assert stats['resynced'] > 0 and stats['max_depth'] <= 21
+    while connection.get_send_queue_stats()['depth']:
+        socket.drain()
+
+    book, seq = {}, 0
+    messages = read_messages(socket)
+    for message in messages:
+        if message['type'] == 'ask_bid_delta':
+            seq = apply_ask_bid_delta(book, seq, message['value'])
+    snapshot = cache.snapshot('005930')
+    assert seq == snapshot['seq']
+    assert [book[(BID, index)] for index in range(2)] == snapshot['매수호가정보']
+    assert [book[(ASK, index)] for index in range(2)] == snapshot['매도호가정보']
+    # 합쳐진 price_change는 최신 값만 남고, 주문 메세지는 버려지지 않습니다.
+    assert [message['value']['현재가'] for message in messages if message['type'] == 'price_change'][-1] == 299
+    assert [message['key'] for message in messages if message['type'] == 'order_event'] == ['order']
@@ -0,0 +1,44 @@
+from kiwoomproxy.order_tracker import OrderTracker, OrderBasket, ACCEPTED, CANCELLED, REJECTED
+
+def chejan(order_status: str, order_number: str, order_type: str = '+매수', amount: int = 10, nontraded: int = 10,
+           original: str = '0000000') -> dict:
+    return {'주문상태': order_status, '주문번호': order_number, '종목코드': 'A005930', '종목명': '삼성전자',
+            '주문구분': order_type, '주문수량': str(amount), '주문가격': '70000', '미체결수량': str(nontraded),
+            '원주문번호': original, '단위체결가': '', '단위체결량': ''}
+
+def apply(orders: OrderTracker, data: dict) -> list[str]:
+    _, _, events = orders.apply(data.get)
+    return [event['event'] for event in events]
+
+def test_cancel_order_closes_as_cancelled():
+    orders = OrderTracker()
+    basket = OrderBasket('basket', ['order', 'cancel'])
+    orders.add_basket(basket)
+    orders.acknowledge('order', '0001')
+    orders.acknowledge('cancel', '0002')
+    assert apply(orders, chejan('접수', '0001')) == [ACCEPTED]
+    apply(orders, chejan('접수', '0002', '매수취소', nontraded=0, original='0001'))
+    assert apply(orders, chejan('확인', '0002', '매수취소', nontraded=0, original='0001')) == [CANCELLED]
+    assert orders.is_closed('0002')
+    assert [result['상태'] for result in basket.results.values()] == [CANCELLED, CANCELLED]
+
+def test_rejected_orders():
+    orders = OrderTracker()
+    # 접수되기 전에 거부된 주문은 접수 event 없이 거부됩니다.
+    assert apply(orders, chejan('거부', '0001')) == [REJECTED]
+    assert orders.is_closed('0001')
+    assert apply(orders, chejan('거부', '0001')) == []
+
+    # 거부된 취소 주문의 원주문은 계속 미체결로 남고, 이후에 잔량이 정리되면 취소로 완료됩니다.
+    apply(orders, chejan('접수', '0002'))
+    apply(orders, chejan('접수', '0003', '매수취소', nontraded=0, original='0002'))
+    assert apply(orders, chejan('거부', '0003', '매수취소', nontraded=0, original='0002')) == [REJECTED]
+    assert orders.get('0002').pending_amendment is None
+    assert [order.order_number for order in orders.open_orders()] == ['0002']
+
+def test_unacknowledged_orders():
+    orders = OrderTracker()
+    orders.submit('order')
+    assert orders.has_unacknowledged()
+    orders.acknowledge('order', '0001')
+    assert not orders.has_unacknowledged()
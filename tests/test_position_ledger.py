@@ -0,0 +1,49 @@
+import pytest
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.order_tracker import OrderTracker
+from kiwoomproxy.position_ledger import PositionLedger
+from kiwoomproxy.scheduler import RequestScheduler
+from kiwoomproxy.screen_allocator import ScreenAllocator
+from kiwoomproxy.tr_request import TrRequestTable
+
+def position(stock_code: str, amount: int) -> dict:
+    return {'종목코드': stock_code, '종목명': '', '보유수량': amount, '주문가능수량': amount, '매입단가': 1000}
+
+@pytest.fixture
+def tr_requests():
+    return TrRequestTable()
+
+@pytest.fixture
+def ledger(tr_requests):
+    ledger = PositionLedger(MockKiwoomOCX(), RequestScheduler(lambda: 0.0), tr_requests, ScreenAllocator(),
+                            OrderTracker(), None, lambda: 0.0)
+    ledger.start('8000')
+    return ledger
+
+def receive_positions(ledger, tr_requests, page: dict, next_data: str) -> None:
+    ledger.receive(tr_requests.pop('__ledger__opw00018'), page, next_data, '0001')
+
+def test_balance_during_sync_is_kept(ledger, tr_requests):
+    # 첫 페이지를 받기 전과 다음 페이지를 기다리는 동안 체결 데이터가 들어옵니다.
+    ledger.apply_balance('8000', position('005930', 15))
+    receive_positions(ledger, tr_requests, {'005930': position('005930', 10), '000660': position('000660', 5)}, '2')
+    ledger.apply_balance('8000', position('000660', 0))
+    ledger.apply_balance('8000', position('035720', 3))
+    receive_positions(ledger, tr_requests, {'005380': position('005380', 1)}, '0')
+    assert ledger.get_positions() == {'005930': position('005930', 15), '005380': position('005380', 1),
+                                      '035720': position('035720', 3)}
+
+    # 조회가 끝난 이후의 체결 데이터는 바로 반영되고 다음 조회에는 남지 않습니다.
+    ledger.apply_balance('8000', position('005380', 2))
+    assert ledger.get_positions()['005380'] == position('005380', 2)
+    ledger.reconcile()
+    receive_positions(ledger, tr_requests, {'005930': position('005930', 15)}, '0')
+    assert ledger.get_positions() == {'005930': position('005930', 15)}
+    assert ledger.get_stats()['mismatches'] == 1
+
+def test_balance_of_other_account_is_ignored(ledger, tr_requests):
+    receive_positions(ledger, tr_requests, {'005930': position('005930', 10)}, '0')
+    ledger.apply_balance('8001', position('005930', 0))
+    ledger.apply_balance('8001', position('000660', 5))
+    assert ledger.get_positions() == {'005930': position('005930', 10)}
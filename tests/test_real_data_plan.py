@@ -0,0 +1,34 @@
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.kiwoom_api_const import KOR_NAME_TO_FID
+from kiwoomproxy.real_data_plan import (get_price_change_plan, get_ask_bid_change_plan, price_change_fields,
+                                        ask_bid_change_fields)
+
+def _ocx(values: dict[str, str]) -> MockKiwoomOCX:
+    ocx = MockKiwoomOCX()
+    ocx.real_data = {int(KOR_NAME_TO_FID[name]): value for name, value in values.items()}
+    return ocx
+
+def test_plan_is_built_once_per_field_set():
+    fields = price_change_fields(['현재가', '시가'])
+    assert get_price_change_plan(fields) is get_price_change_plan(frozenset(['시가', '현재가']))
+
+def test_price_change_plan_keeps_field_order_and_reads_only_requested_fids():
+    ocx = _ocx({'현재가': '+70000', '시가': '69500', '체결시간': '090001'})
+    plan = get_price_change_plan(price_change_fields(['체결시간', '현재가']))
+    assert plan.names == ('현재가', '체결시간')
+    assert plan.extract(ocx, '005930') == [70000, '090001']
+    assert ocx.real_data_calls == 2
+
+def test_ask_bid_plan_layout_and_empty_fields():
+    ocx = _ocx({'매수호가1': '-69900', '매수호가 수량1': '100', '매도호가1': '+70000', '매도호가 수량1': ''})
+    plan = get_ask_bid_change_plan(ask_bid_change_fields(1))
+    assert plan.extract(ocx, '005930') == [69900, 100, 70000, None]
+
+def test_signed_fields_keep_their_sign():
+    ocx = _ocx({'현재가': '-69000', '전일 대비': '-1000', '등락율': '-1.43', '거래량': '-15'})
+    plan = get_price_change_plan(price_change_fields(['현재가', '전일 대비', '등락율', '거래량']))
+    assert plan.extract(ocx, '005930') == [69000, -1000, -1.43, -15]
+    ocx = _ocx({'현재가': '+71000', '전일 대비': '+1000', '등락율': '+1.43', '거래량': '+15'})
+    assert plan.extract(ocx, '005930') == [71000, 1000, 1.43, 15]
+    assert plan.extract(_ocx({}), '005930') == [None, None, None, None]
@@ -0,0 +1,129 @@
+import pytest
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.scheduler import (RequestScheduler, TR, ORDER, HIGH_PRIORITY, NORMAL_PRIORITY, LOW_PRIORITY,
+                                   RETRY_DELAY, TR_RATE_LIMITS)
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def scheduler(clock):
+    return RequestScheduler(clock)
+
+@pytest.fixture
+def ocx():
+    return MockKiwoomOCX()
+
+def tr_job(ocx, clock, request_name, executed):
+    def job() -> int:
+        executed.append((request_name, clock.now))
+        return ocx.comm_rq_data(request_name, 'opt10001', 0, '0101')
+    return job
+
+def order_job(ocx, clock, request_name, executed):
+    def job() -> int:
+        executed.append((request_name, clock.now))
+        return ocx.send_order(request_name, '0101', '8000', 1, '005930', 1, 0, '03', '')
+    return job
+
+def run_until_idle(scheduler, clock, step=0.01, limit=10000):
+    for _ in range(limit):
+        if not any(stats['depth'] for stats in scheduler.get_stats().values()):
+            return
+        clock.now += step
+        scheduler.dispatch()
+    raise AssertionError('대기열이 비워지지 않았습니다.')
+
+def assert_within_limits(times, limits):
+    for count, period in limits:
+        for index in range(count, len(times)):
+            assert times[index] - times[index - count] >= period - 1e-9
+
+def test_tr_calls_never_exceed_rate_limits(scheduler, clock, ocx):
+    executed = []
+    waits = [scheduler.submit(TR, f'rq{index}', tr_job(ocx, clock, f'rq{index}', executed)) for index in range(120)]
+    assert len(executed) == 5
+    assert waits[:5] == [0.0] * 5 and waits[5] > 0
+    # 대기열의 뒤에 있는 요청일수록 예상 대기시간이 길어집니다.
+    assert waits[5:] == sorted(waits[5:])
+    run_until_idle(scheduler, clock)
+    assert [name for name, _ in executed] == [f'rq{index}' for index in range(120)]
+    assert_within_limits([at for _, at in executed], TR_RATE_LIMITS)
+    # 1분에 100회 제한 때문에 101번째 요청은 1분 이후에 실행됩니다.
+    assert executed[100][1] >= 60.0
+
+def test_estimated_wait_matches_actual_start(scheduler, clock, ocx):
+    executed = []
+    waits = {}
+    for index in range(12):
+        waits[f'rq{index}'] = scheduler.submit(TR, f'rq{index}', tr_job(ocx, clock, f'rq{index}', executed))
+    run_until_idle(scheduler, clock, step=0.001)
+    for name, at in executed:
+        assert at == pytest.approx(waits[name], abs=0.002)
+
+def test_higher_priority_runs_first(scheduler, clock, ocx):
+    executed = []
+    for index in range(5):
+        scheduler.submit(TR, f'fill{index}', tr_job(ocx, clock, f'fill{index}', executed))
+    scheduler.submit(TR, 'low', tr_job(ocx, clock, 'low', executed), LOW_PRIORITY)
+    scheduler.submit(TR, 'normal', tr_job(ocx, clock, 'normal', executed), NORMAL_PRIORITY)
+    scheduler.submit(TR, 'high', tr_job(ocx, clock, 'high', executed), HIGH_PRIORITY)
+    run_until_idle(scheduler, clock)
+    assert [name for name, _ in executed[5:]] == ['high', 'normal', 'low']
+
+def test_order_queue_is_independent_of_tr_queue(scheduler, clock, ocx):
+    executed = []
+    for index in range(10):
+        scheduler.submit(TR, f'rq{index}', tr_job(ocx, clock, f'rq{index}', executed))
+    assert scheduler.submit(ORDER, 'order', order_job(ocx, clock, 'order', executed)) == 0.0
+    assert ('order', 0.0) in executed
+
+def test_overflow_is_retried_before_newer_requests(scheduler, clock, ocx):
+    executed = []
+    ocx.results = [0, 0, -308]
+    for index in range(3):
+        scheduler.submit(ORDER, f'order{index}', order_job(ocx, clock, f'order{index}', executed))
+    for index in range(3, 6):
+        scheduler.submit(ORDER, f'order{index}', order_job(ocx, clock, f'order{index}', executed))
+    run_until_idle(scheduler, clock)
+    names = [name for name, _ in executed]
+    # 과부하로 거부된 요청은 대기하던 요청들보다 먼저, 다시 시도하기까지의 시간이 지난 후에 실행됩니다.
+    assert names == ['order0', 'order1', 'order2', 'order2', 'order3', 'order4', 'order5']
+    assert executed[3][1] >= RETRY_DELAY
+    assert_within_limits([at for _, at in executed], ((5, 1.0),))
+
+def test_job_error_is_reported_to_on_error(scheduler, clock, ocx):
+    errors = []
+    def job() -> int:
+        raise RuntimeError('요청에 실패하였습니다.')
+    scheduler.submit(TR, 'broken', job, on_error=errors.append)
+    assert [str(error) for error in errors] == ['요청에 실패하였습니다.']
+    # 실패한 요청이 이후의 요청을 막지 않습니다.
+    executed = []
+    scheduler.submit(TR, 'next', tr_job(ocx, clock, 'next', executed))
+    assert executed == [('next', 0.0)]
+
+def test_cancel_owner_drops_queued_jobs_of_disconnected_client(scheduler, clock, ocx):
+    executed = []
+    errors = []
+    gone, alive = object(), object()
+    for index in range(5):
+        scheduler.submit(ORDER, f'fill{index}', order_job(ocx, clock, f'fill{index}', executed), owner=alive)
+    scheduler.submit(ORDER, 'gone', order_job(ocx, clock, 'gone', executed), on_error=errors.append, owner=gone)
+    scheduler.submit(ORDER, 'alive', order_job(ocx, clock, 'alive', executed), owner=alive)
+    assert scheduler.cancel_owner(gone) == 1
+    # 취소된 요청은 on_error로 알려지고, 남은 요청들의 순서와 호출 제한은 그대로 지켜집니다.
+    assert len(errors) == 1 and isinstance(errors[0], RuntimeError)
+    run_until_idle(scheduler, clock)
+    assert [name for name, _ in executed] == [f'fill{index}' for index in range(5)] + ['alive']
+    assert executed[-1][1] >= 1.0
+    assert scheduler.cancel_owner(gone) == 0
@@ -0,0 +1,49 @@
+import pytest
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.screen_allocator import ScreenAllocator
+from kiwoomproxy.subscription_manager import SubscriptionManager
+
+@pytest.fixture
+def ocx():
+    return MockKiwoomOCX()
+
+@pytest.fixture
+def screens():
+    return ScreenAllocator(real_screens=('5001', '5002'), max_codes_per_screen=2)
+
+@pytest.fixture
+def manager(ocx, screens):
+    return SubscriptionManager(ocx, screens)
+
+def test_registration_is_kept_while_any_fid_set_remains(ocx, screens, manager):
+    manager.acquire('a', ['005930'], ['10'])
+    manager.acquire('b', ['005930'], ['10', '13'])
+    ocx.real_calls.clear()
+    manager.release('b', ['005930'], ['10', '13'])
+    # 남은 client의 실시간 데이터가 끊기지 않도록 다시 등록하지 않습니다.
+    assert ocx.real_calls == []
+    assert screens.fids_of('005930') == frozenset({'10', '13'})
+    manager.release('a', ['005930'], ['10'])
+    assert ocx.real_calls == [('set_real_remove', '5001', '005930')]
+    assert screens.screen_of('005930') is None
+    assert manager.get_stats() == {'codes': 0, 'subscriptions': 0, 'references': 0}
+
+def test_failed_registration_rolls_back_references(ocx, screens, manager):
+    manager.acquire('a', ['005930'], ['10'])
+    ocx.results = [0, -100]
+    with pytest.raises(RuntimeError):
+        manager.acquire('b', ['005930', '000660', '035720'], ['10', '13'])
+    # 먼저 등록에 성공한 화면의 새 종목은 등록이 해제됩니다.
+    assert ocx.real_calls[-1] == ('set_real_remove', '5001', '000660')
+    assert manager.get_stats() == {'codes': 1, 'subscriptions': 1, 'references': 1}
+    assert screens.fids_of('005930') == frozenset({'10'})
+    assert screens.screen_of('000660') is None and screens.screen_of('035720') is None
+
+    # 되돌린 후에는 다시 등록할 수 있고, 해제하면 OCX의 등록도 해제됩니다.
+    manager.acquire('b', ['005930'], ['10', '13'])
+    assert ocx.real_calls[-1] == ('set_real_reg', '5001', '005930;', '10;13;')
+    manager.release('b', ['005930'], ['10', '13'])
+    manager.release('a', ['005930'], ['10'])
+    assert ocx.real_calls[-1] == ('set_real_remove', '5001', '005930')
+    assert manager.get_stats() == {'codes': 0, 'subscriptions': 0, 'references': 0}
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+from mock_kiwoom_ocx import MockKiwoomOCX
+
+from kiwoomproxy.tr_registry import TR_REGISTRY, TrSpec
+from kiwoomproxy.utils import clean_integer, clean_integer_column
+
+# KOA Studio에 정의된 멀티 데이터의 항목 순서입니다. GetCommDataEx는 이 순서로 각 행을 반환합니다.
+KOA_COLUMNS = {
+    'opw00018': ('종목번호', '종목명', '평가손익', '수익률(%)', '매입가', '전일종가', '보유수량', '매매가능수량',
+                 '현재가', '전일매수수량', '전일매도수량', '금일매수수량', '금일매도수량', '매입금액', '매입수수료',
+                 '평가금액', '평가수수료', '세금', '수수료합', '보유비중(%)', '신용구분', '신용구분명', '대출일'),
+    'opt10023': ('종목코드', '종목명', '현재가', '전일대비기호', '전일대비', '등락률',
+                 '이전거래량', '현재거래량', '급증량', '급증률'),
+    'opt10080': ('현재가', '거래량', '체결시간', '시가', '고가', '저가', '수정주가구분', '수정비율',
+                 '대업종구분', '소업종구분', '종목정보', '수정주가이벤트', '전일종가'),
+    'opt10081': ('종목코드', '현재가', '거래량', '거래대금', '일자', '시가', '고가', '저가', '수정주가구분',
+                 '수정비율', '대업종구분', '소업종구분', '종목정보', '수정주가이벤트', '전일종가'),
+}
+
+# OCX가 멀티 데이터의 칸으로 반환하는 형태의 문자열들입니다.
+RAW_VALUES = ['000000070000', '+00070000', '-00001500', '        1234', '0', '', '   ', 'A005930', '005930',
+              ' 삼성전자          ', '20240102', '093000', '+1.25', '-0.50', '신용']
+
+EX_SPECS = [spec for spec in TR_REGISTRY.values() if spec.ex_columns is not None]
+
+def per_cell_spec(spec: TrSpec) -> TrSpec:
+    return TrSpec(spec.tr_code, spec.description, spec.inputs, spec.single_fields, spec.multi_fields, spec.build)
+
+def make_rows(tr_code: str, row_count: int) -> list[dict[str, str]]:
+    generator = random.Random(tr_code)
+    return [{name: generator.choice(RAW_VALUES) for name in KOA_COLUMNS[tr_code]} for _ in range(row_count)]
+
+def test_every_ex_column_tr_is_covered():
+    assert {spec.tr_code for spec in EX_SPECS} == set(KOA_COLUMNS)
+
+@pytest.mark.parametrize('spec', EX_SPECS, ids=lambda spec: spec.tr_code)
+@pytest.mark.parametrize('row_count', [0, 1, 30])
+@pytest.mark.parametrize('columnar', [False, True])
+def test_comm_data_ex_matches_comm_data(spec, row_count, columnar):
+    ocx = MockKiwoomOCX()
+    ocx.tr_columns = KOA_COLUMNS[spec.tr_code]
+    ocx.tr_rows = make_rows(spec.tr_code, row_count)
+    expected = per_cell_spec(spec).decode(ocx, spec.tr_code, spec.tr_code, '요청', columnar)
+    assert ocx.comm_data_calls == row_count * len(spec.multi_fields)
+
+    ocx.comm_data_calls = 0
+    assert spec.decode(ocx, spec.tr_code, spec.tr_code, '요청', columnar) == expected
+    # 멀티 데이터는 GetCommDataEx 한 번으로 가져옵니다.
+    assert ocx.comm_data_calls == 0
+
+def test_clean_integer_column_matches_clean_integer():
+    assert clean_integer_column(RAW_VALUES) == [clean_integer(value) for value in RAW_VALUES]
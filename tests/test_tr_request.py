@@ -0,0 +1,16 @@
+from kiwoomproxy.tr_request import BulkTrResult
+
+def test_bulk_completes_with_failed_chunk():
+    bulk = BulkTrResult('관심종목', 3)
+    assert not bulk.add({'005930': {'현재가': 70000}})
+    assert not bulk.fail(['000660', '035720'])
+    assert bulk.add({'005380': {'현재가': 200000}})
+    assert bulk.result == {'005930': {'현재가': 70000}, '000660': None, '035720': None, '005380': {'현재가': 200000}}
+    assert bulk.failed_codes == ['000660', '035720']
+    assert not bulk.is_failed()
+
+def test_bulk_with_every_chunk_failed():
+    bulk = BulkTrResult('관심종목', 2)
+    assert not bulk.fail(['005930'])
+    assert bulk.fail(['000660'])
+    assert bulk.is_failed()
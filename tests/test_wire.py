@@ -0,0 +1,77 @@
+import json
+import struct
+
+import pytest
+
+from kiwoomproxy.wire import WireProtocol, msgpack
+
+def _request(index: int) -> dict:
+    return {'method': 'get_price_info', 'kwargs': {'stock_code': '005930', 'request_name': f'가격조회{index}'}}
+
+def _json_frame(data_dict: dict) -> bytes:
+    return (json.dumps(data_dict, ensure_ascii=False) + '\n').encode()
+
+def _binary_frame(data_dict: dict) -> bytes:
+    payload = json.dumps(data_dict, ensure_ascii=False).encode()
+    return struct.pack('>I', len(payload)) + payload
+
+def test_json_frame_split_across_chunks():
+    protocol = WireProtocol()
+    frame = _json_frame(_request(0))
+    # 한글 request_name의 UTF-8 문자 중간에서 나누어 도착합니다.
+    split = frame.index('가'.encode()) + 1
+    protocol.feed(frame[:split])
+    assert list(protocol.messages()) == []
+    protocol.feed(frame[split:])
+    assert list(protocol.messages()) == [_request(0)]
+
+def test_json_frames_coalesced_into_one_chunk():
+    protocol = WireProtocol()
+    protocol.feed(b''.join(_json_frame(_request(index)) for index in range(3)) + _json_frame(_request(3))[:5])
+    assert list(protocol.messages()) == [_request(index) for index in range(3)]
+    protocol.feed(_json_frame(_request(3))[5:])
+    assert list(protocol.messages()) == [_request(3)]
+
+def test_json_frame_fed_byte_by_byte():
+    protocol = WireProtocol()
+    received = []
+    for byte in _json_frame(_request(0)) + _json_frame(_request(1)):
+        protocol.feed(bytes([byte]))
+        received.extend(protocol.messages())
+    assert received == [_request(0), _request(1)]
+
+def test_binary_frame_split_inside_header():
+    protocol = WireProtocol()
+    protocol.set_mode('binary')
+    frame = _binary_frame(_request(0))
+    protocol.feed(frame[:2])
+    assert list(protocol.messages()) == []
+    protocol.feed(frame[2:10])
+    assert list(protocol.messages()) == []
+    protocol.feed(frame[10:] + _binary_frame(_request(1)))
+    assert list(protocol.messages()) == [_request(0), _request(1)]
+
+def test_mode_change_applies_to_following_frame_in_same_chunk():
+    protocol = WireProtocol()
+    set_mode = {'method': 'set_wire_mode', 'kwargs': {'mode': 'binary'}}
+    protocol.feed(_json_frame(set_mode) + _binary_frame(_request(0)))
+    messages = protocol.messages()
+    assert next(messages) == set_mode
+    protocol.set_mode('binary')
+    assert list(messages) == [_request(0)]
+
+@pytest.mark.skipif(msgpack is None, reason='msgpack이 설치되어있지 않습니다.')
+def test_msgpack_frames_coalesced():
+    protocol = WireProtocol()
+    protocol.set_mode('msgpack')
+    frames = b''.join(protocol.encode(_request(index)) for index in range(2))
+    protocol.feed(frames)
+    assert list(protocol.messages()) == [_request(0), _request(1)]
+
+def test_buffer_is_compacted_after_pipelined_burst():
+    protocol = WireProtocol()
+    burst = b''.join(_json_frame(_request(index)) for index in range(10000))
+    for start in range(0, len(burst), 1 << 16):
+        protocol.feed(burst[start:start + (1 << 16)])
+        list(protocol.messages())
+    assert len(protocol._buffer) == 0